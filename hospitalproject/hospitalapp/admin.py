@@ -2,7 +2,7 @@ from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
 from .models import (
     CustomUser, PatientProfile, DoctorProfile, AdminProfile,
-    Appointment, MedicalHistory, Bill, Prescription
+    Appointment, MedicalHistory, Bill, Prescription, Announcement, HealthBulletin, MedicalResearch, Publication
 )
 from .forms import AdminUserCreationForm, CustomUserChangeForm
 
@@ -24,11 +24,12 @@ class UserAdmin(BaseUserAdmin):
     add_form = AdminUserCreationForm
     form = CustomUserChangeForm
 
-    list_display = ('username', 'email', 'is_staff', 'is_superuser', 'is_doctor', 'is_patient', 'is_admin')
-    list_filter = ('is_doctor', 'is_patient', 'is_admin', 'is_staff', 'is_superuser')
+    list_display = ('username', 'display_name', 'email', 'role', 'is_staff', 'is_superuser')
+    list_filter = ('role', 'is_doctor', 'is_patient', 'is_admin', 'is_staff', 'is_superuser')
+    readonly_fields = ('role', 'display_name')
 
     fieldsets = BaseUserAdmin.fieldsets + (
-        ('User Roles', {'fields': ('is_doctor', 'is_patient', 'is_admin')}),
+        ('User Roles', {'fields': ('is_doctor', 'is_patient', 'is_admin', 'role', 'display_name')}),
     )
     add_fieldsets = BaseUserAdmin.add_fieldsets + (
         ('User Roles', {'fields': ('is_doctor', 'is_patient', 'is_admin')}),
@@ -37,12 +38,46 @@ class UserAdmin(BaseUserAdmin):
     inlines = [DoctorProfileInline, PatientProfileInline, AdminProfileInline]
 
 
+# The change lists print each row's __str__, which names the patient and
+# doctor; load them with the rows.
+class AppointmentAdmin(admin.ModelAdmin):
+    list_display = ('__str__', 'date', 'time', 'status')
+    list_select_related = ('patient', 'doctor')
+
+
+class MedicalHistoryAdmin(admin.ModelAdmin):
+    list_display = ('__str__', 'date')
+    list_select_related = ('patient',)
+    # A select would print every appointment.
+    raw_id_fields = ('appointment',)
+
+
+class BillAdmin(admin.ModelAdmin):
+    list_display = ('__str__', 'date', 'amount', 'paid')
+    list_select_related = ('patient',)
+
+
+class PrescriptionAdmin(admin.ModelAdmin):
+    list_display = ('__str__', 'date_issued')
+    list_select_related = ('patient',)
+
+
+# Public content; documents are uploaded here (see media.py).
+class ContentAdmin(admin.ModelAdmin):
+    list_display = ('title', 'date')
+    search_fields = ('title',)
+
+
 # Register everything
 admin.site.register(CustomUser, UserAdmin)
 admin.site.register(PatientProfile)
 admin.site.register(DoctorProfile)
 admin.site.register(AdminProfile)
-admin.site.register(Appointment)
-admin.site.register(MedicalHistory)
-admin.site.register(Bill)
-admin.site.register(Prescription)
+admin.site.register(Appointment, AppointmentAdmin)
+admin.site.register(MedicalHistory, MedicalHistoryAdmin)
+admin.site.register(Bill, BillAdmin)
+admin.site.register(Prescription, PrescriptionAdmin)
+admin.site.register(Announcement, ContentAdmin)
+admin.site.register(HealthBulletin, ContentAdmin)
+admin.site.register(MedicalResearch, ContentAdmin)
+admin.site.register(Publication, ContentAdmin)
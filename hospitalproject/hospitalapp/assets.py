@@ -0,0 +1,229 @@
+import gzip
+import json
+import os
+import re
+import urllib.request
+from urllib.parse import urljoin
+from functools import lru_cache
+
+from django.conf import settings
+from django.contrib.staticfiles import finders
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage, staticfiles_storage
+from django.core.exceptions import SuspiciousFileOperation
+from django.http import FileResponse, Http404, HttpResponseNotModified
+from django.utils._os import safe_join
+from django.utils.cache import patch_vary_headers
+from django.utils.http import http_date, parse_etags
+
+from .media import IMMUTABLE_MAX_AGE
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+# --- Static assets ---
+# ``manage.py build_assets`` runs before collectstatic on deploy:
+#   - it downloads the pinned CSS/JS/font files in VENDOR into
+#     static/vendor/, so pages stop depending on public CDNs;
+#   - it writes resized WebP and JPEG copies of the large images to
+#     static/build/images/ and lists them in static/build/images.json,
+#     which the {% responsive_image %} tag turns into srcset.
+# collectstatic then stores every file under a content-hashed name
+# (ManifestStaticFilesStorage) and writes .gz (and .br when the brotli
+# package is installed) next to each text file. The front server can send
+# those as they are (nginx ``gzip_static``/``brotli_static``); with
+# SERVE_STATIC on, serve_static() does the same from Python.
+#
+# Until build_assets has run, the tags fall back to the CDN URL and the
+# original image, so a fresh checkout still renders.
+
+VENDOR = {
+    'bootstrap.css': ('vendor/bootstrap/bootstrap.min.css',
+                      'https://cdn.jsdelivr.net/npm/bootstrap@5.3.0/dist/css/bootstrap.min.css'),
+    'bootstrap.js': ('vendor/bootstrap/bootstrap.bundle.min.js',
+                     'https://cdn.jsdelivr.net/npm/bootstrap@5.3.0/dist/js/bootstrap.bundle.min.js'),
+    'bootstrap-icons.css': ('vendor/bootstrap-icons/bootstrap-icons.min.css',
+                            'https://cdn.jsdelivr.net/npm/bootstrap-icons@1.11.3/font/bootstrap-icons.min.css'),
+    'fontawesome.css': ('vendor/fontawesome/css/all.min.css',
+                        'https://cdnjs.cloudflare.com/ajax/libs/font-awesome/6.0.0-beta3/css/all.min.css'),
+}
+
+IMAGE_WIDTHS = (80, 320, 640, 960, 1600)
+IMAGE_QUALITY = 80
+IMAGE_FORMATS = (('webp', {'method': 6}), ('jpeg', {'optimize': True, 'progressive': True}))
+IMAGES_MANIFEST = 'build/images.json'
+
+IMAGE_TYPES = ('.jpg', '.jpeg', '.png')
+CSS_URL = re.compile(r'''url\((['"]?)([^)'"]+)\1\)''')
+SOURCE_MAP = re.compile(rb'\n?(/\*# sourceMappingURL=[^*]*\*/|//# sourceMappingURL=\S*)\s*$')
+COMPRESSIBLE = ('.css', '.js', '.svg', '.json', '.txt', '.map', '.ttf', '.eot')
+HASHED_NAME = re.compile(r'\.[0-9a-f]{12}\.\w+$')
+ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+
+
+def app_static_dir():
+    return os.path.join(os.path.dirname(__file__), 'static')
+
+
+# --- Build ---
+
+def _download(url):
+    with urllib.request.urlopen(url, timeout=30) as response:
+        return response.read()
+
+
+def vendor_assets(refresh=False, log=print):
+    # Fetches each VENDOR file plus the fonts and images its url()s point at.
+    # Source map comments are dropped: the maps are not shipped, and
+    # ManifestStaticFilesStorage refuses references to missing files.
+    root = app_static_dir()
+    queue = list(VENDOR.values())
+    while queue:
+        path, url = queue.pop(0)
+        target = os.path.join(root, path)
+        if os.path.exists(target) and not refresh:
+            continue
+        data = SOURCE_MAP.sub(b'', _download(url))
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        with open(target, 'wb') as f:
+            f.write(data)
+        log(f'{path} ({len(data) // 1024} KiB)')
+        if path.endswith('.css'):
+            for _, ref in CSS_URL.findall(data.decode()):
+                if ref.startswith(('data:', '#', '/')) or '://' in ref:
+                    continue
+                ref = re.split(r'[?#]', ref)[0]
+                ref_path = os.path.normpath(os.path.join(os.path.dirname(path), ref)).replace(os.sep, '/')
+                queue.append((ref_path, urljoin(url, ref)))
+
+
+def _variant_name(path, width, extension):
+    stem = re.sub(r'[^\w/.-]+', '-', os.path.splitext(path)[0].lower())
+    return f'build/{stem}-{width}.{extension}'
+
+
+def build_image_variants(log=print):
+    # Writes resized WebP and JPEG copies of every image under static/images
+    # and the manifest read by {% responsive_image %}.
+    from PIL import Image
+
+    root = app_static_dir()
+    manifest = {}
+    for directory, _, files in os.walk(os.path.join(root, 'images')):
+        for filename in sorted(files):
+            if not filename.lower().endswith(IMAGE_TYPES):
+                continue
+            source = os.path.join(directory, filename)
+            path = os.path.relpath(source, root).replace(os.sep, '/')
+            with Image.open(source) as image:
+                image = image.convert('RGB')
+                widths = [w for w in IMAGE_WIDTHS if w < image.width] or [image.width]
+                entry = {'width': image.width, 'height': image.height, 'variants': {'webp': [], 'jpeg': []}}
+                for width in widths:
+                    resized = image.resize((width, round(image.height * width / image.width)), Image.LANCZOS)
+                    for extension, options in IMAGE_FORMATS:
+                        name = _variant_name(path, width, 'jpg' if extension == 'jpeg' else extension)
+                        target = os.path.join(root, name)
+                        os.makedirs(os.path.dirname(target), exist_ok=True)
+                        resized.save(target, extension.upper(), quality=IMAGE_QUALITY, **options)
+                        entry['variants'][extension].append((width, name))
+            manifest[path] = entry
+            log(f'{path}: {len(widths)} widths')
+    with open(os.path.join(root, IMAGES_MANIFEST), 'w') as f:
+        json.dump(manifest, f, indent=1, sort_keys=True)
+    image_variants.cache_clear()
+    return manifest
+
+
+# --- Template helpers ---
+
+@lru_cache(maxsize=None)
+def vendor_url(name):
+    path, cdn = VENDOR[name]
+    return staticfiles_storage.url(path) if finders.find(path) else cdn
+
+
+@lru_cache(maxsize=None)
+def image_variants():
+    path = finders.find(IMAGES_MANIFEST)
+    if not path:
+        return {}
+    with open(path) as f:
+        return json.load(f)
+
+
+def srcset(variants):
+    return ', '.join(f'{staticfiles_storage.url(name)} {width}w' for width, name in variants)
+
+
+# --- Precompression ---
+
+def compress(path):
+    # Writes path.gz (and path.br) unless compression does not pay off.
+    with open(path, 'rb') as f:
+        data = f.read()
+    outputs = [('.gz', gzip.compress(data, compresslevel=9, mtime=0))]
+    if brotli is not None:
+        outputs.append(('.br', brotli.compress(data)))
+    written = []
+    for suffix, compressed in outputs:
+        if len(compressed) < len(data) * 0.95:
+            with open(path + suffix, 'wb') as f:
+                f.write(compressed)
+            written.append(path + suffix)
+    return written
+
+
+class CompressedManifestStorage(ManifestStaticFilesStorage):
+    def post_process(self, paths, dry_run=False, **options):
+        yield from super().post_process(paths, dry_run, **options)
+        if dry_run:
+            return
+        # Only the final hashed names are referenced from pages.
+        for name in set(self.hashed_files.values()):
+            if name.endswith(COMPRESSIBLE) and self.exists(name):
+                compress(self.path(name))
+
+
+# --- Serving ---
+
+def _accepted(request):
+    header = request.headers.get('Accept-Encoding', '')
+    return {part.split(';')[0].strip() for part in header.split(',')
+            if not part.strip().endswith(('q=0', 'q=0.0'))}
+
+
+def serve_static(request, path):
+    try:
+        full_path = safe_join(settings.STATIC_ROOT, path)
+    except SuspiciousFileOperation:
+        raise Http404
+    if not os.path.isfile(full_path):
+        raise Http404
+
+    encoding = None
+    accepted = _accepted(request)
+    for name, suffix in ENCODINGS:
+        if name in accepted and os.path.isfile(full_path + suffix):
+            encoding, full_path = name, full_path + suffix
+            break
+    stat = os.stat(full_path)
+
+    etag = f'"{stat.st_size:x}-{int(stat.st_mtime):x}{"-" + encoding if encoding else ""}"'
+    if etag in parse_etags(request.headers.get('If-None-Match', '')):
+        response = HttpResponseNotModified()
+    else:
+        # Named after the original so the Content-Type is that of the uncompressed file.
+        response = FileResponse(open(full_path, 'rb'), filename=os.path.basename(path))
+        if encoding:
+            response['Content-Encoding'] = encoding
+        response['Last-Modified'] = http_date(stat.st_mtime)
+    response['ETag'] = etag
+    if HASHED_NAME.search(path):
+        response['Cache-Control'] = f'public, max-age={IMMUTABLE_MAX_AGE}, immutable'
+    else:
+        response['Cache-Control'] = 'public, max-age=3600'
+    patch_vary_headers(response, ('Accept-Encoding',))
+    return response
@@ -0,0 +1,44 @@
+import asyncio
+
+from asgiref.sync import sync_to_async
+from django.db import close_old_connections, connections
+
+from .instrumentation import current_profile, timed_queries
+
+
+# --- Parallel reads for async views ---
+# Django runs every async ORM call on the request's one database thread, so
+# awaiting five querysets still runs five queries back to back.
+# gather_reads() runs independent read functions at the same time on
+# worker threads instead. Each thread keeps its own connection, so the
+# pool doubles as a small connection pool: old or broken connections are
+# closed before each read, the same as at the start of a request. Database
+# routing and query timing follow, because the request's context is copied
+# into each thread.
+#
+# Other connections cannot see rows the request's own transaction has not
+# committed. Inside a transaction (after a write, with ATOMIC_REQUESTS, or
+# in a TestCase) the reads therefore run one after another on the
+# request's thread.
+
+def _in_transaction():
+    return any(conn.in_atomic_block for conn in connections.all(initialized_only=True))
+
+
+def _isolated(func):
+    def run():
+        close_old_connections()
+        profile = current_profile()
+        if profile is None:
+            return func()
+        with timed_queries(profile):
+            return func()
+    return run
+
+
+async def gather_reads(*funcs):
+    # Calls each function (no arguments; use functools.partial) and returns
+    # their results in order.
+    if await sync_to_async(_in_transaction)():
+        return await sync_to_async(lambda: [func() for func in funcs])()
+    return await asyncio.gather(*(sync_to_async(_isolated(func), thread_sensitive=False)() for func in funcs))
@@ -0,0 +1,209 @@
+import datetime
+import threading
+import time
+from collections import ChainMap
+
+from django.utils import timezone
+
+from .models import Appointment, DoctorProfile
+from .slots import parse_available_days, slot_times
+
+
+# --- In-memory availability index ---
+# Answers "earliest free slots for specialization X" without touching the
+# database on the hot path. For every doctor we keep a 7-bit weekday mask,
+# and for every (doctor, date) an integer bitmask of booked slots (bit i is
+# slot_times()[i]). Free slots are ``~booked & working_day_mask``.
+#
+# Appointment and DoctorProfile signals keep this process's index current.
+# Other worker processes converge through the TTLs below; booking itself
+# always goes through slots.reserve_slot(), so a slot that was taken a
+# moment ago is rejected there rather than double-booked.
+
+DOCTOR_TTL = 300
+BOOKINGS_TTL = 60
+
+SLOTS = slot_times()
+SLOT_BITS = {t: i for i, t in enumerate(SLOTS)}
+FULL_DAY = (1 << len(SLOTS)) - 1
+
+
+def _specialization_key(value):
+    return (value or '').strip().lower()
+
+
+def _weekday_mask(available_days):
+    mask = 0
+    for day in parse_available_days(available_days):
+        mask |= 1 << day
+    return mask
+
+
+def _by_specialization(doctors):
+    by_specialization = {}
+    for pk, (key, _, _) in doctors.items():
+        by_specialization.setdefault(key, []).append(pk)
+    for ids in by_specialization.values():
+        ids.sort()
+    return by_specialization
+
+
+def _read_doctors():
+    doctors = {}
+    for pk, specialization, available_days, full_name in DoctorProfile.objects.values_list(
+            'id', 'specialization', 'available_days', 'full_name').iterator(chunk_size=2000):
+        doctors[pk] = (_specialization_key(specialization), _weekday_mask(available_days), full_name)
+    return doctors
+
+
+def _read_bookings(doctor_ids, dates):
+    booked = {(pk, d): 0 for pk in doctor_ids for d in dates}
+    rows = Appointment.objects.filter(
+        doctor_id__in=doctor_ids, date__in=dates
+    ).exclude(status='Declined').values_list('doctor_id', 'date', 'time')
+    for doctor_id, date, slot_time in rows.iterator(chunk_size=5000):
+        bit = SLOT_BITS.get(slot_time)
+        if bit is not None:
+            booked[(doctor_id, date)] |= 1 << bit
+    return booked
+
+
+class AvailabilityIndex:
+    # The lock only guards the dictionaries. Loads from the database run
+    # outside it and are installed afterwards only if nothing changed the
+    # index meanwhile (``_version``); otherwise the result serves that one
+    # lookup and the next lookup loads again.
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._doctors = {}             # doctor id -> (specialization key, weekday mask, full name)
+        self._by_specialization = {}   # specialization key -> sorted doctor ids
+        self._doctors_loaded_at = None
+        self._booked = {}              # (doctor id, date) -> booked slot bitmask
+        self._loaded = {}              # (specialization key, date) -> loaded at
+        self._version = 0              # bumped by every change
+
+    # -- loading --
+
+    def _install_doctors(self, doctors, by_specialization, loaded_at):
+        self._doctors = doctors
+        self._by_specialization = by_specialization
+        self._doctors_loaded_at = loaded_at
+
+        # Days that have passed can no longer be booked; drop their bitmasks.
+        today = timezone.localdate()
+        self._booked = {k: v for k, v in self._booked.items() if k[1] >= today}
+        self._loaded = {k: v for k, v in self._loaded.items() if k[1] >= today}
+
+    def _reindex_specializations(self):
+        self._by_specialization = _by_specialization(self._doctors)
+
+    def _current_doctors(self):
+        with self._lock:
+            version, loaded_at = self._version, self._doctors_loaded_at
+            if loaded_at is not None and time.monotonic() - loaded_at < DOCTOR_TTL:
+                return self._doctors, self._by_specialization
+        loaded_at = time.monotonic()
+        doctors = _read_doctors()
+        by_specialization = _by_specialization(doctors)
+        with self._lock:
+            if self._version == version:
+                self._install_doctors(doctors, by_specialization, loaded_at)
+        return doctors, by_specialization
+
+    def _current_bookings(self, key, doctor_ids, dates):
+        # A mapping (doctor id, date) -> booked bitmask covering ``dates``.
+        with self._lock:
+            version, now = self._version, time.monotonic()
+            stale = [d for d in dates if now - self._loaded.get((key, d), -BOOKINGS_TTL) >= BOOKINGS_TTL]
+            booked = self._booked
+        if not stale or not doctor_ids:
+            return booked
+
+        loaded = _read_bookings(doctor_ids, stale)
+        with self._lock:
+            if self._version == version:
+                self._booked.update(loaded)
+                for d in stale:
+                    self._loaded[(key, d)] = now
+                return self._booked
+        return ChainMap(loaded, booked)
+
+    # -- queries --
+
+    def earliest_free(self, specialization, start, days, limit):
+        key = _specialization_key(specialization)
+        dates = [start + datetime.timedelta(days=i) for i in range(days)]
+        doctors, by_specialization = self._current_doctors()
+        doctor_ids = by_specialization.get(key, [])
+        booked = self._current_bookings(key, doctor_ids, dates)
+
+        now = timezone.localtime()
+        results = []
+        for date in dates:
+            day_bit = 1 << date.weekday()
+            open_mask = FULL_DAY
+            if date == now.date():
+                open_mask &= ~((1 << sum(1 for t in SLOTS if t <= now.time())) - 1)
+
+            free = []
+            for pk in doctor_ids:
+                _, weekday_mask, full_name = doctors[pk]
+                if weekday_mask & day_bit:
+                    mask = open_mask & ~booked.get((pk, date), 0)
+                    if mask:
+                        free.append((pk, full_name, mask))
+
+            # Walk slot by slot so results come out ordered by (date, time, doctor)
+            for bit, slot_time in enumerate(SLOTS):
+                for pk, full_name, mask in free:
+                    if mask >> bit & 1:
+                        results.append((date, slot_time, pk, full_name))
+                        if len(results) == limit:
+                            return results
+        return results
+
+    # -- incremental updates --
+
+    def mark(self, doctor_id, date, slot_time, booked):
+        bit = SLOT_BITS.get(slot_time)
+        if bit is None:
+            return
+        with self._lock:
+            self._version += 1
+            if (doctor_id, date) not in self._booked:
+                return
+            if booked:
+                self._booked[(doctor_id, date)] |= 1 << bit
+            else:
+                self._booked[(doctor_id, date)] &= ~(1 << bit)
+
+    def update_doctor(self, doctor):
+        with self._lock:
+            self._version += 1
+            if self._doctors_loaded_at is None:
+                return
+            key = _specialization_key(doctor.specialization)
+            self._doctors = {**self._doctors, doctor.pk: (key, _weekday_mask(doctor.available_days), doctor.full_name)}
+            self._reindex_specializations()
+            # The doctor's bookings may not be loaded for this specialization yet.
+            self._loaded = {k: v for k, v in self._loaded.items() if k[0] != key}
+
+    def remove_doctor(self, doctor_id):
+        with self._lock:
+            self._version += 1
+            if doctor_id in self._doctors:
+                self._doctors = {pk: doctor for pk, doctor in self._doctors.items() if pk != doctor_id}
+                self._reindex_specializations()
+
+    def clear(self):
+        with self._lock:
+            self._version += 1
+            self._doctors = {}
+            self._by_specialization = {}
+            self._doctors_loaded_at = None
+            self._booked = {}
+            self._loaded = {}
+
+
+index = AvailabilityIndex()
@@ -0,0 +1,661 @@
+import asyncio
+import datetime
+import io
+import json
+import platform
+import random
+import subprocess
+import sys
+import threading
+import time
+import tracemalloc
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import ExitStack, contextmanager
+from urllib.parse import urlencode
+from wsgiref.simple_server import WSGIRequestHandler, make_server
+
+import django
+from django.apps import apps
+from django.conf import settings
+from django.core.asgi import get_asgi_application
+from django.core.wsgi import get_wsgi_application
+from django.db import connection, connections
+from django.middleware.csrf import CSRF_SECRET_LENGTH
+from django.test import Client, override_settings
+from django.urls import reverse
+from django.utils.crypto import get_random_string
+
+from .models import CustomUser, PatientProfile, Bill, MedicalHistory, Prescription
+
+
+# --- Benchmark harness ---
+# Drives the main pages as a logged-in patient, doctor or admin (or
+# anonymously) and records latency percentiles, queries per request and
+# peak Python memory per request. Requests go through the test client, or
+# with ``server=True`` over HTTP to a local WSGI server running in this
+# process. Latency is measured on untraced requests; memory comes from a
+# few extra requests run under tracemalloc, which is too slow to leave on.
+#
+# The JSON report is meant to be committed or archived per commit and
+# compared with ``compare_reports``.
+
+class Scenario:
+    def __init__(self, name, url_name, role=None, args=(), query=''):
+        self.name = name
+        self.url_name = url_name
+        self.role = role
+        self.args = args        # keys into the sample, e.g. ('bill',)
+        self.query = query
+
+    def url(self, sample):
+        return reverse(self.url_name, args=[sample[key] for key in self.args]) + self.query
+
+
+SCENARIOS = [
+    Scenario('home', 'home'),
+    Scenario('about', 'about'),
+    Scenario('login_form', 'login'),
+    Scenario('announcements', 'announcements'),
+    Scenario('health_bulletin', 'health_bulletin'),
+    Scenario('medical_research', 'medical_research'),
+    Scenario('publications', 'publications'),
+    Scenario('patient_dashboard', 'patient_dashboard', 'patient'),
+    Scenario('book_appointment', 'book_appointments', 'patient'),
+    Scenario('availability_search', 'availability_search', 'patient', query='?specialization=General'),
+    Scenario('doctor_list', 'doctor_list', 'patient'),
+    Scenario('view_bills', 'view_bill', 'patient', args=('bill',)),
+    Scenario('view_prescription', 'view_prescription', 'patient', args=('prescription',)),
+    Scenario('doctor_dashboard', 'doctor_dashboard', 'doctor'),
+    Scenario('doctor_appointments', 'doctor_appointments', 'doctor'),
+    Scenario('patient_management', 'patient_management', 'doctor'),
+    Scenario('patient_search', 'patient_management', 'doctor', query='?q=nair'),
+    Scenario('patient_appointments', 'view_patient_appointments', 'doctor', args=('patient',)),
+    Scenario('view_medical_history', 'view_medical_history', 'doctor', args=('medical_history',)),
+    Scenario('admin_dashboard', 'admin_dashboard', 'admin'),
+    Scenario('manage_users', 'manage_users', 'admin'),
+    Scenario('manage_appointments', 'manage_appointments', 'admin'),
+    Scenario('manage_facilities', 'manage_facilities', 'admin'),
+    Scenario('manage_resources', 'manage_resources', 'admin'),
+]
+
+
+def sample_values():
+    # One user per role plus record ids they are allowed to see. Keys are
+    # missing when the database has no such rows; those scenarios are skipped.
+    sample = {
+        'doctor_user': CustomUser.objects.filter(is_doctor=True, doctorprofile__isnull=False).order_by('pk').first(),
+        'admin_user': CustomUser.objects.filter(is_admin=True).order_by('pk').first(),
+    }
+    bill = Bill.objects.select_related('patient__user').order_by('pk').first()
+    patient = bill.patient if bill else PatientProfile.objects.select_related('user').order_by('pk').first()
+    if patient:
+        sample.update(patient=patient.pk, patient_user=patient.user)
+        prescription = Prescription.objects.filter(patient=patient).values_list('pk', flat=True).first()
+        if prescription:
+            sample['prescription'] = prescription
+    if bill:
+        sample['bill'] = bill.pk
+    history = MedicalHistory.objects.order_by('pk').values_list('pk', flat=True).first()
+    if history:
+        sample['medical_history'] = history
+    return {k: v for k, v in sample.items() if v is not None}
+
+
+class QueryCounter:
+    def __init__(self):
+        self.count = 0
+
+    def __call__(self, execute, sql, params, many, context):
+        self.count += 1
+        return execute(sql, params, many, context)
+
+
+def percentile(values, p):
+    # Nearest-rank percentile of a non-empty list.
+    ordered = sorted(values)
+    rank = max(int(round(p / 100 * len(ordered) + 0.5)) - 1, 0)
+    return ordered[min(rank, len(ordered) - 1)]
+
+
+def summarize(values, digits=2):
+    return {
+        'p50': round(percentile(values, 50), digits),
+        'p95': round(percentile(values, 95), digits),
+        'p99': round(percentile(values, 99), digits),
+        'mean': round(sum(values) / len(values), digits),
+        'max': round(max(values), digits),
+    }
+
+
+def counting_queries(counter):
+    # Counts queries on every connection, replicas included.
+    stack = ExitStack()
+    for conn in connections.all():
+        stack.enter_context(conn.execute_wrapper(counter))
+    return stack
+
+
+class ClientTransport:
+    def __init__(self):
+        self.clients = {}
+
+    def login(self, role, user):
+        client = Client()
+        if user is not None:
+            client.force_login(user)
+        self.clients[role] = client
+
+    def get(self, role, url):
+        # Returns (status, query count).
+        counter = QueryCounter()
+        with counting_queries(counter):
+            response = self.clients[role].get(url)
+            if response.streaming:
+                b''.join(response.streaming_content)
+        return response.status_code, counter.count
+
+    def close(self):
+        pass
+
+
+class MeasuredApplication:
+    # Wraps the WSGI app to count the queries each request runs, including
+    # those made while a streaming body is consumed.
+    def __init__(self, application):
+        self.application = application
+        self.queries = 0
+
+    def __call__(self, environ, start_response):
+        counter = QueryCounter()
+        with counting_queries(counter):
+            result = self.application(environ, start_response)
+            try:
+                body = b''.join(result)
+            finally:
+                if hasattr(result, 'close'):
+                    result.close()
+        self.queries = counter.count
+        return [body]
+
+
+def session_cookie(user):
+    # Reuse the test client's session machinery to get a Cookie header value.
+    if user is None:
+        return ''
+    client = Client()
+    client.force_login(user)
+    return f'{settings.SESSION_COOKIE_NAME}={client.cookies[settings.SESSION_COOKIE_NAME].value}'
+
+
+class QuietHandler(WSGIRequestHandler):
+    def log_message(self, *args):
+        pass
+
+
+class NoRedirect(urllib.request.HTTPRedirectHandler):
+    # Report redirects (e.g. to the login page) instead of following them.
+    def redirect_request(self, *args, **kwargs):
+        return None
+
+
+class ServerTransport:
+    def __init__(self):
+        self.app = MeasuredApplication(get_wsgi_application())
+        self.server = make_server('127.0.0.1', 0, self.app, handler_class=QuietHandler)
+        self.base = f'http://127.0.0.1:{self.server.server_port}'
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+        self.opener = urllib.request.build_opener(NoRedirect)
+        self.cookies = {}
+
+    def login(self, role, user):
+        self.cookies[role] = session_cookie(user)
+
+    def get(self, role, url):
+        request = urllib.request.Request(self.base + url, headers={'Cookie': self.cookies[role]})
+        try:
+            with self.opener.open(request) as response:
+                response.read()
+                status = response.status
+        except urllib.error.HTTPError as e:
+            status = e.code
+        return status, self.app.queries
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+def git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              cwd=settings.BASE_DIR, timeout=5).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def row_counts():
+    return {model.__name__: model.objects.count() for model in apps.get_app_config('hospitalapp').get_models()}
+
+
+def run_scenario(transport, scenario, url, iterations, warmup, memory_samples):
+    for _ in range(warmup):
+        transport.get(scenario.role, url)
+
+    latencies, queries, statuses = [], [], {}
+    for _ in range(iterations):
+        started = time.perf_counter()
+        status, count = transport.get(scenario.role, url)
+        latencies.append((time.perf_counter() - started) * 1000)
+        queries.append(count)
+        statuses[str(status)] = statuses.get(str(status), 0) + 1
+
+    memory = []
+    tracemalloc.start()
+    try:
+        for _ in range(memory_samples):
+            tracemalloc.reset_peak()
+            baseline = tracemalloc.get_traced_memory()[0]
+            transport.get(scenario.role, url)
+            memory.append((tracemalloc.get_traced_memory()[1] - baseline) / 1024)
+    finally:
+        tracemalloc.stop()
+
+    result = {
+        'url': url,
+        'role': scenario.role,
+        'status': statuses,
+        'latency_ms': summarize(latencies),
+        'queries': summarize(queries, 1),
+    }
+    if memory:
+        result['memory_kib'] = summarize(memory, 1)
+    return result
+
+
+def run_benchmark(iterations=50, warmup=5, memory_samples=5, server=False, only=None, progress=None):
+    hosts = [*settings.ALLOWED_HOSTS, 'testserver', '127.0.0.1']
+    with override_settings(ALLOWED_HOSTS=hosts):
+        sample = sample_values()
+        transport = ServerTransport() if server else ClientTransport()
+        try:
+            for role in (None, 'patient', 'doctor', 'admin'):
+                transport.login(role, sample.get(f'{role}_user') if role else None)
+
+            report = {
+                'meta': {
+                    'started': datetime.datetime.now(datetime.timezone.utc).isoformat(timespec='seconds'),
+                    'revision': git_revision(),
+                    'python': platform.python_version(),
+                    'django': django.get_version(),
+                    'database': connection.vendor,
+                    'transport': 'wsgi' if server else 'client',
+                    'iterations': iterations,
+                    'warmup': warmup,
+                    'memory_samples': memory_samples,
+                    'rows': row_counts(),
+                },
+                'scenarios': {},
+                'skipped': [],
+            }
+            for scenario in SCENARIOS:
+                if only and scenario.name not in only:
+                    continue
+                if (scenario.role and f'{scenario.role}_user' not in sample) or any(k not in sample for k in scenario.args):
+                    report['skipped'].append(scenario.name)
+                    continue
+                result = run_scenario(transport, scenario, scenario.url(sample), iterations, warmup, memory_samples)
+                report['scenarios'][scenario.name] = result
+                if progress:
+                    progress(scenario.name, result)
+        finally:
+            transport.close()
+    return report
+
+
+def compare_reports(old, new, metrics=(('latency_ms', 'p95'), ('queries', 'p50'), ('memory_kib', 'p50'))):
+    # Yields (scenario, metric, old value, new value, relative change).
+    for name, result in new['scenarios'].items():
+        before = old.get('scenarios', {}).get(name)
+        if before is None:
+            continue
+        for group, stat in metrics:
+            if group in result and group in before:
+                a, b = before[group][stat], result[group][stat]
+                change = (b - a) / a if a else (0.0 if b == a else float('inf'))
+                yield name, f'{group}.{stat}', a, b, change
+
+
+def write_report(report, path):
+    with open(path, 'w') as f:
+        json.dump(report, f, indent=2, sort_keys=True)
+
+
+# --- WSGI vs ASGI throughput ---
+# Sends ``requests`` GETs per scenario straight into Django's WSGI and ASGI
+# handlers, with no sockets in between, so the figures are the
+# application's own cost. WSGI requests run on a pool of ``wsgi_threads``
+# threads, like a threaded WSGI server, so at most that many are in
+# flight. ASGI requests run as tasks on one event loop with up to
+# ``concurrency`` in flight; sync views and middleware still hop to a
+# thread per request there, async ones do not.
+#
+# Under ASGI each request's sync code runs on a thread of its own, so
+# persistent connections would pile up. The ASGI run uses CONN_MAX_AGE = 0,
+# as hospitalproject/asgi.py does.
+
+THROUGHPUT_SCENARIOS = ('announcements', 'patient_dashboard', 'doctor_appointments', 'manage_appointments',
+                        'doctor_list')
+
+
+@contextmanager
+def connection_max_age(seconds):
+    saved = {alias: connections.settings[alias]['CONN_MAX_AGE'] for alias in connections}
+    for alias in saved:
+        connections.settings[alias]['CONN_MAX_AGE'] = seconds
+    try:
+        yield
+    finally:
+        connections.close_all()
+        for alias, value in saved.items():
+            connections.settings[alias]['CONN_MAX_AGE'] = value
+
+
+def wsgi_request(application, method, url, cookie='', body=b'', content_type='', remote_addr='127.0.0.1'):
+    path, _, query = url.partition('?')
+    environ = {
+        'REQUEST_METHOD': method, 'PATH_INFO': path, 'QUERY_STRING': query, 'SCRIPT_NAME': '',
+        'SERVER_NAME': '127.0.0.1', 'SERVER_PORT': '80', 'SERVER_PROTOCOL': 'HTTP/1.1',
+        'HTTP_HOST': '127.0.0.1', 'HTTP_COOKIE': cookie, 'REMOTE_ADDR': remote_addr,
+        'CONTENT_TYPE': content_type, 'CONTENT_LENGTH': str(len(body)),
+        'wsgi.version': (1, 0), 'wsgi.url_scheme': 'http', 'wsgi.input': io.BytesIO(body), 'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True, 'wsgi.multiprocess': False, 'wsgi.run_once': False,
+    }
+    statuses = []
+    result = application(environ, lambda status, headers, exc_info=None: statuses.append(int(status[:3])))
+    try:
+        for _ in result:
+            pass
+    finally:
+        if hasattr(result, 'close'):
+            result.close()
+    return statuses[0]
+
+
+def wsgi_get(application, url, cookie):
+    return wsgi_request(application, 'GET', url, cookie)
+
+
+async def asgi_get(application, url, cookie):
+    path, _, query = url.partition('?')
+    scope = {
+        'type': 'http', 'asgi': {'version': '3.0'}, 'http_version': '1.1', 'method': 'GET', 'scheme': 'http',
+        'path': path, 'raw_path': path.encode(), 'query_string': query.encode(), 'root_path': '',
+        'headers': [(b'host', b'127.0.0.1'), (b'cookie', cookie.encode())],
+        'client': ('127.0.0.1', 0), 'server': ('127.0.0.1', 80),
+    }
+    received = False
+    status = None
+
+    async def receive():
+        nonlocal received
+        if received:
+            # The client never disconnects; Django cancels this wait once it has responded.
+            await asyncio.Event().wait()
+        received = True
+        return {'type': 'http.request', 'body': b'', 'more_body': False}
+
+    async def send(message):
+        nonlocal status
+        if message['type'] == 'http.response.start':
+            status = message['status']
+
+    await application(scope, receive, send)
+    return status
+
+
+def _throughput(results, elapsed):
+    statuses = {}
+    for status, _ in results:
+        statuses[str(status)] = statuses.get(str(status), 0) + 1
+    return {
+        'requests': len(results),
+        'seconds': round(elapsed, 3),
+        'requests_per_second': round(len(results) / elapsed, 1) if elapsed else None,
+        'latency_ms': summarize([ms for _, ms in results]),
+        'status': statuses,
+    }
+
+
+def run_wsgi(application, url, cookie, requests, threads):
+    def timed(_):
+        started = time.perf_counter()
+        status = wsgi_get(application, url, cookie)
+        return status, (time.perf_counter() - started) * 1000
+
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        started = time.perf_counter()
+        results = list(pool.map(timed, range(requests)))
+        return _throughput(results, time.perf_counter() - started)
+
+
+def run_asgi(application, url, cookie, requests, concurrency):
+    async def run():
+        slots = asyncio.Semaphore(concurrency)
+
+        async def timed():
+            async with slots:
+                started = time.perf_counter()
+                status = await asgi_get(application, url, cookie)
+                return status, (time.perf_counter() - started) * 1000
+
+        started = time.perf_counter()
+        results = await asyncio.gather(*(timed() for _ in range(requests)))
+        return _throughput(results, time.perf_counter() - started)
+
+    with connection_max_age(0):
+        return asyncio.run(run())
+
+
+def run_throughput(requests=500, concurrency=64, wsgi_threads=8, only=None, progress=None):
+    hosts = [*settings.ALLOWED_HOSTS, 'testserver', '127.0.0.1']
+    with override_settings(ALLOWED_HOSTS=hosts):
+        sample = sample_values()
+        cookies = {role: session_cookie(sample.get(f'{role}_user') if role else None)
+                   for role in (None, 'patient', 'doctor', 'admin')}
+        wsgi, asgi = get_wsgi_application(), get_asgi_application()
+        report = {
+            'meta': {
+                'started': datetime.datetime.now(datetime.timezone.utc).isoformat(timespec='seconds'),
+                'revision': git_revision(),
+                'python': platform.python_version(),
+                'django': django.get_version(),
+                'database': connection.vendor,
+                'requests': requests,
+                'concurrency': concurrency,
+                'wsgi_threads': wsgi_threads,
+            },
+            'scenarios': {},
+            'skipped': [],
+        }
+        names = only or THROUGHPUT_SCENARIOS
+        for scenario in SCENARIOS:
+            if scenario.name not in names:
+                continue
+            if (scenario.role and f'{scenario.role}_user' not in sample) or any(k not in sample for k in scenario.args):
+                report['skipped'].append(scenario.name)
+                continue
+            url, cookie = scenario.url(sample), cookies[scenario.role]
+            result = {
+                'url': url,
+                'wsgi': run_wsgi(wsgi, url, cookie, requests, min(wsgi_threads, concurrency)),
+                'asgi': run_asgi(asgi, url, cookie, requests, concurrency),
+            }
+            report['scenarios'][scenario.name] = result
+            if progress:
+                progress(scenario.name, result)
+    return report
+
+
+# --- Login under attack ---
+# Measures legitimate login latency while a credential-stuffing burst hits
+# the login form, once with login throttling on and once with it off.
+# Requests go into the WSGI handler as above. A simulated server with
+# ``workers`` threads serves them: every request, legitimate or not, waits
+# for a free worker, and that wait counts in its latency.
+#
+# Each run has two phases:
+#   - baseline: a legitimate client logs in ``logins`` times, each time as
+#     one of a few users from that user's own address, on a quiet server;
+#   - under attack: the same logins, while the attack posts up to
+#     ``attack_rate`` wrong passwords per second for random usernames. The
+#     attempts come from ``attack_ips`` addresses, with at most
+#     ``attackers`` in flight at once.
+# The measured logins start once every attack address has been throttled,
+# or after ``ramp`` seconds, so they see the steady state of the burst.
+# With throttling on, an attack address gets 429 once it reaches
+# LOGIN_THROTTLE_PER_IP failures, and from then on none of its attempts
+# hashes a password. With throttling off, every attempt hashes, and once
+# the rate exceeds what the workers can hash they saturate.
+#
+# The users logged in as are created for the run and deleted afterwards.
+
+LOGIN_PASSWORD = 'load-test-password'
+LOGIN_USERS = 5
+
+
+def login_post(application, username, password, remote_addr):
+    # The CSRF secret goes in both the cookie and the form field.
+    token = get_random_string(CSRF_SECRET_LENGTH)
+    body = urlencode({'username': username, 'password': password, 'csrfmiddlewaretoken': token}).encode()
+    return wsgi_request(application, 'POST', reverse('login'), f'{settings.CSRF_COOKIE_NAME}={token}', body,
+                        'application/x-www-form-urlencoded', remote_addr)
+
+
+def _timed_login(application, slots, username, password, remote_addr):
+    started = time.perf_counter()
+    with slots:
+        status = login_post(application, username, password, remote_addr)
+    return status, (time.perf_counter() - started) * 1000
+
+
+def _legitimate_logins(application, slots, usernames, logins):
+    return [_timed_login(application, slots, usernames[i % len(usernames)], LOGIN_PASSWORD,
+                         f'192.0.2.{i % len(usernames) + 1}') for i in range(logins)]
+
+
+def _attack(application, slots, stop, addresses, rate, attackers, results, throttled):
+    # Open loop: attempts go out at ``rate`` per second whether or not
+    # earlier ones have been answered. With ``attackers`` attempts already
+    # in flight the next one is skipped, as a client out of connections
+    # would; queuing it instead would replay the backlog at full speed later.
+    in_flight = threading.BoundedSemaphore(attackers)
+
+    def attempt(address):
+        try:
+            status, ms = _timed_login(application, slots, f'user{random.randrange(10 ** 6)}', 'wrong-password',
+                                      address)
+        finally:
+            in_flight.release()
+        results.append((status, ms))
+        if status == 429:
+            throttled.add(address)
+
+    with ThreadPoolExecutor(max_workers=attackers) as pool:
+        tick, started = 0, time.perf_counter()
+        while not stop.is_set():
+            if in_flight.acquire(blocking=False):
+                pool.submit(attempt, addresses[tick % len(addresses)])
+            tick += 1
+            stop.wait(max(0, started + tick / rate - time.perf_counter()))
+
+
+def _status_counts(results):
+    counts = {}
+    for status, _ in results:
+        counts[str(status)] = counts.get(str(status), 0) + 1
+    return counts
+
+
+def run_login_phase(application, usernames, logins, attack_rate, attackers, attack_ips, workers, ramp):
+    slots = threading.BoundedSemaphore(workers)
+    baseline = _legitimate_logins(application, slots, usernames, logins)
+
+    # A fresh block of attack addresses, so counters left by an earlier phase do not count.
+    block = random.randrange(256)
+    addresses = [f'198.18.{block}.{i + 1}' for i in range(attack_ips)]
+    stop, attack_results, throttled = threading.Event(), [], set()
+    attack = threading.Thread(target=_attack, args=(application, slots, stop, addresses, attack_rate, attackers,
+                                                    attack_results, throttled))
+    started = time.perf_counter()
+    attack.start()
+    try:
+        # Without a per-IP limit nothing gets throttled, and the burst is at full strength at once.
+        expected = attack_ips if getattr(settings, 'LOGIN_THROTTLE_PER_IP', 0) else 0
+        while len(throttled) < expected and time.perf_counter() - started < ramp:
+            time.sleep(0.05)
+        ramped = time.perf_counter() - started
+        under_attack = _legitimate_logins(application, slots, usernames, logins)
+    finally:
+        stop.set()
+        attack.join()
+    attack = _throughput(attack_results, time.perf_counter() - started)
+
+    result = {
+        'baseline': {'latency_ms': summarize([ms for _, ms in baseline]), 'status': _status_counts(baseline)},
+        'under_attack': {'latency_ms': summarize([ms for _, ms in under_attack]),
+                         'status': _status_counts(under_attack)},
+        'attack': attack,
+        'ramp_seconds': round(ramped, 3),
+    }
+    base, loaded = result['baseline']['latency_ms']['p50'], result['under_attack']['latency_ms']['p50']
+    result['slowdown_p50'] = round(loaded / base, 2) if base else None
+    return result
+
+
+def run_login_burst(logins=20, attack_rate=200, attackers=64, attack_ips=8, workers=8, ramp=60, unthrottled=True,
+                    progress=None):
+    hosts = [*settings.ALLOWED_HOSTS, 'testserver', '127.0.0.1']
+    suffix = get_random_string(6).lower()
+    users = [CustomUser.objects.create_user(username=f'loadtest{i}_{suffix}', password=LOGIN_PASSWORD, is_patient=True)
+             for i in range(LOGIN_USERS)]
+    usernames = [user.username for user in users]
+    report = {
+        'meta': {
+            'started': datetime.datetime.now(datetime.timezone.utc).isoformat(timespec='seconds'),
+            'revision': git_revision(),
+            'python': platform.python_version(),
+            'django': django.get_version(),
+            'database': connection.vendor,
+            'hasher': settings.PASSWORD_HASHERS[0],
+            'logins': logins,
+            'attack_rate': attack_rate,
+            'attackers': attackers,
+            'attack_ips': attack_ips,
+            'workers': workers,
+            'throttle': {
+                'window': getattr(settings, 'LOGIN_THROTTLE_WINDOW', None),
+                'per_ip': getattr(settings, 'LOGIN_THROTTLE_PER_IP', 0),
+                'per_username': getattr(settings, 'LOGIN_THROTTLE_PER_USERNAME', 0),
+            },
+        },
+        'modes': {},
+    }
+    modes = [('throttled', {})]
+    if unthrottled:
+        modes.append(('unthrottled', {'LOGIN_THROTTLE_PER_IP': 0, 'LOGIN_THROTTLE_PER_USERNAME': 0}))
+    try:
+        with override_settings(ALLOWED_HOSTS=hosts):
+            application = get_wsgi_application()
+            for name, overrides in modes:
+                with override_settings(**overrides):
+                    result = run_login_phase(application, usernames, logins, attack_rate, attackers, attack_ips,
+                                             workers, ramp)
+                report['modes'][name] = result
+                if progress:
+                    progress(name, result)
+    finally:
+        CustomUser.objects.filter(pk__in=[user.pk for user in users]).delete()
+    return report
@@ -0,0 +1,166 @@
+import csv
+import json
+import zlib
+
+from django.core.serializers.json import DjangoJSONEncoder
+
+from .models import MedicalHistory, Prescription, Bill
+
+
+# --- Streaming export ---
+# Rows are read in primary-key order, one bounded batch at a time
+# (``WHERE id > last ORDER BY id LIMIT n``), with patient and doctor names
+# joined in the same query. Memory stays flat however many rows there are,
+# including on MySQL where .iterator() cannot stream from the server.
+#
+# iter_export serves WSGI and the management command. Under ASGI, Django
+# reads a synchronous iterator to the end before sending anything, so the
+# export view hands ASGI requests aiter_export instead, which fetches each
+# batch with the async ORM and yields as it goes.
+
+EXPORT_CHUNK_SIZE = 2000
+
+# dataset -> (model, [(column, field path)])
+DATASETS = {
+    'medical_history': (MedicalHistory, [
+        ('id', 'id'),
+        ('patient_id', 'patient_id'),
+        ('patient', 'patient__full_name'),
+        ('doctor', 'doctor__full_name'),
+        ('date', 'date'),
+        ('diagnosis', 'diagnosis'),
+        ('treatment_history', 'treatment_history'),
+        ('medications', 'medications'),
+        ('allergies', 'allergies'),
+        ('notes', 'notes'),
+    ]),
+    'prescriptions': (Prescription, [
+        ('id', 'id'),
+        ('patient_id', 'patient_id'),
+        ('patient', 'patient__full_name'),
+        ('doctor', 'doctor__full_name'),
+        ('date_issued', 'date_issued'),
+        ('medication_name', 'medication_name'),
+        ('dosage', 'dosage'),
+        ('frequency', 'frequency'),
+        ('duration', 'duration'),
+        ('notes', 'notes'),
+    ]),
+    'bills': (Bill, [
+        ('id', 'id'),
+        ('patient_id', 'patient_id'),
+        ('patient', 'patient__full_name'),
+        ('doctor', 'doctor__full_name'),
+        ('date', 'date'),
+        ('amount', 'amount'),
+        ('paid', 'paid'),
+        ('payment_method', 'payment_method'),
+        ('description', 'description'),
+    ]),
+}
+
+CONTENT_TYPES = {
+    'csv': 'text/csv',
+    'ndjson': 'application/x-ndjson',
+}
+
+
+def _batch(dataset, last, chunk_size):
+    model, columns = DATASETS[dataset]
+    return model.objects.filter(pk__gt=last).order_by('pk').values_list(*[path for _, path in columns])[:chunk_size]
+
+
+def iter_batches(dataset, chunk_size=EXPORT_CHUNK_SIZE):
+    last = 0
+    while True:
+        batch = list(_batch(dataset, last, chunk_size))
+        if not batch:
+            return
+        yield batch
+        last = batch[-1][0]
+
+
+async def aiter_batches(dataset, chunk_size=EXPORT_CHUNK_SIZE):
+    last = 0
+    while True:
+        batch = [row async for row in _batch(dataset, last, chunk_size)]
+        if not batch:
+            return
+        yield batch
+        last = batch[-1][0]
+
+
+def iter_rows(dataset, chunk_size=EXPORT_CHUNK_SIZE):
+    for batch in iter_batches(dataset, chunk_size):
+        yield from batch
+
+
+class _Echo:
+    # csv.writer only needs an object with write(); hand each line back.
+    def write(self, value):
+        return value
+
+
+class _Blocks:
+    # Encodes rows and groups them into blocks of bytes, so gzip and the
+    # socket see reasonably sized writes rather than one call per row.
+    def __init__(self, dataset, fmt, compress, block_size):
+        self.header = [name for name, _ in DATASETS[dataset][1]]
+        self.fmt = fmt
+        self.gzip = zlib.compressobj(6, zlib.DEFLATED, 31) if compress else None
+        self.block_size = block_size
+        self.buffer, self.size = [], 0
+        if fmt == 'csv':
+            self.writer = csv.writer(_Echo())
+            self._append(self.writer.writerow(self.header))
+        else:
+            self.encoder = DjangoJSONEncoder()
+
+    def _append(self, line):
+        data = line.encode()
+        self.buffer.append(data)
+        self.size += len(data)
+
+    def _take(self):
+        block = b''.join(self.buffer)
+        self.buffer, self.size = [], 0
+        return block
+
+    def feed(self, rows):
+        # The blocks completed by ``rows``.
+        blocks = []
+        for row in rows:
+            if self.fmt == 'csv':
+                self._append(self.writer.writerow(row))
+            else:
+                self._append(self.encoder.encode(dict(zip(self.header, row))) + '\n')
+            if self.size >= self.block_size:
+                block = self._take()
+                blocks.append(self.gzip.compress(block) if self.gzip else block)
+        return [block for block in blocks if block]
+
+    def close(self):
+        block = self._take()
+        if self.gzip:
+            block = self.gzip.compress(block) + self.gzip.flush()
+        return [block] if block else []
+
+
+def iter_export(dataset, fmt, compress=False, block_size=64 * 1024, chunk_size=EXPORT_CHUNK_SIZE):
+    blocks = _Blocks(dataset, fmt, compress, block_size)
+    for batch in iter_batches(dataset, chunk_size):
+        yield from blocks.feed(batch)
+    yield from blocks.close()
+
+
+async def aiter_export(dataset, fmt, compress=False, block_size=64 * 1024, chunk_size=EXPORT_CHUNK_SIZE):
+    blocks = _Blocks(dataset, fmt, compress, block_size)
+    async for batch in aiter_batches(dataset, chunk_size):
+        for block in blocks.feed(batch):
+            yield block
+    for block in blocks.close():
+        yield block
+
+
+def export_filename(dataset, fmt, compress=False):
+    return f'{dataset}.{fmt}' + ('.gz' if compress else '')
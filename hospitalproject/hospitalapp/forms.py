@@ -1,6 +1,7 @@
 from django import forms
 from django.contrib.auth import get_user_model
 from django.contrib.auth.forms import UserCreationForm, UserChangeForm, BaseUserCreationForm
+from django.db.models import Q
 from .models import PatientProfile, DoctorProfile, Appointment, Facility, AdminProfile, Prescription, Bill, \
     HealthEducationResource
 
@@ -55,6 +56,74 @@ class AppointmentForm(forms.ModelForm):
         fields = ['doctor', 'date', 'time']
 
 
+class AppointmentFilterForm(forms.Form):
+    status = forms.ChoiceField(choices=[('', 'All statuses')] + Appointment.STATUS_CHOICES, required=False)
+    doctor = forms.IntegerField(required=False, min_value=1, widget=forms.HiddenInput)
+    patient = forms.IntegerField(required=False, min_value=1, widget=forms.HiddenInput)
+    date_from = forms.DateField(required=False, widget=forms.DateInput(attrs={'type': 'date'}))
+    date_to = forms.DateField(required=False, widget=forms.DateInput(attrs={'type': 'date'}))
+
+    def filter(self, queryset):
+        if not self.is_valid():
+            return queryset
+        data = self.cleaned_data
+        if data.get('status'):
+            queryset = queryset.filter(status=data['status'])
+        if data.get('doctor'):
+            queryset = queryset.filter(doctor_id=data['doctor'])
+        if data.get('patient'):
+            queryset = queryset.filter(patient_id=data['patient'])
+        if data.get('date_from'):
+            queryset = queryset.filter(date__gte=data['date_from'])
+        if data.get('date_to'):
+            queryset = queryset.filter(date__lte=data['date_to'])
+        return queryset
+
+
+class UserGridForm(forms.Form):
+    # Each sort option maps to an indexed (column, id) pair; age is the
+    # copy of the profile's age kept on the user (see profiles.py).
+    SORT_CHOICES = [
+        ('name', 'Name (A-Z)'),
+        ('-name', 'Name (Z-A)'),
+        ('-joined', 'Newest first'),
+        ('joined', 'Oldest first'),
+        ('age', 'Youngest first'),
+        ('-age', 'Oldest first (age)'),
+    ]
+    SORT_KEYS = {'name': 'display_name', 'joined': 'date_joined', 'age': 'profile_age'}
+
+    q = forms.CharField(required=False, max_length=150, label='Search',
+                        widget=forms.TextInput(attrs={'placeholder': 'Username or name starts with'}))
+    role = forms.ChoiceField(choices=[('', 'All roles')] + CustomUser.ROLE_CHOICES, required=False)
+    sort = forms.ChoiceField(choices=SORT_CHOICES, required=False)
+
+    def value(self, name):
+        return self.cleaned_data.get(name) if self.is_valid() else None
+
+    @property
+    def is_filtered(self):
+        return bool(self.value('q') or self.value('role'))
+
+    def filter(self, queryset):
+        if self.value('role'):
+            queryset = queryset.filter(role=self.value('role'))
+        if self.value('q'):
+            queryset = queryset.filter(Q(username__istartswith=self.value('q')) |
+                                       Q(display_name__istartswith=self.value('q')))
+        return queryset
+
+    def order(self, queryset):
+        # Returns (queryset, sort key, descending) for sorted_keyset_paginate.
+        sort = self.value('sort') or '-joined'
+        return queryset, self.SORT_KEYS[sort.lstrip('-')], sort.startswith('-')
+
+
+class UserImportForm(forms.Form):
+    file = forms.FileField(help_text="CSV or JSON Lines, one user per row.")
+    format = forms.ChoiceField(choices=[('csv', 'CSV'), ('jsonl', 'JSON Lines')])
+
+
 class FacilityForm(forms.ModelForm):
     class Meta:
         model = Facility
@@ -0,0 +1,73 @@
+import threading
+import time
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.cache import caches
+from django.utils.safestring import mark_safe
+
+
+# --- Dashboard fragment cache ---
+# Rendered dashboard sections are cached per owner ("patient:<id>",
+# "doctor:<id>", or "global" for shared sections) and per section. Each
+# (owner, section) pair has a version number that signals bump whenever the
+# underlying rows change, so every cached page of that section goes stale at
+# once without having to know which pages exist.
+
+FRAGMENT_TIMEOUT = 600
+
+_stats = defaultdict(lambda: {'hits': 0, 'misses': 0})
+_stats_lock = threading.Lock()
+
+
+def fragment_cache():
+    return caches[getattr(settings, 'DASHBOARD_CACHE_ALIAS', 'dashboards')]
+
+
+def _version_key(owner, section):
+    return f'dashfrag:version:{owner}:{section}'
+
+
+def _version(cache, owner, section):
+    key = _version_key(owner, section)
+    # Seeded from the clock: if the version key is ever evicted, the new one
+    # can never collide with fragments stored under the old version.
+    cache.add(key, int(time.time() * 1000), None)
+    return cache.get(key)
+
+
+def version(owner, section):
+    return _version(fragment_cache(), owner, section)
+
+
+def _record(section, outcome):
+    with _stats_lock:
+        _stats[section][outcome] += 1
+
+
+def get_fragment(owner, section, variant=''):
+    cache = fragment_cache()
+    key = f'dashfrag:{owner}:{section}:{_version(cache, owner, section)}:{variant}'
+    html = cache.get(key)
+    _record(section, 'misses' if html is None else 'hits')
+    return key, (mark_safe(html) if html is not None else None)
+
+
+def set_fragment(key, html):
+    fragment_cache().set(key, str(html), FRAGMENT_TIMEOUT)
+    return mark_safe(html)
+
+
+def invalidate(owner, *sections):
+    cache = fragment_cache()
+    for section in sections:
+        try:
+            cache.incr(_version_key(owner, section))
+        except ValueError:
+            # Nothing was ever cached for this owner/section.
+            pass
+
+
+def fragment_stats():
+    with _stats_lock:
+        return {section: dict(counts) for section, counts in _stats.items()}
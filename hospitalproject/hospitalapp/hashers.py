@@ -0,0 +1,36 @@
+from django.conf import settings
+from django.contrib.auth import hashers
+
+
+# --- Password hashing cost ---
+# Each login runs one password hash, and its cost decides how many logins a
+# worker can serve per second. These hashers take their cost from settings
+# (PBKDF2_ITERATIONS, SCRYPT_WORK_FACTOR, ARGON2_TIME_COST,
+# ARGON2_MEMORY_COST), and PASSWORD_HASHER picks the one that new passwords
+# use. Django rehashes a password on the next successful login when it was
+# stored with another hasher or another cost (the setter passed to
+# check_password), so a policy change reaches users as they log in and
+# needs no migration. The algorithm names are Django's own, so existing
+# hashes keep verifying.
+
+class PBKDF2PasswordHasher(hashers.PBKDF2PasswordHasher):
+    @property
+    def iterations(self):
+        return getattr(settings, 'PBKDF2_ITERATIONS', hashers.PBKDF2PasswordHasher.iterations)
+
+
+class ScryptPasswordHasher(hashers.ScryptPasswordHasher):
+    @property
+    def work_factor(self):
+        return getattr(settings, 'SCRYPT_WORK_FACTOR', hashers.ScryptPasswordHasher.work_factor)
+
+
+class Argon2PasswordHasher(hashers.Argon2PasswordHasher):
+    # Needs the argon2-cffi package.
+    @property
+    def time_cost(self):
+        return getattr(settings, 'ARGON2_TIME_COST', hashers.Argon2PasswordHasher.time_cost)
+
+    @property
+    def memory_cost(self):
+        return getattr(settings, 'ARGON2_MEMORY_COST', hashers.Argon2PasswordHasher.memory_cost)
@@ -0,0 +1,287 @@
+import csv
+import hashlib
+import io
+import itertools
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from django.contrib.auth.hashers import make_password
+from django.core.exceptions import ValidationError
+from django.core.files.storage import storages
+from django.core.validators import validate_email
+from django.db import transaction
+from django.db.models import F
+from django.forms import modelform_factory
+
+from .forms import PatientProfileForm, DoctorProfileForm
+from .models import CustomUser, PatientProfile, DoctorProfile, AdminProfile, ImportJob
+from .profiles import profile_age
+from .signals import profiles_created
+
+
+# --- Bulk user import ---
+# Streams CSV or JSON Lines, one user per row:
+#   username, email, password, role (patient/doctor/admin) and the profile
+#   fields for that role (full_name, age, gender, phone, address, plus
+#   specialization/available_days for doctors).
+# Rows are validated a chunk at a time, passwords are hashed in a process
+# pool, and each chunk is written with bulk_create in its own transaction
+# together with the ImportJob checkpoint. Re-running the same file after a
+# failure skips the chunks that were already committed. bulk_create sends
+# no signals, so each chunk hands its profiles to signals.profiles_created.
+#
+# The admin page does not import anything itself: queue_import stores the
+# upload in the "imports" storage and queues a job, and the worker
+# (manage.py run_queued_imports) runs it with the process pool. The
+# import_users command runs a file directly.
+
+DEFAULT_CHUNK_SIZE = 500
+MAX_REPORTED_ERRORS = 100
+
+AdminProfileForm = modelform_factory(AdminProfile, fields=['full_name', 'age', 'gender', 'phone', 'address'])
+
+ROLES = {
+    'patient': (PatientProfile, PatientProfileForm, {'is_patient': True}),
+    'doctor': (DoctorProfile, DoctorProfileForm, {'is_doctor': True}),
+    'admin': (AdminProfile, AdminProfileForm, {'is_admin': True}),
+}
+
+
+class ImportReport:
+    def __init__(self, job):
+        self.job = job
+        self.resumed_from = job.chunks_done
+        self.already_done = job.status == 'completed'
+        self.chunks = 0
+        self.imported = 0
+        self.skipped = 0
+        self.errors = [tuple(error) for error in job.errors]
+        self.started = time.perf_counter()
+        self.elapsed = 0.0
+
+    def add_errors(self, errors):
+        self.skipped += len(errors)
+        room = MAX_REPORTED_ERRORS - len(self.errors)
+        self.errors.extend(errors[:max(room, 0)])
+
+    @property
+    def rows_per_second(self):
+        return self.imported / self.elapsed if self.elapsed else 0.0
+
+
+def file_digest(fileobj):
+    digest = hashlib.sha256()
+    for block in iter(lambda: fileobj.read(1024 * 1024), b''):
+        digest.update(block)
+    fileobj.seek(0)
+    return digest.hexdigest()
+
+
+def read_rows(fileobj, fmt):
+    # Yields (row number, dict or None for an unreadable row).
+    text = io.TextIOWrapper(fileobj, encoding='utf-8-sig', newline='')
+    try:
+        if fmt == 'csv':
+            for number, row in enumerate(csv.DictReader(text), 1):
+                yield number, row
+        else:
+            for number, line in enumerate(text, 1):
+                if not line.strip():
+                    continue
+                try:
+                    row = json.loads(line)
+                except ValueError:
+                    row = None
+                yield number, row if isinstance(row, dict) else None
+    finally:
+        text.detach()
+
+
+def chunked(iterable, size):
+    iterator = iter(iterable)
+    while chunk := list(itertools.islice(iterator, size)):
+        yield chunk
+
+
+def _normalize(row):
+    return {k.strip().lower(): (v.strip() if isinstance(v, str) else v) for k, v in row.items() if k}
+
+
+def validate_chunk(chunk):
+    valid, errors, seen = [], [], set()
+
+    chunk = [(number, _normalize(row) if row is not None else None) for number, row in chunk]
+    usernames = [str(row.get('username') or '') for _, row in chunk if row]
+    taken = set(CustomUser.objects.filter(username__in=usernames).values_list('username', flat=True))
+
+    for number, row in chunk:
+        if row is None:
+            errors.append((number, 'Row could not be parsed.'))
+            continue
+        username = str(row.get('username') or '')
+        role = (row.get('role') or '').lower()
+        try:
+            if role not in ROLES:
+                raise ValidationError(f"Unknown role '{role}'.")
+            CustomUser.username_validator(username)
+            if not username or username in taken or username in seen:
+                raise ValidationError(f"Username '{username}' is missing or already taken.")
+            if row.get('email'):
+                validate_email(row['email'])
+        except ValidationError as e:
+            errors.append((number, ' '.join(e.messages)))
+            continue
+
+        model, form_class, flags = ROLES[role]
+        form = form_class(row)
+        if not form.is_valid():
+            errors.append((number, '; '.join(f'{k}: {" ".join(v)}' for k, v in form.errors.items())))
+            continue
+
+        seen.add(username)
+        valid.append({
+            'username': username,
+            'email': row.get('email') or '',
+            'password': row.get('password') or None,
+            'flags': flags,
+            'role': role,
+            'model': model,
+            'profile': form.cleaned_data,
+        })
+    return valid, errors
+
+
+def _init_worker(settings_module):
+    os.environ.setdefault('DJANGO_SETTINGS_MODULE', settings_module)
+    import django
+    django.setup()
+
+
+def _hash_password(password):
+    # None gives an unusable password, like set_unusable_password().
+    return make_password(password)
+
+
+def _write_chunk(job, valid, errors, hashes, reported):
+    with transaction.atomic():
+        CustomUser.objects.bulk_create([
+            CustomUser(username=row['username'], email=row['email'], password=password, role=row['role'],
+                       display_name=row['profile']['full_name'], profile_age=profile_age(row['profile'].get('age')),
+                       **row['flags'])
+            for row, password in zip(valid, hashes)
+        ])
+        # MySQL does not return primary keys from bulk inserts.
+        usernames = [row['username'] for row in valid]
+        user_ids = dict(CustomUser.objects.filter(username__in=usernames).values_list('username', 'id'))
+
+        created = []
+        for model, _, _ in ROLES.values():
+            profiles = [model(user_id=user_ids[row['username']], **row['profile'])
+                        for row in valid if row['model'] is model]
+            if profiles:
+                model.objects.bulk_create(profiles)
+                created += model.objects.select_related('user').filter(user__username__in=usernames)
+        profiles_created(created)
+
+        ImportJob.objects.filter(pk=job.pk).update(
+            chunks_done=F('chunks_done') + 1,
+            rows_imported=F('rows_imported') + len(valid),
+            rows_skipped=F('rows_skipped') + len(errors),
+            errors=reported,
+        )
+
+
+def run_import(fileobj, filename, fmt, chunk_size=DEFAULT_CHUNK_SIZE, workers=None, progress=None):
+    job, _ = ImportJob.objects.get_or_create(
+        source=file_digest(fileobj),
+        defaults={'filename': filename, 'chunk_size': chunk_size},
+    )
+    report = ImportReport(job)
+    if report.already_done:
+        return report
+
+    job.status = 'running'
+    job.save(update_fields=['status', 'updated_at'])
+
+    # A resumed job keeps its original chunking so chunk numbers line up.
+    chunks = chunked(read_rows(fileobj, fmt), job.chunk_size)
+    for _ in itertools.islice(chunks, job.chunks_done):
+        pass
+
+    workers = workers or os.cpu_count() or 1
+    pool = None
+    if workers > 1:
+        pool = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                   initargs=(os.environ.get('DJANGO_SETTINGS_MODULE', ''),))
+    hash_map = pool.map if pool else map
+
+    try:
+        for chunk in chunks:
+            valid, errors = validate_chunk(chunk)
+            hashes = list(hash_map(_hash_password, [row['password'] for row in valid]))
+            reported = report.errors + errors[:max(MAX_REPORTED_ERRORS - len(report.errors), 0)]
+            _write_chunk(job, valid, errors, hashes, reported)
+
+            report.chunks += 1
+            report.imported += len(valid)
+            report.add_errors(errors)
+            report.elapsed = time.perf_counter() - report.started
+            if progress:
+                progress(report)
+    except Exception:
+        ImportJob.objects.filter(pk=job.pk).update(status='failed')
+        raise
+    finally:
+        if pool:
+            pool.shutdown()
+
+    ImportJob.objects.filter(pk=job.pk).update(status='completed')
+    report.elapsed = time.perf_counter() - report.started
+    return report
+
+
+# --- Queue ---
+
+def import_storage():
+    return storages['imports']
+
+
+def queue_import(fileobj, filename, fmt, chunk_size=DEFAULT_CHUNK_SIZE):
+    # Returns (job, queued). A file that is already queued, running or
+    # completed is not queued again; a failed one is queued to resume.
+    source = file_digest(fileobj)
+    job, created = ImportJob.objects.get_or_create(
+        source=source,
+        defaults={'filename': filename, 'format': fmt, 'chunk_size': chunk_size, 'status': 'queued'},
+    )
+    if not created and job.status != 'failed':
+        return job, False
+    if not job.upload or not import_storage().exists(job.upload):
+        job.upload = import_storage().save(f'{source}.{fmt}', fileobj)
+    job.status = 'queued'
+    job.save(update_fields=['upload', 'status', 'updated_at'])
+    return job, True
+
+
+def claim_job():
+    # The oldest queued job, marked running so no other worker takes it.
+    for job in ImportJob.objects.filter(status='queued').order_by('pk'):
+        if ImportJob.objects.filter(pk=job.pk, status='queued').update(status='running'):
+            job.status = 'running'
+            return job
+    return None
+
+
+def run_queued(workers=None, progress=None):
+    # Runs queued jobs until none is left; returns their reports.
+    reports = []
+    while job := claim_job():
+        storage = import_storage()
+        with storage.open(job.upload, 'rb') as f:
+            reports.append(run_import(f, job.filename, job.format, job.chunk_size, workers, progress))
+        # The file holds passwords; keep it only while the job may need resuming.
+        storage.delete(job.upload)
+        ImportJob.objects.filter(pk=job.pk).update(upload='')
+    return reports
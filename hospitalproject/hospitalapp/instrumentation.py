@@ -0,0 +1,276 @@
+import json
+import logging
+import threading
+import time
+from bisect import bisect_left
+from collections import defaultdict
+from contextlib import ExitStack, contextmanager
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.db import connections
+from django.template import TemplateDoesNotExist
+from django.template.backends.django import DjangoTemplates, Template, reraise
+
+
+# --- Request profiling ---
+# RequestProfileMiddleware times every request and, through an
+# execute_wrapper on each database connection, every query it runs.
+# Template rendering is timed by InstrumentedDjangoTemplates (set as the
+# template BACKEND). Each response gets a Server-Timing header; requests
+# slower than SLOW_REQUEST_MS, or that repeat one statement at least
+# N_PLUS_ONE_THRESHOLD times, are written to the ``hospitalapp.requests``
+# logger as one JSON object. Totals per URL name are kept in process and
+# served by the request_stats view and, as histograms, by /metrics.
+#
+# The middleware works under WSGI and, without a thread hop, under ASGI.
+#
+# Queries run while a template renders count towards both db and template
+# time. Queries run while a StreamingHttpResponse is consumed happen after
+# the middleware returns and are not counted.
+
+logger = logging.getLogger('hospitalapp.requests')
+
+SLOW_STATEMENTS_LOGGED = 5
+
+# Upper bounds, in seconds, of the request latency histogram buckets.
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+_current = ContextVar('request_profile', default=None)
+
+_stats = defaultdict(lambda: defaultdict(float))
+_buckets = defaultdict(lambda: [0] * len(LATENCY_BUCKETS))    # non-cumulative counts
+_stats_lock = threading.Lock()
+
+
+class RequestProfile:
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.view_started = None
+        self.total = self.view = self.db = self.template = 0.0
+        self.queries = 0
+        self.statements = defaultdict(lambda: [0, 0.0])   # sql -> [count, seconds]
+        self._template_depth = 0
+        self._lock = threading.Lock()    # parallel reads (see asyncdb.py) add queries from several threads
+
+    def add_query(self, sql, duration):
+        with self._lock:
+            self.queries += 1
+            self.db += duration
+            statement = self.statements[sql]
+            statement[0] += 1
+            statement[1] += duration
+
+    @contextmanager
+    def rendering(self):
+        # Only the outermost render is timed so nested renders are not counted twice.
+        self._template_depth += 1
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self._template_depth -= 1
+            if not self._template_depth:
+                self.template += time.perf_counter() - started
+
+    def duplicates(self, threshold):
+        return sorted(
+            ((sql, count) for sql, (count, _) in self.statements.items() if count >= threshold),
+            key=lambda item: -item[1],
+        )
+
+    def slowest(self, limit=SLOW_STATEMENTS_LOGGED):
+        ranked = sorted(self.statements.items(), key=lambda item: -item[1][1])[:limit]
+        return [(sql, count, seconds) for sql, (count, seconds) in ranked]
+
+    def server_timing(self):
+        return ', '.join([
+            f'db;dur={self.db * 1000:.1f};desc="{self.queries} queries"',
+            f'tpl;dur={self.template * 1000:.1f}',
+            f'view;dur={self.view * 1000:.1f}',
+            f'total;dur={self.total * 1000:.1f}',
+        ])
+
+
+def current_profile():
+    return _current.get()
+
+
+class QueryTimer:
+    def __init__(self, profile):
+        self.profile = profile
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.profile.add_query(sql, time.perf_counter() - started)
+
+
+def timed_queries(profile):
+    # Times every query this thread runs, replicas included. Connections
+    # are per thread, so enter and close the stack on the same thread.
+    stack = ExitStack()
+    timer = QueryTimer(profile)
+    for connection in connections.all():
+        stack.enter_context(connection.execute_wrapper(timer))
+    return stack
+
+
+class RequestProfileMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+            self.process_view = self.aprocess_view
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        profile = RequestProfile()
+        token = _current.set(profile)
+        try:
+            with timed_queries(profile):
+                response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self.finish(request, response, profile)
+
+    async def __acall__(self, request):
+        # Under ASGI the ORM runs on the request's thread-sensitive thread,
+        # not the event loop's, so the query timers are installed there.
+        profile = RequestProfile()
+        token = _current.set(profile)
+        try:
+            stack = await sync_to_async(timed_queries)(profile)
+            try:
+                response = await self.get_response(request)
+            finally:
+                await sync_to_async(stack.close)()
+        finally:
+            _current.reset(token)
+        return self.finish(request, response, profile)
+
+    def finish(self, request, response, profile):
+        now = time.perf_counter()
+        profile.total = now - profile.started
+        if profile.view_started is not None:
+            profile.view = now - profile.view_started
+        record(request, response, profile)
+        if getattr(settings, 'SERVER_TIMING_HEADER', True):
+            response['Server-Timing'] = profile.server_timing()
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        _view_started()
+
+    async def aprocess_view(self, request, view_func, view_args, view_kwargs):
+        _view_started()
+
+
+def _view_started():
+    profile = _current.get()
+    if profile is not None:
+        profile.view_started = time.perf_counter()
+
+
+def url_name(request):
+    match = getattr(request, 'resolver_match', None)
+    return match.view_name if match else '<unresolved>'
+
+
+def record(request, response, profile):
+    name = url_name(request)
+    slow_ms = getattr(settings, 'SLOW_REQUEST_MS', 500)
+    duplicates = profile.duplicates(getattr(settings, 'N_PLUS_ONE_THRESHOLD', 5))
+    slow = profile.total * 1000 >= slow_ms
+
+    with _stats_lock:
+        stats = _stats[name]
+        stats['requests'] += 1
+        stats['errors'] += response.status_code >= 500
+        stats['slow'] += slow
+        stats['n_plus_one'] += bool(duplicates)
+        stats['queries'] += profile.queries
+        stats['total_ms'] += profile.total * 1000
+        stats['view_ms'] += profile.view * 1000
+        stats['db_ms'] += profile.db * 1000
+        stats['template_ms'] += profile.template * 1000
+        stats['max_ms'] = max(stats['max_ms'], profile.total * 1000)
+        bucket = bisect_left(LATENCY_BUCKETS, profile.total)
+        if bucket < len(LATENCY_BUCKETS):
+            _buckets[name][bucket] += 1
+
+    if slow or duplicates:
+        logger.warning(json.dumps({
+            'event': 'slow_request' if slow else 'n_plus_one',
+            'method': request.method,
+            'path': request.path,
+            'view': name,
+            'status': response.status_code,
+            'total_ms': round(profile.total * 1000, 1),
+            'view_ms': round(profile.view * 1000, 1),
+            'db_ms': round(profile.db * 1000, 1),
+            'template_ms': round(profile.template * 1000, 1),
+            'queries': profile.queries,
+            'slowest': [{'sql': sql, 'count': count, 'ms': round(seconds * 1000, 1)}
+                        for sql, count, seconds in profile.slowest()],
+            'duplicates': [{'sql': sql, 'count': count} for sql, count in duplicates],
+        }))
+
+
+def request_stats():
+    # Per URL name: counts plus summed and average timings.
+    with _stats_lock:
+        snapshot = {name: dict(stats) for name, stats in _stats.items()}
+    for stats in snapshot.values():
+        requests = stats['requests'] or 1
+        for key in ('total_ms', 'view_ms', 'db_ms', 'template_ms', 'queries'):
+            stats[f'avg_{key}'] = round(stats[key] / requests, 2)
+    return snapshot
+
+
+def latency_histograms():
+    # URL name -> (cumulative bucket counts, sum in seconds, count).
+    with _stats_lock:
+        histograms = {}
+        for name, stats in _stats.items():
+            cumulative, running = [], 0
+            for count in _buckets[name]:
+                running += count
+                cumulative.append(running)
+            histograms[name] = (cumulative, stats['total_ms'] / 1000, int(stats['requests']))
+        return histograms
+
+
+def reset_request_stats():
+    with _stats_lock:
+        _stats.clear()
+        _buckets.clear()
+
+
+# --- Template timing ---
+
+class TimedTemplate(Template):
+    def render(self, context=None, request=None):
+        profile = _current.get()
+        if profile is None:
+            return super().render(context, request)
+        with profile.rendering():
+            return super().render(context, request)
+
+
+class InstrumentedDjangoTemplates(DjangoTemplates):
+    def from_string(self, template_code):
+        return TimedTemplate(self.engine.from_string(template_code), self)
+
+    def get_template(self, template_name):
+        try:
+            return TimedTemplate(self.engine.get_template(template_name), self)
+        except TemplateDoesNotExist as exc:
+            reraise(exc, self)
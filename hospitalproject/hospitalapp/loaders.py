@@ -0,0 +1,31 @@
+from .models import DoctorProfile
+
+
+# --- Batched related loading ---
+# Instead of letting templates walk ``row.doctor.user`` one row at a time,
+# collect the foreign keys from every list on the page and resolve them
+# with a single query per related model.
+
+class BatchLoader:
+    def __init__(self, queryset, field):
+        self.queryset = queryset
+        self.field = field
+        self._rows = []
+
+    def add(self, rows):
+        self._rows.extend(rows)
+        return rows
+
+    def load(self):
+        attname = f'{self.field}_id'
+        ids = {getattr(row, attname) for row in self._rows} - {None}
+        objects = self.queryset.in_bulk(ids) if ids else {}
+        for row in self._rows:
+            obj = objects.get(getattr(row, attname))
+            if obj is not None:
+                setattr(row, self.field, obj)
+        return objects
+
+
+def doctor_loader():
+    return BatchLoader(DoctorProfile.objects.select_related('user'), 'doctor')
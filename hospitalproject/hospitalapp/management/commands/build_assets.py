@@ -0,0 +1,31 @@
+from urllib.error import URLError
+
+from django.core.management.base import BaseCommand, CommandError
+
+from hospitalapp.assets import build_image_variants, vendor_assets
+
+
+class Command(BaseCommand):
+    help = "Download the vendored CSS/JS/fonts and build resized WebP/JPEG image variants. Run before collectstatic."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--refresh', action='store_true', help='Download vendored files again even if present.')
+        parser.add_argument('--skip-vendor', action='store_true', help='Do not download vendored files.')
+        parser.add_argument('--skip-images', action='store_true', help='Do not build image variants.')
+
+    def handle(self, *args, **options):
+        def log(line):
+            self.stdout.write(f'  {line}')
+
+        if not options['skip_vendor']:
+            try:
+                vendor_assets(options['refresh'], log)
+            except URLError as exc:
+                raise CommandError(f'Could not download vendored assets: {exc}')
+        if not options['skip_images']:
+            try:
+                import PIL  # noqa: F401
+            except ImportError:
+                raise CommandError('Building image variants needs Pillow (pip install Pillow), or pass --skip-images.')
+            build_image_variants(log)
+        self.stdout.write(self.style.SUCCESS('Assets built; run collectstatic next.'))
@@ -0,0 +1,42 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+
+from hospitalapp.models import Appointment
+from hospitalapp.queryplans import HOT_QUERIES, INDEX_SCANS, full_scans, sample_values
+
+
+class Command(BaseCommand):
+    help = "EXPLAIN every registered hot query and fail if any of them scans a whole table or index."
+
+    def add_arguments(self, parser):
+        parser.add_argument('names', nargs='*', help='Only explain these queries (default: all).')
+        parser.add_argument('--min-rows', type=int, default=10000,
+                            help='Warn when there are fewer appointments than this; '
+                                 'plans on small tables are not representative.')
+
+    def handle(self, *args, **options):
+        unknown = set(options['names']) - set(HOT_QUERIES)
+        if unknown:
+            raise CommandError(f"Unknown hot queries: {', '.join(sorted(unknown))}")
+
+        if Appointment.objects.count() < options['min_rows']:
+            self.stderr.write(self.style.WARNING(
+                f"Fewer than {options['min_rows']} appointments; seed a large dataset for realistic plans."
+            ))
+
+        sample = sample_values()
+        failures = []
+        for name, build in HOT_QUERIES.items():
+            if options['names'] and name not in options['names']:
+                continue
+            plan, scanned = full_scans(build(sample), index_scans=name not in INDEX_SCANS)
+            if scanned:
+                failures.append(name)
+                self.stdout.write(self.style.ERROR(f"{name}: full scan on {', '.join(scanned)}"))
+            else:
+                self.stdout.write(self.style.SUCCESS(f'{name}: ok'))
+            if scanned or options['verbosity'] > 1:
+                self.stdout.write('    ' + plan.replace('\n', '\n    '))
+
+        if failures:
+            raise CommandError(f'{len(failures)} hot queries do a full scan on {connection.vendor}.')
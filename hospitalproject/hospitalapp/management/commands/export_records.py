@@ -0,0 +1,26 @@
+import sys
+
+from django.core.management.base import BaseCommand
+
+from hospitalapp.exporter import DATASETS, iter_export
+
+
+class Command(BaseCommand):
+    help = "Stream medical history, prescriptions or bills to a CSV or NDJSON file."
+
+    def add_arguments(self, parser):
+        parser.add_argument('dataset', choices=sorted(DATASETS))
+        parser.add_argument('--format', choices=['csv', 'ndjson'], default='csv')
+        parser.add_argument('--gzip', action='store_true')
+        parser.add_argument('--output', '-o', help='Output file (default: standard output).')
+
+    def handle(self, *args, **options):
+        chunks = iter_export(options['dataset'], options['format'], options['gzip'])
+        if options['output']:
+            with open(options['output'], 'wb') as f:
+                for chunk in chunks:
+                    f.write(chunk)
+        else:
+            for chunk in chunks:
+                sys.stdout.buffer.write(chunk)
+            sys.stdout.buffer.flush()
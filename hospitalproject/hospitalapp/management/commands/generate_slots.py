@@ -0,0 +1,24 @@
+import datetime
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from hospitalapp.models import DoctorProfile
+from hospitalapp.slots import ensure_slots
+
+
+class Command(BaseCommand):
+    help = "Precompute bookable appointment slots from each doctor's available days."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--days', type=int, default=30, help='How many days ahead to generate (default 30).')
+
+    def handle(self, *args, **options):
+        start = timezone.localdate()
+        end = start + datetime.timedelta(days=options['days'] - 1)
+
+        created = 0
+        for doctor in DoctorProfile.objects.only('id', 'full_name', 'available_days').iterator(chunk_size=500):
+            created += ensure_slots(doctor, start, end)
+
+        self.stdout.write(self.style.SUCCESS(f'Created {created} slots from {start} to {end}.'))
@@ -0,0 +1,41 @@
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+
+from hospitalapp.importer import DEFAULT_CHUNK_SIZE, run_import
+
+
+class Command(BaseCommand):
+    help = "Bulk import users and their profiles from a CSV or JSON Lines file."
+
+    def add_arguments(self, parser):
+        parser.add_argument('path')
+        parser.add_argument('--format', choices=['csv', 'jsonl'], help='Defaults to the file extension.')
+        parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE)
+        parser.add_argument('--workers', type=int, default=None,
+                            help='Password hashing processes (default: one per CPU).')
+
+    def handle(self, *args, **options):
+        path = options['path']
+        fmt = options['format'] or ('jsonl' if path.endswith(('.jsonl', '.ndjson')) else 'csv')
+        if not os.path.exists(path):
+            raise CommandError(f'{path} does not exist.')
+
+        def progress(report):
+            self.stdout.write(f'  chunk {report.resumed_from + report.chunks}: {report.imported} imported, '
+                              f'{report.skipped} skipped, {report.rows_per_second:.0f} rows/sec')
+
+        with open(path, 'rb') as f:
+            report = run_import(f, os.path.basename(path), fmt, options['chunk_size'], options['workers'], progress)
+
+        if report.already_done:
+            self.stdout.write(f'{path} was already imported; nothing to do.')
+            return
+        if report.resumed_from:
+            self.stdout.write(f'Resumed after chunk {report.resumed_from}.')
+        for number, message in report.errors:
+            self.stderr.write(f'  row {number}: {message}')
+        self.stdout.write(self.style.SUCCESS(
+            f'Imported {report.imported} users, skipped {report.skipped} '
+            f'in {report.elapsed:.1f}s ({report.rows_per_second:.0f} rows/sec).'
+        ))
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from hospitalapp.metrics import rebuild_counters
+
+
+class Command(BaseCommand):
+    help = "Recount the /metrics domain counters from appointments and bills, e.g. after a bulk load."
+
+    def handle(self, *args, **options):
+        rebuild_counters()
+        self.stdout.write(self.style.SUCCESS('Rebuilt metric counters.'))
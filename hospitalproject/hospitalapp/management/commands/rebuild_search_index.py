@@ -0,0 +1,17 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from hospitalapp.search import get_backend, iter_documents
+
+
+class Command(BaseCommand):
+    help = "Reindex patients, medical history and prescriptions for patient search."
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        backend = get_backend()
+        backend.rebuild(iter_documents())
+        self.stdout.write(self.style.SUCCESS(
+            f'Rebuilt {type(backend).__name__} in {time.perf_counter() - started:.1f}s.'
+        ))
@@ -0,0 +1,46 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandError
+
+from hospitalapp.benchmark import SCENARIOS, compare_reports, run_benchmark, write_report
+
+
+class Command(BaseCommand):
+    help = "Benchmark the main pages and write latency, query and memory figures to a JSON report."
+
+    def add_arguments(self, parser):
+        parser.add_argument('scenarios', nargs='*', help='Only run these scenarios (default: all).')
+        parser.add_argument('--iterations', type=int, default=50)
+        parser.add_argument('--warmup', type=int, default=5)
+        parser.add_argument('--memory-samples', type=int, default=5,
+                            help='Extra requests per scenario traced for memory (0 to skip).')
+        parser.add_argument('--server', action='store_true',
+                            help='Send requests over HTTP to a local WSGI server instead of the test client.')
+        parser.add_argument('--output', default='benchmark.json')
+        parser.add_argument('--compare', metavar='REPORT', help='Print changes against an earlier report.')
+
+    def handle(self, *args, **options):
+        names = {scenario.name for scenario in SCENARIOS}
+        unknown = set(options['scenarios']) - names
+        if unknown:
+            raise CommandError(f"Unknown scenarios: {', '.join(sorted(unknown))}")
+
+        def progress(name, result):
+            latency, queries = result['latency_ms'], result['queries']
+            self.stdout.write(f"  {name:<24} p50 {latency['p50']:>8.2f} ms  p95 {latency['p95']:>8.2f} ms  "
+                              f"p99 {latency['p99']:>8.2f} ms  {queries['p50']:>5.0f} queries  "
+                              f"status {', '.join(result['status'])}")
+
+        report = run_benchmark(options['iterations'], options['warmup'], options['memory_samples'],
+                               options['server'], set(options['scenarios']), progress)
+        for name in report['skipped']:
+            self.stderr.write(self.style.WARNING(f'  {name}: skipped, no data for it (run seed_data).'))
+        write_report(report, options['output'])
+        self.stdout.write(self.style.SUCCESS(f"Wrote {options['output']}."))
+
+        if options['compare']:
+            with open(options['compare']) as f:
+                old = json.load(f)
+            for name, metric, before, after, change in compare_reports(old, report):
+                style = self.style.ERROR if change > 0.1 else self.style.SUCCESS if change < -0.1 else str
+                self.stdout.write(style(f'  {name:<24} {metric:<16} {before:>10} -> {after:<10} ({change:+.0%})'))
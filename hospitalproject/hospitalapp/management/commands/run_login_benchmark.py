@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand
+
+from hospitalapp.benchmark import run_login_burst, write_report
+
+
+class Command(BaseCommand):
+    help = "Measure legitimate login latency during a credential-stuffing burst, with and without throttling."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--logins', type=int, default=20, help='Legitimate logins per phase.')
+        parser.add_argument('--attack-rate', type=float, default=200, help='Attack attempts per second.')
+        parser.add_argument('--attackers', type=int, default=64, help='Most attack attempts in flight at once.')
+        parser.add_argument('--attack-ips', type=int, default=8, help='Addresses the attack comes from.')
+        parser.add_argument('--workers', type=int, default=8, help='Worker threads of the simulated server.')
+        parser.add_argument('--ramp', type=float, default=60,
+                            help='Longest wait, in seconds, for the attack to be throttled before measuring.')
+        parser.add_argument('--throttled-only', action='store_true', help='Skip the run with throttling off.')
+        parser.add_argument('--output', default='login_burst.json')
+
+    def handle(self, *args, **options):
+        def progress(name, result):
+            self.stdout.write(f"  {name:<12} baseline p50 {result['baseline']['latency_ms']['p50']:>8.2f} ms   "
+                              f"under attack p50 {result['under_attack']['latency_ms']['p50']:>8.2f} ms  "
+                              f"p95 {result['under_attack']['latency_ms']['p95']:>8.2f} ms   "
+                              f"attack {result['attack']['status']}")
+
+        report = run_login_burst(options['logins'], options['attack_rate'], options['attackers'], options['attack_ips'],
+                                 options['workers'], options['ramp'], not options['throttled_only'], progress)
+        write_report(report, options['output'])
+        self.stdout.write(self.style.SUCCESS(f"Wrote {options['output']}."))
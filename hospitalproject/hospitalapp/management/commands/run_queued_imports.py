@@ -0,0 +1,36 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from hospitalapp.importer import run_queued
+
+
+class Command(BaseCommand):
+    help = "Run the user imports queued from the admin page. Use --loop to keep running as a worker."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--workers', type=int, default=None,
+                            help='Password hashing processes (default: one per CPU).')
+        parser.add_argument('--loop', action='store_true', help='Keep polling for new imports.')
+        parser.add_argument('--interval', type=float, default=5.0, help='Seconds to sleep when the queue is empty.')
+
+    def handle(self, *args, **options):
+        try:
+            while True:
+                try:
+                    reports = run_queued(options['workers'])
+                except Exception as e:
+                    # The job is marked failed and keeps its file; uploading it again resumes it.
+                    self.stderr.write(f'Import failed: {e}')
+                    reports = None
+                for report in reports or []:
+                    self.stdout.write(f'{report.job.filename}: imported {report.imported}, '
+                                      f'skipped {report.skipped} in {report.elapsed:.1f}s.')
+                if not options['loop']:
+                    if reports is None:
+                        continue
+                    break
+                if not reports:
+                    time.sleep(options['interval'])
+        except KeyboardInterrupt:
+            pass
@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from hospitalapp.benchmark import SCENARIOS, run_throughput, write_report
+
+
+class Command(BaseCommand):
+    help = "Compare requests per second through the WSGI and the ASGI handler at high concurrency."
+
+    def add_arguments(self, parser):
+        parser.add_argument('scenarios', nargs='*', help='Only run these scenarios (default: the async pages).')
+        parser.add_argument('--requests', type=int, default=500, help='Requests per scenario and interface.')
+        parser.add_argument('--concurrency', type=int, default=64, help='Requests in flight under ASGI.')
+        parser.add_argument('--wsgi-threads', type=int, default=8, help='Worker threads of the simulated WSGI server.')
+        parser.add_argument('--output', default='throughput.json')
+
+    def handle(self, *args, **options):
+        names = {scenario.name for scenario in SCENARIOS}
+        unknown = set(options['scenarios']) - names
+        if unknown:
+            raise CommandError(f"Unknown scenarios: {', '.join(sorted(unknown))}")
+
+        def progress(name, result):
+            wsgi, asgi = result['wsgi'], result['asgi']
+            self.stdout.write(f"  {name:<24} wsgi {wsgi['requests_per_second']:>8} req/s  "
+                              f"p95 {wsgi['latency_ms']['p95']:>8.2f} ms   asgi {asgi['requests_per_second']:>8} req/s  "
+                              f"p95 {asgi['latency_ms']['p95']:>8.2f} ms")
+
+        report = run_throughput(options['requests'], options['concurrency'], options['wsgi_threads'],
+                                set(options['scenarios']), progress)
+        for name in report['skipped']:
+            self.stderr.write(self.style.WARNING(f'  {name}: skipped, no data for it (run seed_data).'))
+        write_report(report, options['output'])
+        self.stdout.write(self.style.SUCCESS(f"Wrote {options['output']}."))
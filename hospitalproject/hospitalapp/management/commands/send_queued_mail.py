@@ -0,0 +1,37 @@
+import time
+
+from django.core.mail import get_connection
+from django.core.management.base import BaseCommand
+
+from hospitalapp.outbox import deliver_pending
+
+
+class Command(BaseCommand):
+    help = "Deliver queued outbox emails. Use --loop to keep running as a worker."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=50)
+        parser.add_argument('--loop', action='store_true', help='Keep polling for new mail.')
+        parser.add_argument('--interval', type=float, default=5.0, help='Seconds to sleep when the queue is empty.')
+
+    def handle(self, *args, **options):
+        # One SMTP connection is kept open across batches and only
+        # re-established after a failure.
+        connection = get_connection()
+        try:
+            while True:
+                sent, failed = deliver_pending(options['batch_size'], connection=connection)
+                if sent or failed:
+                    self.stdout.write(f'Sent {sent}, failed {failed}.')
+                if failed:
+                    connection.close()
+                if not options['loop']:
+                    if sent or failed:
+                        continue
+                    break
+                if not (sent or failed):
+                    time.sleep(options['interval'])
+        except KeyboardInterrupt:
+            pass
+        finally:
+            connection.close()
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from hospitalapp.profiles import sync_display_names
+
+
+class Command(BaseCommand):
+    help = "Recompute each user's role and display name from their flags and profile, e.g. after a bulk load."
+
+    def handle(self, *args, **options):
+        sync_display_names()
+        self.stdout.write(self.style.SUCCESS('Synced user display names.'))
@@ -0,0 +1,204 @@
+import hashlib
+import mimetypes
+import os
+import re
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.exceptions import SuspiciousFileOperation
+from django.core.files.storage import FileSystemStorage, default_storage
+from django.core.files.uploadhandler import TemporaryFileUploadHandler
+from django.core.handlers.asgi import ASGIRequest
+from django.http import FileResponse, Http404, HttpResponse, HttpResponseNotModified, StreamingHttpResponse
+from django.utils.http import http_date, parse_etags
+
+
+# --- Media storage ---
+# Uploaded documents (bulletin PDFs, research papers, publications) are
+# stored content-addressed: the name is the SHA-256 of the bytes, so the
+# same file uploaded twice is kept once and a stored name never changes
+# meaning. HashingUploadHandler writes uploads straight to a temporary file
+# in chunks and hashes them on the way; the storage then moves that file
+# into place without reading it again.
+#
+# serve() answers downloads. Blobs never change, so they get year-long
+# immutable cache headers. Range requests (one range per request) are
+# answered with 206, and the body is streamed in BLOCK_SIZE pieces. With
+# MEDIA_OFFLOAD set, the response only names the file and nginx
+# (X-Accel-Redirect) or Apache/lighttpd (X-Sendfile) sends the bytes.
+# Either way a large PDF is never held in Python memory. Under ASGI, Django
+# reads a synchronous iterator (FileResponse included) to the end before
+# sending it, so ASGI requests get an async iterator that reads each block
+# on a worker thread.
+
+BLOCK_SIZE = 64 * 1024
+IMMUTABLE_MAX_AGE = 365 * 24 * 3600
+BLOB_NAME = re.compile(r'^blobs/[0-9a-f]{2}/[0-9a-f]{2}/(?P<digest>[0-9a-f]{64})(\.\w{1,10})?$')
+RANGE_HEADER = re.compile(r'^bytes=(\d*)-(\d*)$')
+
+
+class HashingUploadHandler(TemporaryFileUploadHandler):
+    def new_file(self, *args, **kwargs):
+        super().new_file(*args, **kwargs)
+        self.digest = hashlib.sha256()
+
+    def receive_data_chunk(self, raw_data, start):
+        self.digest.update(raw_data)
+        return super().receive_data_chunk(raw_data, start)
+
+    def file_complete(self, file_size):
+        file = super().file_complete(file_size)
+        file.sha256 = self.digest.hexdigest()
+        return file
+
+
+def file_digest(content):
+    digest = hashlib.sha256()
+    for chunk in content.chunks(BLOCK_SIZE):
+        digest.update(chunk)
+    return digest.hexdigest()
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    def __init__(self, **kwargs):
+        # A blob that already exists has the same bytes, so writing it again is harmless.
+        kwargs.setdefault('allow_overwrite', True)
+        super().__init__(**kwargs)
+
+    def blob_name(self, digest, extension=''):
+        return f'blobs/{digest[:2]}/{digest[2:4]}/{digest}{extension}'
+
+    def get_available_name(self, name, max_length=None):
+        return name
+
+    def _save(self, name, content):
+        extension = os.path.splitext(name)[1].lower()
+        if not re.fullmatch(r'\.\w{1,10}', extension):
+            extension = ''
+        digest = getattr(content, 'sha256', None) or file_digest(content)
+        name = self.blob_name(digest, extension)
+        if self.exists(name):
+            return name
+        return super()._save(name, content)
+
+
+# --- Serving ---
+
+def parse_range(header, size):
+    # Returns (start, end) inclusive, None to send the whole file, or
+    # False if the range cannot be satisfied.
+    match = RANGE_HEADER.match(header.strip()) if header else None
+    if not match or not any(match.groups()):
+        return None
+    first, last = match.groups()
+    if not first:
+        length = int(last)
+        if not length:
+            return False
+        return max(size - length, 0), size - 1
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size:
+        return False
+    if end < start:
+        return None
+    return start, end
+
+
+def read_range(path, start, length):
+    with open(path, 'rb') as f:
+        f.seek(start)
+        while length > 0:
+            chunk = f.read(min(BLOCK_SIZE, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
+
+
+async def aread_range(path, start, length):
+    f = await sync_to_async(open, thread_sensitive=False)(path, 'rb')
+    try:
+        await sync_to_async(f.seek, thread_sensitive=False)(start)
+        while length > 0:
+            chunk = await sync_to_async(f.read, thread_sensitive=False)(min(BLOCK_SIZE, length))
+            if not chunk:
+                break
+            length -= len(chunk)
+            yield chunk
+    finally:
+        f.close()
+
+
+def _stream(request, path, start, length, status=200):
+    chunks = (aread_range if isinstance(request, ASGIRequest) else read_range)(path, start, length)
+    response = StreamingHttpResponse(chunks, status=status)
+    response['Content-Length'] = str(length)
+    return response
+
+
+def _etag(name, stat):
+    match = BLOB_NAME.match(name)
+    return f'"{match["digest"]}"' if match else f'"{stat.st_size:x}-{int(stat.st_mtime):x}"'
+
+
+def _offload(response, name, path):
+    mode = getattr(settings, 'MEDIA_OFFLOAD', '')
+    if mode == 'x-accel-redirect':
+        response['X-Accel-Redirect'] = getattr(settings, 'MEDIA_ACCEL_PREFIX', '/protected-media/') + name
+    elif mode == 'x-sendfile':
+        response['X-Sendfile'] = path
+    else:
+        return False
+    return True
+
+
+def serve(request, name, storage=None):
+    storage = storage or default_storage
+    try:
+        path = storage.path(name)
+    except SuspiciousFileOperation:
+        raise Http404
+    if not os.path.isfile(path):
+        raise Http404
+    stat = os.stat(path)
+
+    etag = _etag(name, stat)
+    if etag in parse_etags(request.headers.get('If-None-Match', '')):
+        response = HttpResponseNotModified()
+        response['ETag'] = etag
+        return response
+
+    if BLOB_NAME.match(name):
+        cache_control = f'public, max-age={IMMUTABLE_MAX_AGE}, immutable'
+    else:
+        cache_control = 'public, max-age=3600'
+
+    response = HttpResponse()
+    if _offload(response, name, path):
+        # The front server takes care of Range and the body.
+        del response['Content-Type']
+    else:
+        byte_range = parse_range(request.headers.get('Range'), stat.st_size)
+        if_range = request.headers.get('If-Range')
+        if if_range and if_range != etag:
+            byte_range = None
+        if byte_range is False:
+            response = HttpResponse(status=416)
+            response['Content-Range'] = f'bytes */{stat.st_size}'
+            return response
+        if byte_range:
+            start, end = byte_range
+            response = _stream(request, path, start, end - start + 1, status=206)
+            response['Content-Range'] = f'bytes {start}-{end}/{stat.st_size}'
+        elif isinstance(request, ASGIRequest):
+            response = _stream(request, path, 0, stat.st_size)
+        else:
+            # FileResponse hands the file to wsgi.file_wrapper (sendfile on most servers).
+            response = FileResponse(open(path, 'rb'))
+        response['Accept-Ranges'] = 'bytes'
+        response['Content-Type'] = mimetypes.guess_type(name)[0] or 'application/octet-stream'
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(stat.st_mtime)
+    response['Cache-Control'] = cache_control
+    return response
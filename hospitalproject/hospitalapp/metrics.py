@@ -0,0 +1,188 @@
+import hmac
+from collections import Counter
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Sum
+
+from .fragments import fragment_stats
+from .instrumentation import LATENCY_BUCKETS, latency_histograms, request_stats
+from .models import Appointment, Bill, MetricCounter
+from .rollups import increment
+
+
+# --- Metrics endpoint ---
+# /metrics serves the Prometheus text exposition format. Request and cache
+# figures come from this process's in-memory counters; scrape every worker
+# process, or run one, to see them all. Domain gauges are read from
+# MetricCounter rows, which signals keep current as appointments and bills
+# change (see signals.py). A scrape therefore reads a table with one row per
+# doctor instead of counting appointments. Signals apply the deltas once the
+# change commits, outside the booking transaction, so a process that dies in
+# between leaves the counters short; ``rebuild_metric_counters`` recomputes
+# them from the source tables, as the first scrape does, and is also the way
+# to catch up after bulk loads that bypass signals.
+#
+# Bookings per minute is the rate of hospital_appointments_booked_total,
+# e.g. rate(hospital_appointments_booked_total[5m]) * 60.
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+PENDING_APPOINTMENTS = 'pending_appointments'    # label: doctor id
+UNPAID_BILLS = 'unpaid_bills'
+UNPAID_AMOUNT = 'unpaid_amount'
+APPOINTMENTS_BOOKED = 'appointments_booked'
+INITIALIZED = '_initialized'
+
+
+def authorized(request):
+    # Scrapers send METRICS_TOKEN as a bearer token; with no token set, nobody gets in.
+    token = getattr(settings, 'METRICS_TOKEN', '')
+    sent = request.headers.get('Authorization', '')
+    return bool(token) and hmac.compare_digest(sent.encode(), f'Bearer {token}'.encode())
+
+
+# --- Domain counters ---
+
+def bump(name, label='', delta=1):
+    increment(MetricCounter, {'name': name, 'label': str(label)}, value=delta)
+
+
+def appointment_changed(old, new):
+    # old/new: (doctor id, date, status) as kept by signals.py, or None
+    appointments_changed([(old, new)])
+
+
+def appointments_changed(changes):
+    # One counter update per doctor, however many appointments changed.
+    deltas = Counter()
+    for old, new in changes:
+        if old and old[2] == 'Pending':
+            deltas[old[0]] -= 1
+        if new and new[2] == 'Pending':
+            deltas[new[0]] += 1
+    for doctor_id, delta in deltas.items():
+        bump(PENDING_APPOINTMENTS, doctor_id, delta)
+
+
+def _unpaid(state):
+    # state: (doctor id, date, amount, paid) or None
+    return (1, state[2]) if state and not state[3] else (0, 0)
+
+
+def bill_changed(old, new):
+    (old_count, old_amount), (new_count, new_amount) = _unpaid(old), _unpaid(new)
+    bump(UNPAID_BILLS, delta=new_count - old_count)
+    bump(UNPAID_AMOUNT, delta=new_amount - old_amount)
+
+
+def rebuild_counters():
+    with transaction.atomic():
+        MetricCounter.objects.all().delete()
+        pending = (Appointment.objects.filter(status='Pending').order_by()
+                   .values_list('doctor_id').annotate(count=Count('id')))
+        unpaid = Bill.objects.filter(paid=False).aggregate(count=Count('id'), amount=Sum('amount'))
+        counters = [MetricCounter(name=PENDING_APPOINTMENTS, label=str(doctor_id), value=count)
+                    for doctor_id, count in pending]
+        counters += [
+            MetricCounter(name=UNPAID_BILLS, value=unpaid['count']),
+            MetricCounter(name=UNPAID_AMOUNT, value=unpaid['amount'] or 0),
+            MetricCounter(name=APPOINTMENTS_BOOKED, value=Appointment.objects.count()),
+            MetricCounter(name=INITIALIZED, value=1),
+        ]
+        MetricCounter.objects.bulk_create(counters)
+
+
+def ensure_counters():
+    if not MetricCounter.objects.filter(name=INITIALIZED).exists():
+        rebuild_counters()
+
+
+def counter_values():
+    # name -> {label: value}
+    values = {}
+    for name, label, value in MetricCounter.objects.values_list('name', 'label', 'value'):
+        values.setdefault(name, {})[label] = value
+    return values
+
+
+# --- Exposition ---
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(**labels):
+    if not labels:
+        return ''
+    return '{' + ','.join(f'{key}="{_escape(value)}"' for key, value in labels.items()) + '}'
+
+
+def _number(value):
+    if isinstance(value, Decimal):
+        value = float(value)
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+class Exposition:
+    def __init__(self):
+        self.lines = []
+
+    def metric(self, name, kind, help_text, samples):
+        # samples: iterable of (suffix, labels dict, value)
+        self.lines.append(f'# HELP {name} {help_text}')
+        self.lines.append(f'# TYPE {name} {kind}')
+        for suffix, labels, value in samples:
+            self.lines.append(f'{name}{suffix}{_labels(**labels)} {_number(value)}')
+
+    def render(self):
+        return '\n'.join(self.lines) + '\n'
+
+
+def _histogram_samples(histograms):
+    for view, (cumulative, total, count) in sorted(histograms.items()):
+        for bound, value in zip(LATENCY_BUCKETS, cumulative):
+            yield '_bucket', {'view': view, 'le': _number(float(bound))}, value
+        yield '_bucket', {'view': view, 'le': '+Inf'}, count
+        yield '_sum', {'view': view}, total
+        yield '_count', {'view': view}, count
+
+
+def render_metrics():
+    out = Exposition()
+
+    stats = request_stats()
+    out.metric('hospital_request_duration_seconds', 'histogram', 'Request latency by URL name.',
+               _histogram_samples(latency_histograms()))
+    out.metric('hospital_request_errors_total', 'counter', 'Responses with a 5xx status by URL name.',
+               (('', {'view': view}, s['errors']) for view, s in sorted(stats.items())))
+    out.metric('hospital_db_queries_total', 'counter', 'Database queries run by URL name.',
+               (('', {'view': view}, s['queries']) for view, s in sorted(stats.items())))
+    out.metric('hospital_db_duration_seconds_total', 'counter', 'Time spent in database queries by URL name.',
+               (('', {'view': view}, s['db_ms'] / 1000) for view, s in sorted(stats.items())))
+    out.metric('hospital_n_plus_one_requests_total', 'counter', 'Requests that repeated one statement too often.',
+               (('', {'view': view}, s['n_plus_one']) for view, s in sorted(stats.items())))
+
+    fragments = sorted(fragment_stats().items())
+    out.metric('hospital_fragment_cache_requests_total', 'counter', 'Dashboard fragment cache lookups.',
+               (('', {'section': section, 'result': result}, counts[key])
+                for section, counts in fragments for result, key in (('hit', 'hits'), ('miss', 'misses'))))
+    out.metric('hospital_fragment_cache_hit_ratio', 'gauge', 'Share of fragment cache lookups that hit.',
+               (('', {'section': section}, counts['hits'] / ((counts['hits'] + counts['misses']) or 1))
+                for section, counts in fragments))
+
+    ensure_counters()
+    counters = counter_values()
+    out.metric('hospital_pending_appointments', 'gauge', 'Pending appointments per doctor.',
+               (('', {'doctor_id': doctor_id}, value)
+                for doctor_id, value in sorted(counters.get(PENDING_APPOINTMENTS, {}).items(), key=lambda i: int(i[0]))))
+    out.metric('hospital_unpaid_bills', 'gauge', 'Number of unpaid bills.',
+               [('', {}, counters.get(UNPAID_BILLS, {}).get('', 0))])
+    out.metric('hospital_unpaid_bills_amount', 'gauge', 'Total amount of unpaid bills.',
+               [('', {}, counters.get(UNPAID_AMOUNT, {}).get('', 0))])
+    out.metric('hospital_appointments_booked_total', 'counter', 'Appointments booked.',
+               [('', {}, counters.get(APPOINTMENTS_BOOKED, {}).get('', 0))])
+    return out.render()
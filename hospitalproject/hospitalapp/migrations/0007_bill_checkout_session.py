@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-18 13:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hospitalapp', '0006_outboxemail'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='bill',
+            name='checkout_session_expires',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='bill',
+            name='checkout_session_id',
+            field=models.CharField(blank=True, max_length=255),
+        ),
+    ]
@@ -0,0 +1,49 @@
+# Generated by Django 5.2.18 on 2026-10-18 13:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hospitalapp', '0007_bill_checkout_session'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='announcement',
+            index=models.Index(fields=['date', 'id'], name='announcement_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='bill',
+            index=models.Index(fields=['patient', 'date', 'id'], name='bill_patient_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='healthbulletin',
+            index=models.Index(fields=['date', 'id'], name='bulletin_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='healtheducationresource',
+            index=models.Index(fields=['created_at', 'id'], name='resource_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='medicalhistory',
+            index=models.Index(fields=['patient', 'date', 'id'], name='history_patient_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='medicalresearch',
+            index=models.Index(fields=['date', 'id'], name='research_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='prescription',
+            index=models.Index(fields=['patient', 'date_issued', 'id'], name='rx_patient_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='publication',
+            index=models.Index(fields=['date', 'id'], name='publication_date_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='bill',
+            constraint=models.CheckConstraint(condition=models.Q(('amount__gte', 0)), name='bill_amount_non_negative'),
+        ),
+    ]
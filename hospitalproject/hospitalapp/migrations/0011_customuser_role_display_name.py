@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-18 13:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hospitalapp', '0010_daily_rollups'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='customuser',
+            name='display_name',
+            field=models.CharField(blank=True, max_length=120),
+        ),
+        migrations.AddField(
+            model_name='customuser',
+            name='role',
+            field=models.CharField(blank=True, choices=[('patient', 'Patient'), ('doctor', 'Doctor'), ('admin', 'Admin')], max_length=10),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 5.2.18 on 2026-10-18 13:20
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hospitalapp', '0012_user_grid_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='medicalhistory',
+            name='appointment',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='medical_history', to='hospitalapp.appointment'),
+        ),
+        migrations.AddConstraint(
+            model_name='medicalhistory',
+            constraint=models.UniqueConstraint(fields=('appointment',), name='unique_history_per_appointment'),
+        ),
+    ]
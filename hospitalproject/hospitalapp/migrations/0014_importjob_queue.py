@@ -0,0 +1,33 @@
+# Generated by Django 5.2.18 on 2026-10-18 13:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hospitalapp', '0013_medicalhistory_appointment'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='importjob',
+            name='errors',
+            field=models.JSONField(blank=True, default=list),
+        ),
+        migrations.AddField(
+            model_name='importjob',
+            name='format',
+            field=models.CharField(default='csv', max_length=10),
+        ),
+        migrations.AddField(
+            model_name='importjob',
+            name='upload',
+            field=models.CharField(blank=True, max_length=255),
+        ),
+        migrations.AlterField(
+            model_name='importjob',
+            name='status',
+            field=models.CharField(choices=[('queued', 'Queued'), ('running', 'Running'), ('failed', 'Failed'), ('completed', 'Completed')], default='running', max_length=20),
+        ),
+    ]
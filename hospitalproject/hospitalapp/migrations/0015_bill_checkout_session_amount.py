@@ -0,0 +1,18 @@
+# Generated by Django 5.2.18 on 2026-10-18 13:20
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hospitalapp', '0014_importjob_queue'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='bill',
+            name='checkout_session_amount',
+            field=models.PositiveBigIntegerField(blank=True, null=True),
+        ),
+    ]
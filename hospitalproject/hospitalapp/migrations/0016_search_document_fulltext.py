@@ -0,0 +1,29 @@
+from django.db import migrations
+
+INDEX_NAME = 'search_document_content_ft'
+
+
+# The FULLTEXT index behind search.MySQLFullTextBackend. Other databases
+# search with another backend and get no index.
+
+def add_fulltext_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'mysql':
+        table = apps.get_model('hospitalapp', 'SearchDocument')._meta.db_table
+        schema_editor.execute(f'ALTER TABLE {table} ADD FULLTEXT INDEX {INDEX_NAME} (content)')
+
+
+def drop_fulltext_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'mysql':
+        table = apps.get_model('hospitalapp', 'SearchDocument')._meta.db_table
+        schema_editor.execute(f'ALTER TABLE {table} DROP INDEX {INDEX_NAME}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('hospitalapp', '0015_bill_checkout_session_amount'),
+    ]
+
+    operations = [
+        migrations.RunPython(add_fulltext_index, drop_fulltext_index),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 5.2.18 on 2026-10-18 13:24
+
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+
+def copy_profile_ages(apps, schema_editor):
+    CustomUser = apps.get_model('hospitalapp', 'CustomUser')
+    for role, model_name in (('patient', 'PatientProfile'), ('doctor', 'DoctorProfile'), ('admin', 'AdminProfile')):
+        profile = apps.get_model('hospitalapp', model_name).objects.filter(user=OuterRef('pk'))
+        CustomUser.objects.filter(role=role).update(profile_age=Coalesce(Subquery(profile.values('age')[:1]), Value(-1)))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('hospitalapp', '0016_search_document_fulltext'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='customuser',
+            name='profile_age',
+            field=models.IntegerField(default=-1),
+        ),
+        migrations.RunPython(copy_profile_ages, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='customuser',
+            index=models.Index(fields=['profile_age', 'id'], name='user_age_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='customuser',
+            index=models.Index(fields=['role', 'profile_age', 'id'], name='user_role_age_idx'),
+        ),
+    ]
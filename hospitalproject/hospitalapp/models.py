@@ -1,23 +1,40 @@
 from django.db import models
 from django.contrib.auth.models import AbstractUser
 from django.conf import settings
+from django.utils import timezone
 
 
 # Custom User Model
 class CustomUser(AbstractUser):
+    ROLE_CHOICES = [
+        ('patient', 'Patient'),
+        ('doctor', 'Doctor'),
+        ('admin', 'Admin'),
+    ]
+
     is_patient = models.BooleanField(default=False)
     is_doctor = models.BooleanField(default=False)
     is_admin = models.BooleanField(default=False)
+    # Copied from the role flags and the role's profile by signals (see
+    # profiles.py) so listing users never has to look the profiles up.
+    role = models.CharField(max_length=10, choices=ROLE_CHOICES, blank=True)
+    display_name = models.CharField(max_length=120, blank=True)
+    profile_age = models.IntegerField(default=-1)    # -1: no profile or no age
+
+    class Meta(AbstractUser.Meta):
+        # Sort orders of the manage_users grid, with and without a role filter
+        indexes = [
+            models.Index(fields=['display_name', 'id'], name='user_name_idx'),
+            models.Index(fields=['date_joined', 'id'], name='user_joined_idx'),
+            models.Index(fields=['role', 'display_name', 'id'], name='user_role_name_idx'),
+            models.Index(fields=['role', 'date_joined', 'id'], name='user_role_joined_idx'),
+            models.Index(fields=['profile_age', 'id'], name='user_age_idx'),
+            models.Index(fields=['role', 'profile_age', 'id'], name='user_role_age_idx'),
+        ]
 
     @property
     def full_name(self):
-        if self.is_patient and hasattr(self, 'patientprofile'):
-            return self.patientprofile.full_name
-        elif self.is_doctor and hasattr(self, 'doctorprofile'):
-            return self.doctorprofile.full_name
-        elif self.is_admin and hasattr(self, 'adminprofile'):
-            return self.adminprofile.full_name
-        return f"{self.first_name} {self.last_name}".strip()
+        return self.display_name or f"{self.first_name} {self.last_name}".strip()
 
 
 class AdminProfile(models.Model):
@@ -82,17 +99,50 @@ class PatientProfile(models.Model):
 
 # Appointment
 class Appointment(models.Model):
+    STATUS_CHOICES = [
+        ('Pending', 'Pending'),
+        ('Confirmed', 'Confirmed'),
+        ('Declined', 'Declined'),
+        ('Completed', 'Completed'),
+    ]
+
     patient = models.ForeignKey(PatientProfile, on_delete=models.CASCADE)
     doctor = models.ForeignKey(DoctorProfile, on_delete=models.CASCADE)
     date = models.DateField()
     time = models.TimeField()
     reason = models.TextField()
-    status = models.CharField(max_length=20, default='Pending')
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='Pending')
+
+    class Meta:
+        # Composite indexes backing the keyset-paginated listings (see pagination.py)
+        indexes = [
+            models.Index(fields=['date', 'time', 'id'], name='appt_date_time_id_idx'),
+            models.Index(fields=['doctor', 'date', 'time', 'id'], name='appt_doctor_date_time_idx'),
+            models.Index(fields=['patient', 'date', 'time', 'id'], name='appt_patient_date_time_idx'),
+            models.Index(fields=['status', 'date', 'time', 'id'], name='appt_status_date_time_idx'),
+        ]
 
     def __str__(self):
         return f"Appointment {self.id} - {self.patient.full_name} with {self.doctor.full_name}"
 
 
+# Appointment slot inventory
+class AppointmentSlot(models.Model):
+    doctor = models.ForeignKey(DoctorProfile, on_delete=models.CASCADE, related_name='slots')
+    date = models.DateField()
+    time = models.TimeField()
+    appointment = models.OneToOneField(Appointment, on_delete=models.SET_NULL, null=True, blank=True,
+                                       related_name='slot')
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['doctor', 'date', 'time'], name='unique_doctor_slot'),
+        ]
+
+    def __str__(self):
+        return f"Dr. {self.doctor.full_name} {self.date} {self.time}"
+
+
 # Medical History
 class MedicalHistory(models.Model):
     patient = models.ForeignKey(PatientProfile, on_delete=models.CASCADE)
@@ -103,6 +153,17 @@ class MedicalHistory(models.Model):
     allergies = models.TextField(blank=True)
     date = models.DateField()
     notes = models.TextField(blank=True)
+    # Set on the record created when the appointment is completed.
+    appointment = models.ForeignKey(Appointment, on_delete=models.SET_NULL, null=True, blank=True,
+                                    related_name='medical_history')
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['patient', 'date', 'id'], name='history_patient_date_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(fields=['appointment'], name='unique_history_per_appointment'),
+        ]
 
     def __str__(self):
         return f"{self.patient.full_name} - {self.diagnosis}"
@@ -119,6 +180,11 @@ class Prescription(models.Model):
     notes = models.TextField(blank=True, null=True)
     date_issued = models.DateField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['patient', 'date_issued', 'id'], name='rx_patient_date_idx'),
+        ]
+
     def __str__(self):
         return f"{self.medication_name} for {self.patient.full_name}"
 
@@ -132,9 +198,20 @@ class Bill(models.Model):
     date = models.DateField(auto_now_add=True)
     paid = models.BooleanField(default=False)
     payment_method = models.CharField(max_length=20, choices=[('Cash', 'Cash'), ('Online', 'Online')], default='Cash')
+    checkout_session_id = models.CharField(max_length=255, blank=True)
+    checkout_session_expires = models.DateTimeField(null=True, blank=True)
+    checkout_session_amount = models.PositiveBigIntegerField(null=True, blank=True)  # in paisa
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['patient', 'date', 'id'], name='bill_patient_date_idx'),
+        ]
+        constraints = [
+            models.CheckConstraint(condition=models.Q(amount__gte=0), name='bill_amount_non_negative'),
+        ]
 
     def __str__(self):
-        return f"Bill #{self.id} - {self.patient.user.username}"
+        return f"Bill #{self.id} - {self.patient.full_name}"
 
 # Facility
 class Facility(models.Model):
@@ -154,6 +231,11 @@ class HealthEducationResource(models.Model):
     link = models.URLField(blank=True, null=True)
     created_at = models.DateTimeField(auto_now_add=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['created_at', 'id'], name='resource_created_idx'),
+        ]
+
     def __str__(self):
         return self.title
 
@@ -165,6 +247,11 @@ class Announcement(models.Model):
     date = models.DateField(auto_now_add=True)
     link = models.URLField(blank=True, null=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['date', 'id'], name='announcement_date_idx'),
+        ]
+
     def __str__(self):
         return self.title
 
@@ -175,6 +262,11 @@ class HealthBulletin(models.Model):
     date = models.DateField(auto_now_add=True)
     pdf = models.FileField(upload_to='bulletins/', blank=True, null=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['date', 'id'], name='bulletin_date_idx'),
+        ]
+
     def __str__(self):
         return self.title
 
@@ -186,6 +278,11 @@ class MedicalResearch(models.Model):
     date = models.DateField(auto_now_add=True)
     document = models.FileField(upload_to='research_papers/', blank=True, null=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['date', 'id'], name='research_date_idx'),
+        ]
+
     def __str__(self):
         return self.title
 
@@ -197,7 +294,137 @@ class Publication(models.Model):
     date = models.DateField(auto_now_add=True)
     file = models.FileField(upload_to='publications/', blank=True, null=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['date', 'id'], name='publication_date_idx'),
+        ]
+
     def __str__(self):
         return self.title
 
 
+
+
+# Outgoing email queue
+class OutboxEmail(models.Model):
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('sent', 'Sent'),
+        ('failed', 'Failed'),
+    ]
+
+    subject = models.CharField(max_length=255)
+    body = models.TextField()
+    from_email = models.CharField(max_length=254)
+    to = models.TextField()  # comma-separated recipients
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending')
+    attempts = models.PositiveSmallIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at'], name='outbox_due_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.subject} -> {self.to} ({self.status})"
+
+
+# Search index document (used by the database-backed search backends)
+class SearchDocument(models.Model):
+    kind = models.CharField(max_length=20)
+    object_id = models.PositiveBigIntegerField()
+    patient = models.ForeignKey(PatientProfile, on_delete=models.CASCADE)
+    content = models.TextField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['kind', 'object_id'], name='unique_search_document'),
+        ]
+
+    def __str__(self):
+        return f"{self.kind}:{self.object_id}"
+
+
+# Bulk import checkpoint
+class ImportJob(models.Model):
+    STATUS_CHOICES = [
+        ('queued', 'Queued'),
+        ('running', 'Running'),
+        ('failed', 'Failed'),
+        ('completed', 'Completed'),
+    ]
+
+    source = models.CharField(max_length=64, unique=True)  # sha256 of the imported file
+    filename = models.CharField(max_length=255)
+    format = models.CharField(max_length=10, default='csv')
+    upload = models.CharField(max_length=255, blank=True)  # name in the "imports" storage until completed
+    chunk_size = models.PositiveIntegerField()
+    chunks_done = models.PositiveIntegerField(default=0)
+    rows_imported = models.PositiveIntegerField(default=0)
+    rows_skipped = models.PositiveIntegerField(default=0)
+    errors = models.JSONField(default=list, blank=True)  # [(row number, message)], the first MAX_REPORTED_ERRORS
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='running')
+    started_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.filename} ({self.status})"
+
+
+# Incrementally maintained counters behind the /metrics domain gauges
+class MetricCounter(models.Model):
+    name = models.CharField(max_length=50)
+    label = models.CharField(max_length=50, blank=True)  # e.g. the doctor id for per-doctor counters
+    value = models.DecimalField(max_digits=16, decimal_places=2, default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['name', 'label'], name='unique_metric_counter'),
+        ]
+
+    def __str__(self):
+        return f"{self.name}{{{self.label}}} = {self.value}"
+
+
+# Daily analytics rollups (maintained incrementally, see rollups.py)
+class DailyAppointmentStats(models.Model):
+    date = models.DateField()
+    doctor = models.ForeignKey(DoctorProfile, on_delete=models.CASCADE, related_name='+')
+    status = models.CharField(max_length=20, choices=Appointment.STATUS_CHOICES)
+    count = models.IntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['date', 'doctor', 'status'], name='unique_appointment_rollup'),
+        ]
+
+    def __str__(self):
+        return f"{self.date} doctor {self.doctor_id} {self.status}: {self.count}"
+
+
+class DailyBillingStats(models.Model):
+    date = models.DateField()
+    doctor = models.ForeignKey(DoctorProfile, on_delete=models.CASCADE, related_name='+')
+    bills = models.IntegerField(default=0)
+    billed = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+    paid = models.DecimalField(max_digits=14, decimal_places=2, default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['date', 'doctor'], name='unique_billing_rollup'),
+        ]
+
+    def __str__(self):
+        return f"{self.date} doctor {self.doctor_id}: {self.paid}/{self.billed}"
+
+
+class DailyPatientStats(models.Model):
+    date = models.DateField(unique=True)
+    new_patients = models.IntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.date}: {self.new_patients} new patients"
@@ -0,0 +1,114 @@
+import datetime
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db import transaction
+from django.utils import timezone
+
+from .models import OutboxEmail
+
+
+# --- Email outbox ---
+# Views never talk to SMTP. They queue an OutboxEmail row (in the same
+# transaction as whatever triggered it), and the ``send_queued_mail`` worker
+# delivers due messages in batches over one reused SMTP connection.
+# Failures, including an SMTP server that cannot be reached, are retried
+# with exponential backoff until MAX_ATTEMPTS.
+#
+# A worker claims a batch in a short transaction: it counts the attempt and
+# moves next_attempt_at LEASE ahead, so other workers skip the rows while
+# they are being sent. SMTP is only talked to after that commit. If the
+# worker dies mid-batch, its rows become due again when the lease runs out.
+
+MAX_ATTEMPTS = 5
+BASE_BACKOFF = 60          # seconds; doubles on every failed attempt
+MAX_BACKOFF = 60 * 60
+LEASE = datetime.timedelta(minutes=10)
+
+
+def queue_email(subject, body, to, from_email=None):
+    if isinstance(to, str):
+        to = [to]
+    return OutboxEmail.objects.create(
+        subject=subject[:255],
+        body=body,
+        from_email=from_email or settings.DEFAULT_FROM_EMAIL,
+        to=','.join(to),
+    )
+
+
+def queue_emails(messages, from_email=None):
+    # messages: (subject, body, to) tuples, queued with one INSERT.
+    return OutboxEmail.objects.bulk_create([
+        OutboxEmail(subject=subject[:255], body=body, from_email=from_email or settings.DEFAULT_FROM_EMAIL,
+                    to=','.join([to] if isinstance(to, str) else to))
+        for subject, body, to in messages
+    ])
+
+
+def backoff(attempts):
+    return datetime.timedelta(seconds=min(BASE_BACKOFF * 2 ** (attempts - 1), MAX_BACKOFF))
+
+
+def claim(batch_size, now):
+    # Due messages, leased to this worker. Rows claimed by another worker
+    # are skipped rather than waited for.
+    with transaction.atomic():
+        batch = list(
+            OutboxEmail.objects.select_for_update(skip_locked=True)
+            .filter(status='pending', next_attempt_at__lte=now)
+            .order_by('next_attempt_at', 'id')[:batch_size]
+        )
+        for email in batch:
+            email.attempts += 1
+            email.next_attempt_at = now + LEASE
+        OutboxEmail.objects.bulk_update(batch, ['attempts', 'next_attempt_at'])
+    return batch
+
+
+def _failed(email, error, now):
+    email.last_error = str(error)[:2000]
+    if email.attempts >= MAX_ATTEMPTS:
+        email.status = 'failed'
+    else:
+        email.next_attempt_at = now + backoff(email.attempts)
+
+
+def deliver_pending(batch_size=50, connection=None):
+    # Sends one batch of due messages and returns (sent, failed) counts.
+    now = timezone.now()
+    batch = claim(batch_size, now)
+    if not batch:
+        return 0, 0
+
+    own_connection = connection is None
+    sent = failed = 0
+    try:
+        connection = connection or get_connection()
+        connection.open()
+    except Exception as e:
+        # No server to talk to: the whole batch failed this attempt.
+        for email in batch:
+            _failed(email, e, now)
+        failed = len(batch)
+    else:
+        try:
+            for email in batch:
+                message = EmailMessage(email.subject, email.body, email.from_email, email.to.split(','),
+                                       connection=connection)
+                try:
+                    message.send()
+                except Exception as e:
+                    _failed(email, e, now)
+                    failed += 1
+                else:
+                    email.status = 'sent'
+                    email.sent_at = timezone.now()
+                    email.last_error = ''
+                    sent += 1
+        finally:
+            if own_connection:
+                connection.close()
+
+    OutboxEmail.objects.bulk_update(batch, ['status', 'next_attempt_at', 'last_error', 'sent_at'])
+    return sent, failed
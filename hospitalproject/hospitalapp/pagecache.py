@@ -0,0 +1,120 @@
+import hashlib
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction, sync_to_async
+from django.conf import settings
+from django.contrib.messages.storage.cookie import CookieStorage
+from django.http import HttpResponse
+from django.utils.cache import get_conditional_response, has_vary_header, patch_cache_control, patch_vary_headers
+
+from .fragments import fragment_cache, invalidate, version
+from .pagination import page_number
+from .routers import pin_primary
+
+
+# --- Public page cache ---
+# Anonymous GETs of the public content pages are answered from the cache.
+# Each page belongs to a section with its own version (the same scheme as
+# the dashboard fragments, owner "pages"). Signals bump the version when a
+# row of the section's model is saved or deleted, so every cached page
+# number goes stale at once. Pages are keyed on the normalized ``page``
+# parameter only, so tracking parameters or a garbage page number cannot
+# fill the cache with copies of the same page, and a page past the last
+# one is a 404, which is not stored either. The body is stored together
+# with its ETag (a hash of the body), so a hit runs no queries and a request
+# whose If-None-Match matches gets a 304. There is no Last-Modified: the
+# rows have no modification time, and their ``date`` is set by hand.
+#
+# Logged-in users, and visitors with a flash message waiting, get the page
+# rendered as usual. Responses that set cookies or vary on them (e.g. pages
+# with a CSRF token) are never stored.
+
+PAGE_OWNER = 'pages'
+PAGE_TIMEOUT = 3600
+PAGE_MAX_AGE = 60     # how long browsers and proxies may reuse a page without revalidating
+
+
+def invalidate_page(section):
+    invalidate(PAGE_OWNER, section)
+
+
+def _is_anonymous(request):
+    # Without a session cookie there is no user to load.
+    if settings.SESSION_COOKIE_NAME not in request.COOKIES:
+        return True
+    return not request.user.is_authenticated
+
+
+async def _ais_anonymous(request):
+    if settings.SESSION_COOKIE_NAME not in request.COOKIES:
+        return True
+    return not (await request.auser()).is_authenticated
+
+
+def _bypass(request):
+    return request.method not in ('GET', 'HEAD') or CookieStorage.cookie_name in request.COOKIES
+
+
+def _key(request, section):
+    return f"page:{section}:{version(PAGE_OWNER, section)}:{page_number(request, 'page')}"
+
+
+def _entry(response):
+    # The cache entry for a freshly rendered page, or None if it must not be stored.
+    if (response.status_code != 200 or response.streaming or response.cookies
+            or has_vary_header(response, 'Cookie')):
+        return None
+    return {
+        'content': response.content,
+        'content_type': response['Content-Type'],
+        'etag': f'"{hashlib.md5(response.content).hexdigest()}"',
+    }
+
+
+def _respond(request, entry):
+    response = HttpResponse(entry['content'], content_type=entry['content_type'])
+    response['ETag'] = entry['etag']
+    patch_cache_control(response, public=True, max_age=PAGE_MAX_AGE)
+    patch_vary_headers(response, ('Cookie',))
+    return get_conditional_response(request, etag=entry['etag'], response=response)
+
+
+def cached_page(section):
+    # Cache misses read the primary so a lagging replica never gets cached
+    # under the new version.
+    def decorator(view_func):
+        if iscoroutinefunction(view_func):
+            @wraps(view_func)
+            async def async_wrapper(request, *args, **kwargs):
+                if _bypass(request) or not await _ais_anonymous(request):
+                    return await view_func(request, *args, **kwargs)
+                cache = fragment_cache()
+                key = await sync_to_async(_key)(request, section)
+                entry = await cache.aget(key)
+                if entry is None:
+                    pin_primary()
+                    response = await view_func(request, *args, **kwargs)
+                    entry = _entry(response)
+                    if entry is None:
+                        return response
+                    await cache.aset(key, entry, PAGE_TIMEOUT)
+                return _respond(request, entry)
+            return async_wrapper
+
+        @wraps(view_func)
+        def wrapper(request, *args, **kwargs):
+            if _bypass(request) or not _is_anonymous(request):
+                return view_func(request, *args, **kwargs)
+            cache = fragment_cache()
+            key = _key(request, section)
+            entry = cache.get(key)
+            if entry is None:
+                pin_primary()
+                response = view_func(request, *args, **kwargs)
+                entry = _entry(response)
+                if entry is None:
+                    return response
+                cache.set(key, entry, PAGE_TIMEOUT)
+            return _respond(request, entry)
+        return wrapper
+    return decorator
@@ -0,0 +1,237 @@
+import base64
+import datetime
+import json
+from collections import namedtuple
+
+from django.db import connections
+from django.db.models import Q
+
+
+# --- Keyset (cursor) pagination ---
+# Pages are cut on (date, time, id) instead of OFFSET, so fetching page N
+# is a single index range scan and costs the same as fetching page 1.
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+
+def encode_cursor(date, time, pk):
+    raw = f"{date.isoformat()}|{time.isoformat()}|{pk}"
+    return base64.urlsafe_b64encode(raw.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        date, time, pk = base64.urlsafe_b64decode(padded.encode()).decode().split('|')
+        return datetime.date.fromisoformat(date), datetime.time.fromisoformat(time), int(pk)
+    except (ValueError, TypeError, UnicodeDecodeError):
+        return None
+
+
+class KeysetPage:
+    def __init__(self, items, next_cursor, params):
+        self.items = items
+        self.next_cursor = next_cursor
+        self._params = params
+
+    def __iter__(self):
+        return iter(self.items)
+
+    def __len__(self):
+        return len(self.items)
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+    @property
+    def next_query(self):
+        params = self._params.copy()
+        params['cursor'] = self.next_cursor
+        return params.urlencode()
+
+    @property
+    def first_query(self):
+        params = self._params.copy()
+        params.pop('cursor', None)
+        return params.urlencode()
+
+
+def requested_page_size(request, page_size=DEFAULT_PAGE_SIZE):
+    try:
+        page_size = min(int(request.GET.get('per_page', page_size)), MAX_PAGE_SIZE)
+    except ValueError:
+        pass
+    return max(page_size, 1)
+
+
+def _keyset_queryset(queryset, request, page_size):
+    # Newest first; ``id`` breaks ties between appointments in the same slot.
+    queryset = queryset.order_by('-date', '-time', '-id')
+    page_size = requested_page_size(request, page_size)
+
+    position = decode_cursor(request.GET.get('cursor', ''))
+    if position:
+        date, time, pk = position
+        queryset = queryset.filter(
+            Q(date__lt=date) |
+            Q(date=date, time__lt=time) |
+            Q(date=date, time=time, id__lt=pk)
+        )
+    # Fetch one extra row to find out whether another page exists.
+    return queryset[:page_size + 1], page_size
+
+
+def _keyset_page(rows, page_size, request):
+    next_cursor = None
+    if len(rows) > page_size:
+        rows = rows[:page_size]
+        last = rows[-1]
+        next_cursor = encode_cursor(last.date, last.time, last.id)
+    return KeysetPage(rows, next_cursor, request.GET)
+
+
+def keyset_paginate(queryset, request, page_size=DEFAULT_PAGE_SIZE):
+    queryset, page_size = _keyset_queryset(queryset, request, page_size)
+    return _keyset_page(list(queryset), page_size, request)
+
+
+async def akeyset_paginate(queryset, request, page_size=DEFAULT_PAGE_SIZE):
+    queryset, page_size = _keyset_queryset(queryset, request, page_size)
+    return _keyset_page([row async for row in queryset], page_size, request)
+
+
+# --- Sorted keyset pagination ---
+# The same idea for grids whose sort column is picked by the user: the
+# cursor carries the last row's sort value and id, and the next page starts
+# right after them. Each sortable column needs an index on (column, id).
+
+def encode_value_cursor(value, pk):
+    if isinstance(value, (datetime.date, datetime.datetime)):
+        value = value.isoformat()
+    return base64.urlsafe_b64encode(json.dumps([value, pk]).encode()).decode().rstrip('=')
+
+
+def decode_value_cursor(cursor):
+    # Returns (value, pk) or None. Date values stay ISO strings; lookups on
+    # date fields parse them.
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        value, pk = json.loads(base64.urlsafe_b64decode(padded.encode()).decode())
+        if not isinstance(value, (str, int, float)) or isinstance(value, bool):
+            return None
+        return value, int(pk)
+    except (ValueError, TypeError, UnicodeDecodeError):
+        return None
+
+
+def _value(row, name):
+    return row[name] if isinstance(row, dict) else getattr(row, name)
+
+
+def sorted_keyset_paginate(queryset, request, key, descending=False, page_size=DEFAULT_PAGE_SIZE):
+    # ``key`` is a field or annotation; rows may be instances or values() dicts.
+    direction = 'lt' if descending else 'gt'
+    queryset = queryset.order_by(f'-{key}' if descending else key, '-id' if descending else 'id')
+    page_size = requested_page_size(request, page_size)
+
+    position = decode_value_cursor(request.GET.get('cursor', ''))
+    if position:
+        value, pk = position
+        queryset = queryset.filter(Q(**{f'{key}__{direction}': value}) | Q(**{key: value, f'id__{direction}': pk}))
+
+    rows = list(queryset[:page_size + 1])
+    next_cursor = None
+    if len(rows) > page_size:
+        rows = rows[:page_size]
+        next_cursor = encode_value_cursor(_value(rows[-1], key), _value(rows[-1], 'id'))
+    return KeysetPage(rows, next_cursor, request.GET)
+
+
+# --- Approximate counts ---
+# COUNT(*) reads a whole index, which on a table with millions of rows costs
+# more than the page itself. Unfiltered totals come from the database's
+# table statistics; filtered ones are counted but stop at ``cap`` rows.
+
+APPROXIMATE_COUNT_CAP = 10000
+
+ApproximateCount = namedtuple('ApproximateCount', 'value kind')    # kind: exact, estimate or at_least
+
+
+def table_estimate(model, using='default'):
+    # Estimated row count from the planner statistics, or None if unavailable.
+    connection = connections[using]
+    if connection.vendor == 'mysql':
+        sql = "SELECT TABLE_ROWS FROM information_schema.TABLES WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s"
+    elif connection.vendor == 'postgresql':
+        sql = "SELECT reltuples::bigint FROM pg_class WHERE relname = %s"
+    else:
+        return None
+    with connection.cursor() as cursor:
+        cursor.execute(sql, [model._meta.db_table])
+        row = cursor.fetchone()
+    return int(row[0]) if row and row[0] is not None and row[0] >= 0 else None
+
+
+def approximate_count(queryset, filtered, cap=APPROXIMATE_COUNT_CAP):
+    if not filtered:
+        # Statistics are rough, so only trust them for big tables.
+        estimate = table_estimate(queryset.model, queryset.db)
+        if estimate is not None and estimate > cap:
+            return ApproximateCount(estimate, 'estimate')
+    count = queryset.order_by()[:cap + 1].count()
+    if count > cap:
+        return ApproximateCount(cap, 'at_least')
+    return ApproximateCount(count, 'exact')
+
+
+# --- Capped sections ---
+# Small per-user lists (dashboard sections) are paged with LIMIT/OFFSET but
+# never COUNT(*): one extra row tells us whether a next page exists.
+# Links only carry the section's own parameter so a rendered section does
+# not depend on the state of its neighbours (and can be cached on its own).
+
+class SectionPage:
+    def __init__(self, items, number, has_next, param):
+        self.items = items
+        self.number = number
+        self.has_next = has_next
+        self.has_previous = number > 1
+        self._param = param
+
+    def __iter__(self):
+        return iter(self.items)
+
+    def __len__(self):
+        return len(self.items)
+
+    @property
+    def next_query(self):
+        return f'{self._param}={self.number + 1}'
+
+    @property
+    def previous_query(self):
+        return f'{self._param}={self.number - 1}'
+
+
+def page_number(request, param):
+    try:
+        return max(int(request.GET.get(param, 1)), 1)
+    except ValueError:
+        return 1
+
+
+FEED_PAGE_SIZE = 20     # public content pages
+
+
+def section_page(queryset, number, param, page_size=10):
+    offset = (number - 1) * page_size
+    rows = list(queryset[offset:offset + page_size + 1])
+    return SectionPage(rows[:page_size], number, len(rows) > page_size, param)
+
+
+async def asection_page(queryset, number, param, page_size=10):
+    offset = (number - 1) * page_size
+    rows = [row async for row in queryset[offset:offset + page_size + 1]]
+    return SectionPage(rows[:page_size], number, len(rows) > page_size, param)
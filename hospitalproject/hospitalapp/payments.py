@@ -0,0 +1,135 @@
+import datetime
+import importlib.util
+import logging
+
+import stripe
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .models import Bill
+
+
+# --- Stripe checkout ---
+# A checkout session is created once per unpaid bill and reused until
+# shortly before Stripe expires it, so repeat clicks on "Pay" cost nothing.
+# The session remembers the amount it charges; once the bill's amount
+# changes it is no longer reused. Bills are marked paid only by the
+# signature-verified webhook, and only when the session charged the bill's
+# current amount in CURRENCY.
+
+# Stop reusing a session this long before Stripe expires it.
+SESSION_REUSE_MARGIN = datetime.timedelta(minutes=10)
+
+CURRENCY = 'inr'
+
+PAID_EVENTS = ('checkout.session.completed', 'checkout.session.async_payment_succeeded')
+
+logger = logging.getLogger('hospitalapp.payments')
+
+
+def configure():
+    stripe.api_key = settings.STRIPE_SECRET_KEY
+    if getattr(settings, 'STRIPE_API_BASE', ''):
+        stripe.api_base = settings.STRIPE_API_BASE
+
+
+def amount_minor(bill):
+    # Stripe amounts are in the currency's smallest unit (paisa).
+    return int(bill.amount * 100)
+
+
+def session_params(bill, success_url, cancel_url):
+    return {
+        'payment_method_types': ['card'],
+        'line_items': [{
+            'price_data': {
+                'currency': CURRENCY,
+                'product_data': {
+                    'name': f'Bill Payment for {bill.patient.user.get_full_name() or bill.patient.full_name}',
+                },
+                'unit_amount': amount_minor(bill),
+            },
+            'quantity': 1,
+        }],
+        'mode': 'payment',
+        'client_reference_id': str(bill.pk),
+        'metadata': {'bill_id': str(bill.pk)},
+        'success_url': success_url,
+        'cancel_url': cancel_url,
+    }
+
+
+def reusable_session_id(bill):
+    if bill.checkout_session_id and bill.checkout_session_expires:
+        if (bill.checkout_session_amount == amount_minor(bill)
+                and bill.checkout_session_expires - SESSION_REUSE_MARGIN > timezone.now()):
+            return bill.checkout_session_id
+    return None
+
+
+async def _create_session(params, idempotency_key):
+    configure()
+    # The native async client needs httpx; otherwise run the blocking call
+    # in a worker thread rather than on the event loop.
+    if importlib.util.find_spec('httpx'):
+        return await stripe.checkout.Session.create_async(idempotency_key=idempotency_key, **params)
+    create = sync_to_async(stripe.checkout.Session.create, thread_sensitive=False)
+    return await create(idempotency_key=idempotency_key, **params)
+
+
+async def get_checkout_session_id(bill, success_url, cancel_url):
+    session_id = reusable_session_id(bill)
+    if session_id:
+        return session_id
+
+    # Two clicks racing past the check above get the same session back; a
+    # new amount gets a new one.
+    amount = amount_minor(bill)
+    idempotency_key = f'bill-{bill.pk}-checkout-{amount}-{int(timezone.now().timestamp() // 3600)}'
+    session = await _create_session(session_params(bill, success_url, cancel_url), idempotency_key)
+
+    bill.checkout_session_id = session.id
+    bill.checkout_session_expires = datetime.datetime.fromtimestamp(session.expires_at, tz=datetime.timezone.utc)
+    bill.checkout_session_amount = amount
+    await bill.asave(update_fields=['checkout_session_id', 'checkout_session_expires', 'checkout_session_amount'])
+    return session.id
+
+
+def construct_event(payload, signature):
+    # Raises ValueError or stripe.SignatureVerificationError when invalid.
+    event = stripe.Webhook.construct_event(payload, signature, settings.STRIPE_WEBHOOK_SECRET)
+    return event.to_dict()
+
+
+def handle_event(event):
+    # Idempotent: Stripe may deliver the same event more than once.
+    if event['type'] not in PAID_EVENTS:
+        return False
+    session = event['data']['object']
+    if session.get('payment_status') != 'paid':
+        return False
+    bill_id = (session.get('metadata') or {}).get('bill_id') or session.get('client_reference_id')
+    if not bill_id:
+        return False
+    try:
+        bill_id = int(bill_id)
+    except (TypeError, ValueError):
+        # Answered 200 all the same: Stripe would only retry the same metadata.
+        logger.warning('Checkout session %s names bill %r, which is not an id; ignoring it.', session.get('id'), bill_id)
+        return False
+
+    with transaction.atomic():
+        bill = Bill.objects.select_for_update().filter(pk=bill_id).first()
+        if bill is None or bill.paid:
+            return False
+        if session.get('amount_total') != amount_minor(bill) or (session.get('currency') or '').lower() != CURRENCY:
+            logger.warning('Checkout session %s paid %s %s for bill %s of %s %s; not marking it paid.',
+                           session.get('id'), session.get('amount_total'), session.get('currency'), bill.pk,
+                           amount_minor(bill), CURRENCY)
+            return False
+        bill.paid = True
+        bill.payment_method = 'Online'
+        bill.save(update_fields=['paid', 'payment_method'])
+    return True
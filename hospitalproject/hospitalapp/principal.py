@@ -0,0 +1,138 @@
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.contrib.auth import get_user_model
+from django.contrib.auth.backends import ModelBackend
+from django.core.exceptions import ObjectDoesNotExist
+from django.utils.functional import SimpleLazyObject, cached_property
+
+from .fragments import fragment_cache
+from .profiles import PROFILE_MODELS, role_for
+
+
+# --- Request principal ---
+# Each logged-in request needs the user, their role and their profile.
+# Without this module that costs one query for the user, and then each
+# view runs another to load request.user.patientprofile or doctorprofile.
+#
+# CachedModelBackend loads the user with all three profiles in one query
+# (LEFT JOINs) and keeps the result in the dashboards cache for
+# PRINCIPAL_TIMEOUT. On a hit, request.user and its profiles cost no
+# queries. Signals forget the entry whenever the user or one of their
+# profiles is saved or deleted (see signals.py). Writes that skip signals
+# (queryset.update) show up once the entry expires. The dashboards cache
+# must be shared in production: with the in-process default, a change made
+# by another worker is only seen after expiry. In particular, a password
+# change made elsewhere logs the user out of that worker until then.
+#
+# PrincipalMiddleware sets request.principal, built lazily from
+# request.user, with the role flags, role and profiles.
+
+PRINCIPAL_TIMEOUT = 300
+PROFILE_RELATIONS = [model._meta.model_name for model in PROFILE_MODELS.values()]
+
+# In the order login has always checked the flags.
+DASHBOARDS = [('is_admin', 'admin_dashboard'), ('is_doctor', 'doctor_dashboard'), ('is_patient', 'patient_dashboard')]
+
+
+def _key(user_id):
+    return f'principal:{user_id}'
+
+
+def load_user(user_id):
+    cache = fragment_cache()
+    user = cache.get(_key(user_id))
+    if user is None:
+        user = get_user_model()._default_manager.select_related(*PROFILE_RELATIONS).filter(pk=user_id).first()
+        if user is None:
+            return None
+        cache.set(_key(user_id), user, PRINCIPAL_TIMEOUT)
+    return user
+
+
+def forget(user_id):
+    fragment_cache().delete(_key(user_id))
+
+
+class CachedModelBackend(ModelBackend):
+    def get_user(self, user_id):
+        user = load_user(user_id)
+        return user if user is not None and self.user_can_authenticate(user) else None
+
+    async def aget_user(self, user_id):
+        return await sync_to_async(self.get_user)(user_id)
+
+
+def _related(user, name):
+    try:
+        return getattr(user, name)
+    except (AttributeError, ObjectDoesNotExist):
+        return None
+
+
+class Principal:
+    def __init__(self, user):
+        self.user = user
+        self.id = user.pk
+        self.is_authenticated = user.is_authenticated
+        self.is_admin = getattr(user, 'is_admin', False)
+        self.is_doctor = getattr(user, 'is_doctor', False)
+        self.is_patient = getattr(user, 'is_patient', False)
+
+    @cached_property
+    def role(self):
+        return role_for(self.user) if self.is_authenticated else ''
+
+    @cached_property
+    def patient(self):
+        return _related(self.user, 'patientprofile') if self.is_patient else None
+
+    @cached_property
+    def doctor(self):
+        return _related(self.user, 'doctorprofile') if self.is_doctor else None
+
+    @cached_property
+    def profile(self):
+        # The profile that goes with ``role``.
+        model = PROFILE_MODELS.get(self.role)
+        return _related(self.user, model._meta.model_name) if model else None
+
+    @property
+    def patient_id(self):
+        return self.patient.pk if self.patient else None
+
+    @property
+    def doctor_id(self):
+        return self.doctor.pk if self.doctor else None
+
+    @property
+    def profile_id(self):
+        return self.profile.pk if self.profile else None
+
+    @property
+    def dashboard(self):
+        # URL name of the user's landing page, or None for a user without a role.
+        for flag, url_name in DASHBOARDS:
+            if getattr(self, flag):
+                return url_name
+        return None
+
+
+class PrincipalMiddleware:
+    # Goes after AuthenticationMiddleware. Async views must load the user
+    # first (views.current_principal) before touching request.principal.
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        request.principal = SimpleLazyObject(lambda: Principal(request.user))
+        return self.get_response(request)
+
+    async def __acall__(self, request):
+        request.principal = SimpleLazyObject(lambda: Principal(request.user))
+        return await self.get_response(request)
@@ -0,0 +1,82 @@
+from django.db.models import Case, OuterRef, Subquery, Value, When
+from django.db.models.functions import Coalesce
+
+from .models import AdminProfile, CustomUser, DoctorProfile, PatientProfile
+
+
+# --- Denormalized user names ---
+# CustomUser.role, display_name and profile_age copy the user's role flags
+# and the full_name and age of that role's profile, so user.full_name and
+# every listing of users, appointments or bills read one row instead of
+# probing up to three profiles, and the user grid sorts by age on an index. Signals keep them current when a user's flags change or a
+# profile is saved or deleted (see signals.py). Bulk writes that bypass
+# signals set the fields themselves or call ``sync_display_names``.
+
+NO_AGE = -1
+
+PROFILE_MODELS = {
+    'patient': PatientProfile,
+    'doctor': DoctorProfile,
+    'admin': AdminProfile,
+}
+PROFILE_ROLES = {model: role for role, model in PROFILE_MODELS.items()}
+
+
+def role_for(user):
+    # Flags are checked in the order user.full_name always used.
+    if user.is_patient:
+        return 'patient'
+    if user.is_doctor:
+        return 'doctor'
+    if user.is_admin:
+        return 'admin'
+    return ''
+
+
+def profile_age(age):
+    return NO_AGE if age is None else age
+
+
+def profile_fields(user_id, role):
+    # (display_name, profile_age) for the user's profile of ``role``.
+    model = PROFILE_MODELS.get(role)
+    if model is None or user_id is None:
+        return '', NO_AGE
+    name, age = model.objects.filter(user_id=user_id).values_list('full_name', 'age').first() or ('', None)
+    return name, profile_age(age)
+
+
+def attach_profiles(rows, fields):
+    # rows: CustomUser values() dicts with 'id' and 'role'. Adds
+    # row['profile'] (a dict of ``fields``, or None) with one query per role
+    # present.
+    by_role = {}
+    for row in rows:
+        row['profile'] = None
+        by_role.setdefault(row['role'], []).append(row)
+    for role, members in by_role.items():
+        model = PROFILE_MODELS.get(role)
+        if model is None:
+            continue
+        profiles = {p['user_id']: p for p in model.objects.filter(
+            user_id__in=[row['id'] for row in members]).values('user_id', *fields)}
+        for row in members:
+            row['profile'] = profiles.get(row['id'])
+    return rows
+
+
+def sync_display_names(users=None):
+    # Recomputes role, display_name and profile_age for ``users`` (default:
+    # everyone) with one UPDATE per role.
+    users = CustomUser.objects.all() if users is None else users
+    users.update(role=Case(
+        When(is_patient=True, then=Value('patient')),
+        When(is_doctor=True, then=Value('doctor')),
+        When(is_admin=True, then=Value('admin')),
+        default=Value(''),
+    ))
+    for role, model in PROFILE_MODELS.items():
+        profile = model.objects.filter(user=OuterRef('pk'))
+        users.filter(role=role).update(display_name=Coalesce(Subquery(profile.values('full_name')[:1]), Value('')),
+                                       profile_age=Coalesce(Subquery(profile.values('age')[:1]), Value(NO_AGE)))
+    users.filter(role='').update(display_name='', profile_age=NO_AGE)
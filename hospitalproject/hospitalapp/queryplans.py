@@ -0,0 +1,180 @@
+import re
+
+from django.db import connections
+from django.db.models import Q
+from django.utils import timezone
+
+from .pagination import FEED_PAGE_SIZE
+from .models import (
+    CustomUser, PatientProfile, DoctorProfile, Appointment, AppointmentSlot, MedicalHistory, Prescription, Bill,
+    HealthEducationResource, Announcement, HealthBulletin, MedicalResearch, Publication, OutboxEmail,
+)
+
+
+# --- Hot query plans ---
+# Every query a hot view or worker runs on each request is registered here
+# in the same shape the view builds it. ``explain_hot_queries`` runs EXPLAIN
+# on each one and fails if the plan reads a whole table or a whole index, so
+# a dropped or mismatched index shows up before it reaches production.
+#
+# Walking an index from one end is fine for an unfiltered query with a
+# LIMIT (the newest N rows): it stops after N entries. Any other full index
+# scan fails, unless the query is registered with index_scan=True.
+
+HOT_QUERIES = {}
+INDEX_SCANS = set()     # hot queries allowed to walk a whole index
+
+# vendor -> patterns capturing the table name of a full table scan, and of a full index scan
+FULL_SCAN_PATTERNS = {
+    'mysql': (                                                      # EXPLAIN FORMAT=TREE
+        re.compile(r'Table scan on (\w+)'),
+        re.compile(r'(?:Covering index|Index) scan on (\w+)'),
+    ),
+    'postgresql': (
+        re.compile(r'Seq Scan on (\w+)'),
+        re.compile(r'Index (?:Only )?Scan(?: Backward)? using \w+ on (\w+)(?![^\n]*\n\s*Index Cond)'),
+    ),
+    'sqlite': (
+        re.compile(r'\bSCAN (\w+)\s*$', re.MULTILINE),
+        re.compile(r'\bSCAN (\w+) USING (?:COVERING )?INDEX'),     # SEARCH ... USING INDEX is a range
+    ),
+}
+
+USER_GRID_COLUMNS = ('id', 'username', 'display_name', 'email', 'role', 'date_joined', 'profile_age')   # see views.manage_users
+APPOINTMENT_ORDER = ('-date', '-time', '-id')   # see pagination.keyset_paginate
+
+
+def hot_query(name, index_scan=False):
+    def register(func):
+        HOT_QUERIES[name] = func
+        if index_scan:
+            INDEX_SCANS.add(name)
+        return func
+    return register
+
+
+def sample_values():
+    # Real ids where the tables have rows, so the optimizer sees realistic
+    # selectivity; any id works on an empty database.
+    return {
+        'patient': PatientProfile.objects.order_by('pk').values_list('pk', flat=True).first() or 1,
+        'doctor': DoctorProfile.objects.order_by('pk').values_list('pk', flat=True).first() or 1,
+        'today': timezone.localdate(),
+        'now': timezone.now(),
+    }
+
+
+def full_scans(queryset, index_scans=True):
+    # Returns (plan text, tables read in full, by a table scan or, with
+    # ``index_scans``, by a full index scan).
+    plan = queryset.explain()
+    patterns = FULL_SCAN_PATTERNS.get(connections[queryset.db].vendor)
+    if not patterns:
+        return plan, []
+    table_scan, index_scan = patterns
+    scanned = set(table_scan.findall(plan))
+    query = queryset.query
+    if index_scans and (query.high_mark is None or query.where):
+        scanned.update(index_scan.findall(plan))
+    return plan, sorted(scanned)
+
+
+@hot_query('appointments.all')
+def appointments_all(sample):
+    return Appointment.objects.select_related('patient', 'doctor').order_by(*APPOINTMENT_ORDER)[:51]
+
+
+@hot_query('appointments.by_status')
+def appointments_by_status(sample):
+    return Appointment.objects.filter(status='Pending').order_by(*APPOINTMENT_ORDER)[:51]
+
+
+@hot_query('appointments.by_patient')
+def appointments_by_patient(sample):
+    return Appointment.objects.filter(patient_id=sample['patient']).order_by(*APPOINTMENT_ORDER)[:11]
+
+
+@hot_query('appointments.by_doctor')
+def appointments_by_doctor(sample):
+    return Appointment.objects.filter(doctor_id=sample['doctor']).order_by(*APPOINTMENT_ORDER)[:51]
+
+
+@hot_query('appointments.booked_times')
+def appointments_booked_times(sample):
+    return Appointment.objects.filter(
+        doctor_id__in=[sample['doctor']], date__in=[sample['today']]
+    ).exclude(status='Declined').values_list('doctor_id', 'date', 'time')
+
+
+@hot_query('slots.free')
+def slots_free(sample):
+    return AppointmentSlot.objects.filter(doctor_id=sample['doctor'], date=sample['today'], appointment__isnull=True)
+
+
+@hot_query('users.newest')
+def users_newest(sample):
+    return CustomUser.objects.values(*USER_GRID_COLUMNS).order_by('-date_joined', '-id')[:51]
+
+
+@hot_query('users.by_role_name')
+def users_by_role_name(sample):
+    return CustomUser.objects.filter(role='patient').values(*USER_GRID_COLUMNS).order_by('display_name', 'id')[:51]
+
+
+@hot_query('users.by_role_age')
+def users_by_role_age(sample):
+    return CustomUser.objects.filter(role='patient').values(*USER_GRID_COLUMNS).order_by('-profile_age', '-id')[:51]
+
+
+# Prefixes of two columns: MySQL merges two index ranges, but SQLite's
+# case-insensitive LIKE cannot use either index and walks user_name_idx.
+@hot_query('users.prefix', index_scan=True)
+def users_prefix(sample):
+    return CustomUser.objects.filter(Q(username__istartswith='an') | Q(display_name__istartswith='an')).values(*USER_GRID_COLUMNS).order_by(
+        'display_name', 'id')[:51]
+
+
+@hot_query('medical_history.by_patient')
+def medical_history_by_patient(sample):
+    return MedicalHistory.objects.filter(patient_id=sample['patient']).order_by('-date', '-id')[:11]
+
+
+@hot_query('prescriptions.by_patient')
+def prescriptions_by_patient(sample):
+    return Prescription.objects.filter(patient_id=sample['patient']).order_by('-date_issued', '-id')[:11]
+
+
+@hot_query('bills.by_patient')
+def bills_by_patient(sample):
+    return Bill.objects.filter(patient_id=sample['patient']).order_by('-date', '-id')[:11]
+
+
+@hot_query('resources.latest')
+def resources_latest(sample):
+    return HealthEducationResource.objects.order_by('-created_at', '-id')[:11]
+
+
+@hot_query('feeds.announcements')
+def feeds_announcements(sample):
+    return Announcement.objects.order_by('-date', '-id')[:FEED_PAGE_SIZE]
+
+
+@hot_query('feeds.health_bulletin')
+def feeds_health_bulletin(sample):
+    return HealthBulletin.objects.order_by('-date', '-id')[:FEED_PAGE_SIZE]
+
+
+@hot_query('feeds.medical_research')
+def feeds_medical_research(sample):
+    return MedicalResearch.objects.order_by('-date', '-id')[:FEED_PAGE_SIZE]
+
+
+@hot_query('feeds.publications')
+def feeds_publications(sample):
+    return Publication.objects.order_by('-date', '-id')[:FEED_PAGE_SIZE]
+
+
+@hot_query('outbox.due')
+def outbox_due(sample):
+    return OutboxEmail.objects.filter(status='pending', next_attempt_at__lte=sample['now']).order_by(
+        'next_attempt_at', 'id')[:50]
@@ -0,0 +1,218 @@
+import datetime
+from collections import Counter
+from decimal import Decimal
+
+from django.db import IntegrityError, transaction
+from django.db.models import Case, Count, DecimalField, F, Sum, When
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .models import (
+    Appointment, Bill, PatientProfile, DoctorProfile, DailyAppointmentStats, DailyBillingStats, DailyPatientStats,
+)
+from .slots import parse_available_days, slot_times
+
+
+# --- Analytics rollups ---
+# Three daily tables feed the admin dashboard:
+#   DailyAppointmentStats  appointments per (date, doctor, status)
+#   DailyBillingStats      bill count, billed and paid amount per (date, doctor)
+#   DailyPatientStats      new patients per date joined
+# Signals apply each Appointment/Bill/PatientProfile change as a +/- delta
+# once it commits (see signals.py), so the dashboard reads a fixed window of
+# rollup rows no matter how much history there is. ``backfill_rollups``
+# recomputes any date range from the source tables, e.g. after bulk loads or
+# after a process died between a commit and its deltas.
+
+DASHBOARD_DAYS = 30
+TOP_DOCTORS = 10
+
+
+def increment(model, lookup, **deltas):
+    # Adds ``deltas`` to the row matching ``lookup``, creating it if needed.
+    deltas = {field: delta for field, delta in deltas.items() if delta}
+    if not deltas:
+        return
+    updates = {field: F(field) + delta for field, delta in deltas.items()}
+    if model.objects.filter(**lookup).update(**updates):
+        return
+    try:
+        with transaction.atomic():
+            model.objects.create(**lookup, **deltas)
+    except IntegrityError:
+        # Created by a concurrent request in the meantime.
+        model.objects.filter(**lookup).update(**updates)
+
+
+# --- Incremental maintenance ---
+# ``old`` and ``new`` are the loaded and saved states kept by signals.py, or
+# None for a row that did not exist before / no longer exists.
+
+def appointment_changed(old, new):
+    # state: (doctor id, date, status)
+    appointments_changed([(old, new)])
+
+
+def appointments_changed(changes):
+    # One row update per (doctor, date, status) touched by the batch.
+    deltas = Counter()
+    for old, new in changes:
+        if old == new:
+            continue
+        if old:
+            deltas[old] -= 1
+        if new:
+            deltas[new] += 1
+    for (doctor_id, date, status), delta in deltas.items():
+        increment(DailyAppointmentStats, {'doctor_id': doctor_id, 'date': date, 'status': status}, count=delta)
+
+
+def _bill_totals(state, sign):
+    doctor_id, date, amount, paid = state
+    return (doctor_id, date), {'bills': sign, 'billed': sign * amount, 'paid': sign * amount if paid else 0}
+
+
+def bill_changed(old, new):
+    # state: (doctor id, date, amount, paid)
+    if old == new:
+        return
+    changes = {}
+    for state, sign in ((old, -1), (new, 1)):
+        if state:
+            key, deltas = _bill_totals(state, sign)
+            totals = changes.setdefault(key, {})
+            for field, delta in deltas.items():
+                totals[field] = totals.get(field, 0) + delta
+    for (doctor_id, date), deltas in changes.items():
+        increment(DailyBillingStats, {'doctor_id': doctor_id, 'date': date}, **deltas)
+
+
+def patient_joined(date, delta=1):
+    increment(DailyPatientStats, {'date': date}, new_patients=delta)
+
+
+# --- Backfill ---
+
+def _backfill_range(start, end):
+    with transaction.atomic():
+        DailyAppointmentStats.objects.filter(date__range=(start, end)).delete()
+        DailyAppointmentStats.objects.bulk_create(
+            DailyAppointmentStats(date=row['date'], doctor_id=row['doctor_id'], status=row['status'],
+                                  count=row['count'])
+            for row in Appointment.objects.filter(date__range=(start, end)).order_by()
+            .values('date', 'doctor_id', 'status').annotate(count=Count('id'))
+        )
+
+        DailyBillingStats.objects.filter(date__range=(start, end)).delete()
+        paid_amount = Case(When(paid=True, then='amount'), default=Decimal(0), output_field=DecimalField())
+        DailyBillingStats.objects.bulk_create(
+            DailyBillingStats(date=row['date'], doctor_id=row['doctor_id'], bills=row['bills'],
+                              billed=row['billed'], paid=row['paid_amount'])
+            for row in Bill.objects.filter(date__range=(start, end)).order_by()
+            .values('date', 'doctor_id').annotate(bills=Count('id'), billed=Sum('amount'), paid_amount=Sum(paid_amount))
+        )
+
+        DailyPatientStats.objects.filter(date__range=(start, end)).delete()
+        DailyPatientStats.objects.bulk_create(
+            DailyPatientStats(date=row['day'], new_patients=row['count'])
+            for row in PatientProfile.objects.annotate(day=TruncDate('user__date_joined'))
+            .filter(day__range=(start, end)).order_by().values('day').annotate(count=Count('id'))
+        )
+
+
+def history_bounds():
+    first = [d for d in (
+        Appointment.objects.order_by('date').values_list('date', flat=True).first(),
+        Bill.objects.order_by('date').values_list('date', flat=True).first(),
+    ) if d]
+    joined = PatientProfile.objects.order_by('user__date_joined').values_list('user__date_joined', flat=True).first()
+    if joined:
+        first.append(timezone.localdate(joined))
+    last = Appointment.objects.order_by('-date').values_list('date', flat=True).first()
+    end = max(filter(None, [last, timezone.localdate()]))
+    return (min(first) if first else end), end
+
+
+def backfill(start=None, end=None, step_days=31, progress=None):
+    # Rebuilds the rollups for [start, end] one step at a time, each step in
+    # its own transaction so a long history never holds one huge lock.
+    if start is None or end is None:
+        first, last = history_bounds()
+        start, end = start or first, end or last
+    current = start
+    while current <= end:
+        step_end = min(current + datetime.timedelta(days=step_days - 1), end)
+        _backfill_range(current, step_end)
+        if progress:
+            progress(current, step_end)
+        current = step_end + datetime.timedelta(days=1)
+
+
+# --- Dashboard ---
+
+def _weekdays_between(days, start, end):
+    return sum(1 for i in range((end - start).days + 1) if (start + datetime.timedelta(days=i)).weekday() in days)
+
+
+def dashboard(days=DASHBOARD_DAYS, today=None):
+    # Per-day series and top doctors for the last ``days`` days. Reads only
+    # rollup rows inside the window.
+    end = today or timezone.localdate()
+    start = end - datetime.timedelta(days=days - 1)
+    window = {'date__range': (start, end)}
+    series = {start + datetime.timedelta(days=i): {
+        'date': start + datetime.timedelta(days=i), 'statuses': {}, 'appointments': 0,
+        'billed': Decimal(0), 'paid': Decimal(0), 'new_patients': 0,
+    } for i in range(days)}
+
+    for row in (DailyAppointmentStats.objects.filter(**window).order_by()
+                .values('date', 'status').annotate(total=Sum('count'))):
+        day = series[row['date']]
+        day['statuses'][row['status']] = row['total']
+        day['appointments'] += row['total']
+    for row in (DailyBillingStats.objects.filter(**window).order_by()
+                .values('date').annotate(billed=Sum('billed'), paid=Sum('paid'))):
+        series[row['date']].update(billed=row['billed'], paid=row['paid'])
+    for date, count in DailyPatientStats.objects.filter(**window).values_list('date', 'new_patients'):
+        series[date]['new_patients'] = count
+
+    top = list(DailyAppointmentStats.objects.filter(**window).exclude(status='Declined').order_by()
+               .values('doctor_id').annotate(booked=Sum('count')).order_by('-booked', 'doctor_id')[:TOP_DOCTORS])
+    profiles = DoctorProfile.objects.only('full_name', 'specialization', 'available_days').in_bulk(
+        [row['doctor_id'] for row in top])
+    per_day = len(slot_times())
+    doctors = []
+    for row in top:
+        doctor = profiles.get(row['doctor_id'])
+        if doctor is None:
+            continue
+        capacity = per_day * _weekdays_between(parse_available_days(doctor.available_days), start, end)
+        doctors.append({
+            'doctor': doctor,
+            'booked': row['booked'],
+            'capacity': capacity,
+            'utilization': round(100 * row['booked'] / capacity) if capacity else 0,
+        })
+
+    statuses = [status for status, _ in Appointment.STATUS_CHOICES]
+    days_list = list(series.values())
+    for day in days_list:
+        day['by_status'] = [(status, day['statuses'].get(status, 0)) for status in statuses]
+    return {
+        'start': start,
+        'end': end,
+        'days': days_list,
+        'doctors': doctors,
+        'statuses': statuses,
+        'totals': {
+            'appointments': sum(d['appointments'] for d in days_list),
+            'billed': sum(d['billed'] for d in days_list),
+            'paid': sum(d['paid'] for d in days_list),
+            'new_patients': sum(d['new_patients'] for d in days_list),
+        },
+        'max': {
+            'appointments': max([d['appointments'] for d in days_list] + [1]),
+            'billed': max([d['billed'] for d in days_list] + [1]),
+            'new_patients': max([d['new_patients'] for d in days_list] + [1]),
+        },
+    }
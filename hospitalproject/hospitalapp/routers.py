@@ -0,0 +1,141 @@
+import random
+from contextvars import ContextVar
+from functools import wraps
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+
+
+# --- Read replicas ---
+# Writes always go to ``default``. Views decorated with @replica_reads send
+# their reads to one of DATABASE_REPLICAS, picked per request; everything
+# else (auth and session lookups included) reads from the primary.
+#
+# Read-your-writes: once a request writes, the rest of it reads from the
+# primary, and ReplicaPinMiddleware sets a short-lived cookie after any
+# POST or write so the same browser keeps reading from the primary for
+# REPLICA_PIN_SECONDS, long enough for the replicas to catch up.
+
+PIN_COOKIE = 'db_primary_pin'
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+_current = ContextVar('db_routing', default=None)
+
+
+class RoutingState:
+    def __init__(self):
+        self.replica = None
+        self.wrote = False
+        self.pinned = False
+
+
+def replicas():
+    return list(getattr(settings, 'DATABASE_REPLICAS', []))
+
+
+def is_pinned(request):
+    return request.method not in SAFE_METHODS or PIN_COOKIE in request.COOKIES
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        state = _current.get()
+        if state is None or state.replica is None or state.wrote or state.pinned:
+            return None
+        if 'instance' in hints:
+            # Related lookups follow the database the instance came from.
+            return None
+        return state.replica
+
+    def db_for_write(self, model, **hints):
+        state = _current.get()
+        if state is not None:
+            state.wrote = True
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        databases = {'default', *replicas()}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Replicas get their schema and rows through replication.
+        return False if db in replicas() else None
+
+
+class ReplicaPinMiddleware:
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        state = RoutingState()
+        token = _current.set(state)
+        try:
+            response = self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self.pin(request, response, state)
+
+    async def __acall__(self, request):
+        # sync_to_async copies the context, so ORM calls made on other
+        # threads see (and update) this same state object.
+        state = RoutingState()
+        token = _current.set(state)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _current.reset(token)
+        return self.pin(request, response, state)
+
+    def pin(self, request, response, state):
+        if state.wrote or request.method not in SAFE_METHODS:
+            response.set_cookie(PIN_COOKIE, '1', max_age=getattr(settings, 'REPLICA_PIN_SECONDS', 5),
+                                httponly=True, samesite='Lax')
+        return response
+
+
+def pin_primary():
+    # Sends the rest of this request's reads to the primary.
+    state = _current.get()
+    if state is not None:
+        state.pinned = True
+
+
+def replica_reads(view_func):
+    # Innermost decorator, so login checks still read the primary.
+    def choose(request):
+        state = _current.get()
+        choices = replicas()
+        if state is None or not choices or is_pinned(request):
+            return None
+        state.replica = random.choice(choices)
+        return state
+
+    if iscoroutinefunction(view_func):
+        @wraps(view_func)
+        async def async_wrapper(request, *args, **kwargs):
+            state = choose(request)
+            try:
+                return await view_func(request, *args, **kwargs)
+            finally:
+                if state is not None:
+                    state.replica = None
+        return async_wrapper
+
+    @wraps(view_func)
+    def wrapper(request, *args, **kwargs):
+        state = choose(request)
+        try:
+            return view_func(request, *args, **kwargs)
+        finally:
+            if state is not None:
+                state.replica = None
+    return wrapper
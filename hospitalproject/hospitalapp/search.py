@@ -0,0 +1,232 @@
+import math
+import re
+import threading
+from bisect import bisect_left
+from collections import defaultdict
+
+from django.conf import settings
+from django.db.models.expressions import RawSQL
+from django.utils.module_loading import import_string
+
+from .models import PatientProfile, MedicalHistory, Prescription, SearchDocument
+
+
+# --- Patient search ---
+# Every searchable row becomes a document (kind, object id, patient id, text):
+#   patient       PatientProfile.full_name, phone
+#   history       MedicalHistory.diagnosis, notes, medications
+#   prescription  Prescription.medication_name
+# Documents are handed to the backend named in settings.SEARCH_BACKEND and
+# kept current by signals (see signals.py). ``rebuild_search_index``
+# reindexes everything, e.g. after bulk imports that bypass signals.
+
+TOKEN_RE = re.compile(r'\w+')
+
+# kind -> (model, fields)
+SOURCES = {
+    'patient': (PatientProfile, ['full_name', 'phone']),
+    'history': (MedicalHistory, ['diagnosis', 'notes', 'medications']),
+    'prescription': (Prescription, ['medication_name']),
+}
+KINDS = {model: kind for kind, (model, _) in SOURCES.items()}
+
+
+def tokenize(text):
+    return TOKEN_RE.findall((text or '').lower())
+
+
+def document_for(instance):
+    kind = KINDS[type(instance)]
+    _, fields = SOURCES[kind]
+    patient_id = instance.pk if kind == 'patient' else instance.patient_id
+    return kind, instance.pk, patient_id, ' '.join(str(getattr(instance, f) or '') for f in fields)
+
+
+def iter_documents(chunk_size=2000):
+    for kind, (model, fields) in SOURCES.items():
+        patient_field = 'id' if kind == 'patient' else 'patient_id'
+        rows = model.objects.values_list('id', patient_field, *fields)
+        for pk, patient_id, *values in rows.iterator(chunk_size=chunk_size):
+            yield kind, pk, patient_id, ' '.join(str(v or '') for v in values)
+
+
+class SearchHit:
+    def __init__(self, kind, object_id, patient_id, score):
+        self.kind = kind
+        self.object_id = object_id
+        self.patient_id = patient_id
+        self.score = score
+
+
+class InMemorySearchBackend:
+    # Inverted index held in process memory and ranked with BM25. Loaded from
+    # the database on first use. Each worker has its own copy and sees only
+    # its own updates, so this is for development and tests.
+
+    K1 = 1.2
+    B = 0.75
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._loaded = False
+        self._reset()
+
+    def _reset(self):
+        self._postings = defaultdict(dict)   # token -> {doc key: term frequency}
+        self._docs = {}                      # doc key -> (patient id, length, tokens)
+        self._total_length = 0
+        self._vocabulary = None              # sorted tokens, rebuilt lazily for prefix lookups
+
+    def _ensure_loaded(self):
+        if not self._loaded:
+            for document in iter_documents():
+                self._add(*document)
+            self._loaded = True
+
+    def _add(self, kind, pk, patient_id, text):
+        key = (kind, pk)
+        self._remove(key)
+        tokens = tokenize(text)
+        counts = defaultdict(int)
+        for token in tokens:
+            counts[token] += 1
+        for token, count in counts.items():
+            self._postings[token][key] = count
+        self._docs[key] = (patient_id, len(tokens), list(counts))
+        self._total_length += len(tokens)
+        self._vocabulary = None
+
+    def _remove(self, key):
+        doc = self._docs.pop(key, None)
+        if doc is None:
+            return
+        _, length, tokens = doc
+        for token in tokens:
+            postings = self._postings[token]
+            postings.pop(key, None)
+            if not postings:
+                del self._postings[token]
+        self._total_length -= length
+        self._vocabulary = None
+
+    def _expand(self, term):
+        # Exact token plus every token it is a prefix of ("para" -> "paracetamol").
+        if self._vocabulary is None:
+            self._vocabulary = sorted(self._postings)
+        i = bisect_left(self._vocabulary, term)
+        matches = []
+        while i < len(self._vocabulary) and self._vocabulary[i].startswith(term):
+            matches.append(self._vocabulary[i])
+            i += 1
+        return matches
+
+    def update(self, kind, pk, patient_id, text):
+        with self._lock:
+            if self._loaded:
+                self._add(kind, pk, patient_id, text)
+
+    def delete(self, kind, pk):
+        with self._lock:
+            self._remove((kind, pk))
+
+    def rebuild(self, documents):
+        with self._lock:
+            self._reset()
+            for document in documents:
+                self._add(*document)
+            self._loaded = True
+
+    def search(self, query, limit=20):
+        terms = tokenize(query)
+        if not terms:
+            return []
+        with self._lock:
+            self._ensure_loaded()
+            count = len(self._docs) or 1
+            average = self._total_length / count or 1
+            scores = None
+            for term in terms:
+                term_scores = defaultdict(float)
+                for token in self._expand(term):
+                    postings = self._postings[token]
+                    idf = math.log(1 + (count - len(postings) + 0.5) / (len(postings) + 0.5))
+                    for key, tf in postings.items():
+                        length = self._docs[key][1]
+                        norm = tf + self.K1 * (1 - self.B + self.B * length / average)
+                        term_scores[key] += idf * tf * (self.K1 + 1) / norm
+                # Every term has to match.
+                if scores is None:
+                    scores = term_scores
+                else:
+                    scores = {k: v + term_scores[k] for k, v in scores.items() if k in term_scores}
+                if not scores:
+                    return []
+            ranked = sorted(scores.items(), key=lambda item: (-item[1], item[0]))[:limit]
+            return [SearchHit(kind, pk, self._docs[(kind, pk)][0], score) for (kind, pk), score in ranked]
+
+
+class MySQLFullTextBackend:
+    # Stores documents in SearchDocument and ranks them with a MySQL
+    # FULLTEXT index in boolean mode (every term required, prefix matched).
+    # The index is created by migration 0016_search_document_fulltext.
+
+    def update(self, kind, pk, patient_id, text):
+        SearchDocument.objects.update_or_create(
+            kind=kind, object_id=pk, defaults={'patient_id': patient_id, 'content': text}
+        )
+
+    def delete(self, kind, pk):
+        SearchDocument.objects.filter(kind=kind, object_id=pk).delete()
+
+    def rebuild(self, documents, batch_size=2000):
+        SearchDocument.objects.all().delete()
+        batch = []
+        for kind, pk, patient_id, text in documents:
+            batch.append(SearchDocument(kind=kind, object_id=pk, patient_id=patient_id, content=text))
+            if len(batch) >= batch_size:
+                SearchDocument.objects.bulk_create(batch)
+                batch = []
+        SearchDocument.objects.bulk_create(batch)
+
+    def search(self, query, limit=20):
+        terms = tokenize(query)
+        if not terms:
+            return []
+        boolean_query = ' '.join(f'+{term}*' for term in terms)
+        match = RawSQL('MATCH(content) AGAINST (%s IN BOOLEAN MODE)', [boolean_query])
+        rows = (SearchDocument.objects.annotate(score=match).filter(score__gt=0)
+                .order_by('-score', 'id').values_list('kind', 'object_id', 'patient_id', 'score')[:limit])
+        return [SearchHit(*row) for row in rows]
+
+
+_backend = None
+_backend_lock = threading.Lock()
+
+
+def get_backend():
+    global _backend
+    with _backend_lock:
+        if _backend is None:
+            path = getattr(settings, 'SEARCH_BACKEND', 'hospitalapp.search.MySQLFullTextBackend')
+            _backend = import_string(path)()
+        return _backend
+
+
+def search_patients(query, limit=20):
+    # Ranked patients for ``query``, each with the kinds of record that matched.
+    hits = get_backend().search(query, limit=limit * 5)
+    ranked = {}
+    for hit in hits:
+        entry = ranked.setdefault(hit.patient_id, {'score': 0.0, 'matched': set()})
+        entry['score'] = max(entry['score'], hit.score)
+        entry['matched'].add(hit.kind)
+
+    order = sorted(ranked, key=lambda pk: -ranked[pk]['score'])[:limit]
+    patients = PatientProfile.objects.select_related('user').in_bulk(order)
+    results = []
+    for pk in order:
+        if pk in patients:
+            patient = patients[pk]
+            patient.search_matched = sorted(ranked[pk]['matched'])
+            results.append(patient)
+    return results
@@ -0,0 +1,302 @@
+import datetime
+import hashlib
+import random
+from contextlib import contextmanager
+
+from django.contrib.auth.hashers import make_password
+from django.db import transaction
+from django.db.models import Max
+
+from .models import (
+    CustomUser, AdminProfile, DoctorProfile, PatientProfile, Appointment, AppointmentSlot, MedicalHistory,
+    Prescription, Bill, Facility, HealthEducationResource, Announcement, HealthBulletin, MedicalResearch,
+    Publication, OutboxEmail, ImportJob,
+)
+from .outbox import MAX_ATTEMPTS
+from .profiles import sync_display_names
+from .slots import slot_times
+
+
+# --- Deterministic data seeder ---
+# Fills every model with synthetic rows for benchmarking. The same seed and
+# scale always produce the same rows: each model draws from its own
+# random.Random(f'{seed}:{model}') and primary keys are assigned explicitly
+# on top of whatever the tables already hold. Rows are written with
+# bulk_create one chunk per transaction, so signals (fragment cache, search
+# index, availability index, metric counters, rollups) are bypassed; run
+# rebuild_search_index, rebuild_metric_counters and backfill_rollups after
+# seeding.
+#
+# Appointments walk each doctor's weekday slot grid in turn, so they never
+# collide on (doctor, date, time) and every one gets its AppointmentSlot.
+# All seeded users share the password SEED_PASSWORD.
+
+SEED_START = datetime.date(2025, 1, 6)   # a Monday; fixed so reruns give identical dates
+SEED_PASSWORD = 'password'
+DEFAULT_CHUNK_SIZE = 5000
+
+PRESETS = {
+    'small': {'doctors': 20, 'patients': 1000, 'appointments': 10000},
+    'medium': {'doctors': 500, 'patients': 50000, 'appointments': 500000},
+    'large': {'doctors': 10000, 'patients': 1000000, 'appointments': 10000000},
+}
+
+FIRST_NAMES = ['Anu', 'Arjun', 'Meera', 'Rahul', 'Divya', 'Vishnu', 'Lakshmi', 'Rohan', 'Sneha', 'Kiran',
+               'Nikhil', 'Priya', 'Asha', 'Manoj', 'Fathima', 'Joseph', 'Gouri', 'Hari', 'Neha', 'Sanjay']
+LAST_NAMES = ['Nair', 'Menon', 'Pillai', 'Kumar', 'Thomas', 'Varghese', 'Iyer', 'Das', 'Rao', 'Reddy',
+              'Joseph', 'Mathew', 'Krishnan', 'Shah', 'Khan', 'Sharma']
+SPECIALIZATIONS = ['General', 'Cardiology', 'Dermatology', 'Neurology', 'Orthopedics', 'Pediatrics',
+                   'Gynecology', 'ENT', 'Ophthalmology', 'Psychiatry']
+DAY_PATTERNS = ['Mon,Tue,Wed,Thu,Fri', 'Mon,Wed,Fri', 'Tue,Thu', 'Mon - Friday', 'Weekdays']
+DIAGNOSES = ['Hypertension', 'Type 2 diabetes', 'Migraine', 'Asthma', 'Seasonal allergy', 'Back pain',
+             'Gastritis', 'Viral fever', 'Anemia', 'Hypothyroidism', 'Sinusitis', 'Dermatitis']
+MEDICATIONS = ['Paracetamol', 'Amlodipine', 'Metformin', 'Salbutamol', 'Cetirizine', 'Ibuprofen',
+               'Pantoprazole', 'Levothyroxine', 'Amoxicillin', 'Atorvastatin']
+GENDERS = ['Male', 'Female', 'Other']
+APPOINTMENT_STATUSES = (['Pending', 'Confirmed', 'Declined', 'Completed'], [20, 25, 10, 45])
+
+
+def scale_for(preset='small', **overrides):
+    scale = dict(PRESETS[preset])
+    scale.update({k: v for k, v in overrides.items() if v is not None})
+    appointments = scale['appointments']
+    scale.setdefault('admins', 5)
+    scale.setdefault('medical_history', appointments // 4)
+    scale.setdefault('prescriptions', appointments // 4)
+    scale.setdefault('bills', appointments // 5)
+    scale.setdefault('facilities', 20)
+    scale.setdefault('content', 200)      # per content feed and health resources
+    scale.setdefault('outbox', 1000)
+    scale.setdefault('import_jobs', 10)
+    return scale
+
+
+@contextmanager
+def explicit_dates(*fields):
+    # bulk_create stamps auto_now_add fields with the current time; seeded
+    # rows need their dates spread out for the date indexes to mean anything.
+    saved = [(field, field.auto_now_add) for field in fields]
+    for field in fields:
+        field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, value in saved:
+            field.auto_now_add = value
+
+
+def date_field(model, name):
+    return model._meta.get_field(name)
+
+
+class Seeder:
+    def __init__(self, scale, seed=0, chunk_size=DEFAULT_CHUNK_SIZE, start=SEED_START, progress=None):
+        self.scale = scale
+        self.seed = seed
+        self.chunk_size = chunk_size
+        self.start = start
+        self.progress = progress
+        self.counts = {}
+        self.password = make_password(SEED_PASSWORD, salt=f'seed{seed}')
+        self.times = slot_times()
+
+    def rng(self, name):
+        return random.Random(f'{self.seed}:{name}')
+
+    def weekday(self, offset):
+        # The offset-th weekday on or after self.start.
+        weeks, day = divmod(offset, 5)
+        return self.start + datetime.timedelta(days=weeks * 7 + day)
+
+    def random_date(self, rng, span_days):
+        return self.start + datetime.timedelta(days=rng.randrange(max(span_days, 1)))
+
+    @property
+    def span_days(self):
+        # Calendar days covered by the appointment grid.
+        per_doctor = -(-self.scale['appointments'] // max(self.scale['doctors'], 1))
+        return (-(-per_doctor // len(self.times)) // 5 + 1) * 7
+
+    def write(self, model, rows):
+        # rows: iterable of model instances; written chunk by chunk.
+        batch, total = [], 0
+        for row in rows:
+            batch.append(row)
+            if len(batch) >= self.chunk_size:
+                total += self._flush(model, batch)
+                batch = []
+        total += self._flush(model, batch)
+        self.counts[model.__name__] = self.counts.get(model.__name__, 0) + total
+        return total
+
+    def _flush(self, model, batch):
+        if not batch:
+            return 0
+        with transaction.atomic():
+            model.objects.bulk_create(batch, batch_size=self.chunk_size)
+        if self.progress:
+            self.progress(model.__name__, len(batch))
+        return len(batch)
+
+    def next_pk(self, model):
+        return (model.objects.aggregate(top=Max('pk'))['top'] or 0) + 1
+
+    def name(self, rng):
+        return f'{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}'
+
+    # --- Users and profiles ---
+
+    def users(self, role, count, flags, profile_for):
+        # Creates ``count`` users with explicit pks and their profiles;
+        # returns the first profile pk.
+        rng = self.rng(role)
+        model = {'admin': AdminProfile, 'doctor': DoctorProfile, 'patient': PatientProfile}[role]
+        user_base, profile_base = self.next_pk(CustomUser), self.next_pk(model)
+        suffix = hashlib.sha1(f'{self.seed}:{user_base}'.encode()).hexdigest()[:6]
+        self.write(CustomUser, (
+            CustomUser(pk=user_base + i, username=f'{role}{i}_{suffix}', password=self.password,
+                       email=f'{role}{i}_{suffix}@example.test', **flags)
+            for i in range(count)
+        ))
+        self.write(model, (
+            model(pk=profile_base + i, user_id=user_base + i, full_name=self.name(rng), gender=rng.choice(GENDERS),
+                  phone=f'9{rng.randrange(10 ** 9):09d}', address=f'{rng.randrange(1, 999)} Main Road',
+                  **profile_for(rng, i))
+            for i in range(count)
+        ))
+        sync_display_names(CustomUser.objects.filter(pk__gte=user_base, pk__lt=user_base + count))
+        return profile_base
+
+    def seed_users(self):
+        self.admin_base = self.users('admin', self.scale['admins'], {'is_admin': True, 'is_staff': True},
+                                     lambda rng, i: {'age': rng.randrange(25, 60)})
+        self.doctor_base = self.users('doctor', self.scale['doctors'], {'is_doctor': True}, lambda rng, i: {
+            'age': rng.randrange(28, 70),
+            'specialization': SPECIALIZATIONS[i % len(SPECIALIZATIONS)],
+            'available_days': rng.choice(DAY_PATTERNS),
+        })
+        self.patient_base = self.users('patient', self.scale['patients'], {'is_patient': True}, lambda rng, i: {
+            'age': rng.randrange(1, 95),
+            'medical_history': '',
+        })
+
+    def patient_id(self, rng):
+        return self.patient_base + rng.randrange(self.scale['patients'])
+
+    def doctor_id(self, rng):
+        return self.doctor_base + rng.randrange(self.scale['doctors'])
+
+    # --- Clinical records ---
+
+    def seed_appointments(self):
+        rng = self.rng('appointment')
+        doctors, per_day, total = self.scale['doctors'], len(self.times), self.scale['appointments']
+        appointment_base, slot_base = self.next_pk(Appointment), self.next_pk(AppointmentSlot)
+        statuses, weights = APPOINTMENT_STATUSES
+
+        for chunk_start in range(0, total, self.chunk_size):
+            appointments, slots = [], []
+            for i in range(chunk_start, min(chunk_start + self.chunk_size, total)):
+                doctor_id, k = self.doctor_base + i % doctors, i // doctors
+                date, slot_time = self.weekday(k // per_day), self.times[k % per_day]
+                status = rng.choices(statuses, weights)[0]
+                appointments.append(Appointment(
+                    pk=appointment_base + i, patient_id=self.patient_id(rng), doctor_id=doctor_id, date=date,
+                    time=slot_time, reason=f'{rng.choice(DIAGNOSES)} follow-up', status=status,
+                ))
+                slots.append(AppointmentSlot(
+                    pk=slot_base + i, doctor_id=doctor_id, date=date, time=slot_time,
+                    appointment_id=None if status == 'Declined' else appointment_base + i,
+                ))
+            self.write(Appointment, appointments)
+            self.write(AppointmentSlot, slots)
+
+    def seed_records(self):
+        span = self.span_days
+        rng = self.rng('medical_history')
+        self.write(MedicalHistory, (
+            MedicalHistory(patient_id=self.patient_id(rng), doctor_id=self.doctor_id(rng),
+                           diagnosis=rng.choice(DIAGNOSES), treatment_history='Reviewed and advised.',
+                           medications=', '.join(rng.sample(MEDICATIONS, 2)), date=self.random_date(rng, span),
+                           notes='')
+            for _ in range(self.scale['medical_history'])
+        ))
+
+        rng = self.rng('prescription')
+        with explicit_dates(date_field(Prescription, 'date_issued')):
+            self.write(Prescription, (
+                Prescription(patient_id=self.patient_id(rng), doctor_id=self.doctor_id(rng),
+                             medication_name=rng.choice(MEDICATIONS), dosage=f'{rng.choice([250, 500, 650])} mg',
+                             frequency=rng.choice(['Once daily', 'Twice daily', 'Thrice daily']),
+                             duration=f'{rng.randrange(3, 30)} days', notes='',
+                             date_issued=self.random_date(rng, span))
+                for _ in range(self.scale['prescriptions'])
+            ))
+
+        rng = self.rng('bill')
+        with explicit_dates(date_field(Bill, 'date')):
+            self.write(Bill, (
+                Bill(patient_id=self.patient_id(rng), doctor_id=self.doctor_id(rng),
+                     amount=rng.randrange(200, 20000), description='Consultation', date=self.random_date(rng, span),
+                     paid=rng.random() < 0.7, payment_method=rng.choice(['Cash', 'Online']))
+                for _ in range(self.scale['bills'])
+            ))
+
+    # --- Content and housekeeping ---
+
+    def seed_content(self):
+        count, span = self.scale['content'], self.span_days
+        rng = self.rng('facility')
+        self.write(Facility, (
+            Facility(name=f'{rng.choice(SPECIALIZATIONS)} Block {i}', location=f'Floor {rng.randrange(1, 8)}',
+                     departments=rng.choice(SPECIALIZATIONS), resources='')
+            for i in range(self.scale['facilities'])
+        ))
+
+        for model, field, make in [
+            (HealthEducationResource, 'created_at', lambda i, rng: HealthEducationResource(
+                title=f'Living with {rng.choice(DIAGNOSES).lower()} #{i}', description='Patient guide.',
+                link='https://example.test/resources', created_at=datetime.datetime.combine(
+                    self.random_date(rng, span), datetime.time(9), tzinfo=datetime.timezone.utc))),
+            (Announcement, 'date', lambda i, rng: Announcement(
+                title=f'Announcement {i}', content='Hospital update.', date=self.random_date(rng, span))),
+            (HealthBulletin, 'date', lambda i, rng: HealthBulletin(
+                title=f'Bulletin {i}', content='Health bulletin.', date=self.random_date(rng, span))),
+            (MedicalResearch, 'date', lambda i, rng: MedicalResearch(
+                title=f'Study {i}', summary='Research summary.', date=self.random_date(rng, span))),
+            (Publication, 'date', lambda i, rng: Publication(
+                title=f'Publication {i}', description='Journal article.', date=self.random_date(rng, span))),
+        ]:
+            rng = self.rng(model.__name__)
+            with explicit_dates(date_field(model, field)):
+                self.write(model, (make(i, rng) for i in range(count)))
+
+        # Delivery history only: a pending row would be mailed by the next
+        # outbox worker run.
+        rng = self.rng('outbox')
+        sent_at = datetime.datetime.combine(SEED_START, datetime.time(9), tzinfo=datetime.timezone.utc)
+        self.write(OutboxEmail, (
+            OutboxEmail(subject=f'Appointment update {i}', body='Your appointment status changed.',
+                        from_email='noreply@example.test', to=f'patient{rng.randrange(1000)}@example.test',
+                        **({'status': 'sent', 'attempts': 1, 'sent_at': sent_at} if rng.random() < 0.95 else
+                           {'status': 'failed', 'attempts': MAX_ATTEMPTS, 'last_error': 'Mailbox unavailable.'}))
+            for i in range(self.scale['outbox'])
+        ))
+
+        suffix = hashlib.sha1(f'{self.seed}:{self.next_pk(ImportJob)}'.encode()).hexdigest()[:8]
+        self.write(ImportJob, (
+            ImportJob(source=hashlib.sha256(f'{suffix}:{i}'.encode()).hexdigest(), filename=f'users-{i}.csv',
+                      chunk_size=500, chunks_done=4, rows_imported=2000, status='completed')
+            for i in range(self.scale['import_jobs'])
+        ))
+
+    def run(self):
+        self.seed_users()
+        self.seed_appointments()
+        self.seed_records()
+        self.seed_content()
+        return self.counts
+
+
+def seed(scale, seed=0, chunk_size=DEFAULT_CHUNK_SIZE, start=SEED_START, progress=None):
+    return Seeder(scale, seed, chunk_size, start, progress).run()
@@ -0,0 +1,321 @@
+from collections import Counter
+
+from django.db import transaction
+from django.db.models.signals import post_init, pre_save, post_save, post_delete
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .availability import index as availability_index
+from .fragments import invalidate
+from .pagecache import invalidate_page
+from . import metrics, principal, profiles, rollups
+from .models import AdminProfile, Appointment, CustomUser, DoctorProfile, PatientProfile, MedicalHistory, Prescription, Bill, \
+    HealthEducationResource, Announcement, HealthBulletin, MedicalResearch, Publication
+from .search import document_for, get_backend as search_backend, KINDS as SEARCH_KINDS
+from .slots import sync_slot
+
+
+# --- Dashboard fragment invalidation ---
+# model -> dashboard section it is rendered in
+
+PATIENT_SECTIONS = {
+    Appointment: 'appointments',
+    MedicalHistory: 'medical_history',
+    Prescription: 'prescriptions',
+    Bill: 'bills',
+}
+
+
+def _invalidate_fragments(owners, section):
+    # Now, and again after commit: a request that rendered the section
+    # between the two still read the old rows.
+    owners = list(owners)
+
+    def bump():
+        for owner in owners:
+            invalidate(owner, section)
+    bump()
+    transaction.on_commit(bump)
+
+
+@receiver([post_save, post_delete], sender=Appointment)
+@receiver([post_save, post_delete], sender=MedicalHistory)
+@receiver([post_save, post_delete], sender=Prescription)
+@receiver([post_save, post_delete], sender=Bill)
+def invalidate_patient_fragments(sender, instance, **kwargs):
+    owners = [f'patient:{instance.patient_id}']
+    if instance.doctor_id:
+        owners.append(f'doctor:{instance.doctor_id}')
+    _invalidate_fragments(owners, PATIENT_SECTIONS[sender])
+
+
+@receiver([post_save, post_delete], sender=HealthEducationResource)
+def invalidate_resource_fragments(sender, instance, **kwargs):
+    _invalidate_fragments(['global'], 'resources')
+
+
+# --- Public page cache ---
+# model -> cached page section (see pagecache.py)
+
+PUBLIC_PAGES = {
+    Announcement: 'announcements',
+    HealthBulletin: 'health_bulletin',
+    MedicalResearch: 'medical_research',
+    Publication: 'publications',
+}
+
+
+@receiver([post_save, post_delete], sender=Announcement)
+@receiver([post_save, post_delete], sender=HealthBulletin)
+@receiver([post_save, post_delete], sender=MedicalResearch)
+@receiver([post_save, post_delete], sender=Publication)
+def invalidate_public_page(sender, instance, **kwargs):
+    section = PUBLIC_PAGES[sender]
+    # Again after commit, in case a visitor cached the old page meanwhile.
+    invalidate_page(section)
+    transaction.on_commit(lambda: invalidate_page(section))
+
+
+# --- Availability index and slot inventory ---
+# Appointments also remember the slot they held when loaded. After the
+# change commits, an appointment whose slot changed claims its new slot
+# and gives back the old one (see slots.sync_slot), and the availability
+# index is marked to match. Nothing happens for a change that rolls back.
+
+def _slot_state(instance):
+    return (instance.doctor_id, instance.date, instance.time, instance.status != 'Declined')
+
+
+def _sync_slots_after_commit(changes):
+    # changes: (appointment id, old, new) with slot states, either may be None
+    def apply():
+        for appointment_id, old, new in changes:
+            if new and new != old:
+                sync_slot(appointment_id, *new)
+            if old and old[3] and (not new or old[:3] != new[:3]):
+                availability_index.mark(*old[:3], False)
+            if new:
+                availability_index.mark(*new)
+    transaction.on_commit(apply)
+
+
+@receiver(post_init, sender=Appointment)
+def remember_slot_state(sender, instance, **kwargs):
+    instance._loaded_slot = _slot_state(instance) if instance.pk else None
+
+
+@receiver(post_save, sender=Appointment)
+def mark_slot_booked(sender, instance, **kwargs):
+    new = _slot_state(instance)
+    _sync_slots_after_commit([(instance.pk, instance._loaded_slot, new)])
+    instance._loaded_slot = new
+
+
+@receiver(post_delete, sender=Appointment)
+def mark_slot_free(sender, instance, **kwargs):
+    _sync_slots_after_commit([(instance.pk, instance._loaded_slot, None)])
+
+
+@receiver(post_save, sender=DoctorProfile)
+def refresh_doctor_availability(sender, instance, **kwargs):
+    availability_index.update_doctor(instance)
+
+
+@receiver(post_delete, sender=DoctorProfile)
+def remove_doctor_availability(sender, instance, **kwargs):
+    availability_index.remove_doctor(instance.pk)
+
+
+# --- Search index ---
+
+@receiver(post_save, sender=PatientProfile)
+@receiver(post_save, sender=MedicalHistory)
+@receiver(post_save, sender=Prescription)
+def index_search_document(sender, instance, **kwargs):
+    document = document_for(instance)
+    transaction.on_commit(lambda: search_backend().update(*document))
+
+
+@receiver(post_delete, sender=PatientProfile)
+@receiver(post_delete, sender=MedicalHistory)
+@receiver(post_delete, sender=Prescription)
+def remove_search_document(sender, instance, **kwargs):
+    kind, pk = SEARCH_KINDS[sender], instance.pk
+    transaction.on_commit(lambda: search_backend().delete(kind, pk))
+
+
+# --- Metric counters and analytics rollups ---
+# Appointments and bills remember their state when loaded, so a save or
+# delete applies only the difference to the counters and rollups. The
+# deltas wait for the commit and are then applied together in one short
+# transaction: the counters are a few global rows and the rollups one row
+# per doctor and day, so updating them inside the booking or billing
+# transaction would serialize every booking for the same doctor and day.
+
+def _appointment_state(instance):
+    return (instance.doctor_id, instance.date, instance.status)
+
+
+def _bill_state(instance):
+    return (instance.doctor_id, instance.date, instance.amount or 0, instance.paid)
+
+
+def _count_after_commit(*updates):
+    # updates: (function, *args) tuples
+    def apply():
+        with transaction.atomic():
+            for function, *args in updates:
+                function(*args)
+    transaction.on_commit(apply)
+
+
+@receiver(post_init, sender=Appointment)
+def remember_appointment_state(sender, instance, **kwargs):
+    instance._loaded_state = _appointment_state(instance) if instance.pk else None
+
+
+@receiver(post_save, sender=Appointment)
+def count_appointment(sender, instance, created, **kwargs):
+    old, new = instance._loaded_state, _appointment_state(instance)
+    updates = [(metrics.appointment_changed, old, new), (rollups.appointment_changed, old, new)]
+    if created:
+        updates.append((metrics.bump, metrics.APPOINTMENTS_BOOKED))
+    _count_after_commit(*updates)
+    instance._loaded_state = new
+
+
+@receiver(post_delete, sender=Appointment)
+def uncount_appointment(sender, instance, **kwargs):
+    old = instance._loaded_state
+    _count_after_commit((metrics.appointment_changed, old, None), (rollups.appointment_changed, old, None))
+
+
+@receiver(post_init, sender=Bill)
+def remember_bill_state(sender, instance, **kwargs):
+    instance._loaded_state = _bill_state(instance) if instance.pk else None
+
+
+@receiver(post_save, sender=Bill)
+def count_bill(sender, instance, **kwargs):
+    old, new = instance._loaded_state, _bill_state(instance)
+    _count_after_commit((metrics.bill_changed, old, new), (rollups.bill_changed, old, new))
+    instance._loaded_state = new
+
+
+@receiver(post_delete, sender=Bill)
+def uncount_bill(sender, instance, **kwargs):
+    old = instance._loaded_state
+    _count_after_commit((metrics.bill_changed, old, None), (rollups.bill_changed, old, None))
+
+
+@receiver(post_save, sender=PatientProfile)
+def count_new_patient(sender, instance, created, **kwargs):
+    if created:
+        _count_after_commit((rollups.patient_joined, timezone.localdate(instance.user.date_joined)))
+
+
+@receiver(post_delete, sender=PatientProfile)
+def uncount_patient(sender, instance, **kwargs):
+    # Runs before the cascade removes the user row.
+    joined = CustomUser.objects.filter(pk=instance.user_id).values_list('date_joined', flat=True).first()
+    if joined:
+        _count_after_commit((rollups.patient_joined, timezone.localdate(joined), -1))
+
+
+# --- Bulk updates ---
+# bulk_update and bulk_create send no signals. Code that uses them on
+# appointments, medical histories or profiles calls these instead, so the
+# fragments, availability index, search index, counters and rollups stay in
+# step.
+
+def _index_after_commit(documents):
+    def index():
+        backend = search_backend()
+        for document in documents:
+            backend.update(*document)
+    transaction.on_commit(index)
+
+
+def appointments_updated(appointments):
+    changes, slots, owners = [], [], set()
+    for appointment in appointments:
+        new = _appointment_state(appointment)
+        changes.append((appointment._loaded_state, new))
+        appointment._loaded_state = new
+        slot = _slot_state(appointment)
+        slots.append((appointment.pk, appointment._loaded_slot, slot))
+        appointment._loaded_slot = slot
+        owners.update({f'patient:{appointment.patient_id}', f'doctor:{appointment.doctor_id}'})
+    _sync_slots_after_commit(slots)
+    _invalidate_fragments(owners, PATIENT_SECTIONS[Appointment])
+    _count_after_commit((metrics.appointments_changed, changes), (rollups.appointments_changed, changes))
+
+
+def medical_histories_created(histories):
+    owners = set()
+    for history in histories:
+        owners.add(f'patient:{history.patient_id}')
+        if history.doctor_id:
+            owners.add(f'doctor:{history.doctor_id}')
+    _invalidate_fragments(owners, PATIENT_SECTIONS[MedicalHistory])
+    _index_after_commit([document_for(history) for history in histories])
+
+
+def profiles_created(profiles):
+    # New users' profiles, with .user loaded. Users and profiles written
+    # together already carry their role and display name.
+    patients = [profile for profile in profiles if isinstance(profile, PatientProfile)]
+    doctors = [profile for profile in profiles if isinstance(profile, DoctorProfile)]
+
+    def update_availability():
+        for doctor in doctors:
+            availability_index.update_doctor(doctor)
+    if doctors:
+        transaction.on_commit(update_availability)
+    joined = Counter(timezone.localdate(patient.user.date_joined) for patient in patients)
+    if joined:
+        _count_after_commit(*[(rollups.patient_joined, date, count) for date, count in joined.items()])
+    _index_after_commit([document_for(patient) for patient in patients])
+
+
+# --- Denormalized user names ---
+
+@receiver(pre_save, sender=CustomUser)
+def sync_user_role(sender, instance, **kwargs):
+    role = profiles.role_for(instance)
+    if role != instance.role:
+        instance.role = role
+        instance.display_name, instance.profile_age = profiles.profile_fields(instance.pk, role)
+
+
+@receiver(post_save, sender=PatientProfile)
+@receiver(post_save, sender=DoctorProfile)
+@receiver(post_save, sender=AdminProfile)
+def sync_display_name(sender, instance, **kwargs):
+    role, age = profiles.PROFILE_ROLES[sender], profiles.profile_age(instance.age)
+    (CustomUser.objects.filter(pk=instance.user_id, role=role)
+     .exclude(display_name=instance.full_name, profile_age=age)
+     .update(display_name=instance.full_name, profile_age=age))
+    if sender._meta.get_field('user').is_cached(instance) and instance.user.role == role:
+        instance.user.display_name, instance.user.profile_age = instance.full_name, age
+
+
+@receiver(post_delete, sender=PatientProfile)
+@receiver(post_delete, sender=DoctorProfile)
+@receiver(post_delete, sender=AdminProfile)
+def clear_display_name(sender, instance, **kwargs):
+    CustomUser.objects.filter(pk=instance.user_id, role=profiles.PROFILE_ROLES[sender]).update(
+        display_name='', profile_age=profiles.NO_AGE)
+
+
+# --- Cached principals ---
+
+@receiver([post_save, post_delete], sender=CustomUser)
+@receiver([post_save, post_delete], sender=PatientProfile)
+@receiver([post_save, post_delete], sender=DoctorProfile)
+@receiver([post_save, post_delete], sender=AdminProfile)
+def forget_principal(sender, instance, **kwargs):
+    user_id = instance.pk if sender is CustomUser else instance.user_id
+    principal.forget(user_id)
+    # Again after commit, in case another request cached the old rows meanwhile.
+    transaction.on_commit(lambda: principal.forget(user_id))
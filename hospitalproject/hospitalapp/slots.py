@@ -0,0 +1,156 @@
+import datetime
+import logging
+import re
+
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import Appointment, AppointmentSlot, DoctorProfile
+
+
+# --- Appointment slot inventory ---
+# Every bookable (doctor, date, time) is a row in AppointmentSlot, unique on
+# those three columns. Booking claims a free row with a single conditional
+# UPDATE, so two concurrent requests for the same slot can never both win
+# and no row locks are held while the rest of the request runs.
+#
+# Appointments changed any other way (edit form, admin, status changes
+# outside transitions.py) are brought back in line by sync_slot(), which
+# signals.py runs after the change commits. A delete needs nothing: the
+# slot's foreign key is SET_NULL.
+
+SLOT_START = datetime.time(9, 0)
+SLOT_END = datetime.time(17, 0)
+SLOT_MINUTES = 30
+
+logger = logging.getLogger('hospitalapp.slots')
+
+WEEKDAYS = ['mon', 'tue', 'wed', 'thu', 'fri', 'sat', 'sun']
+DAY_GROUPS = {
+    'daily': range(7),
+    'everyday': range(7),
+    'all': range(7),
+    'weekdays': range(5),
+    'weekends': range(5, 7),
+}
+
+
+class SlotUnavailable(Exception):
+    pass
+
+
+def _weekday(token):
+    try:
+        return WEEKDAYS.index(token[:3])
+    except ValueError:
+        return None
+
+
+def parse_available_days(text):
+    # Accepts the free-form values doctors enter, e.g. "Mon, Wed, Fri",
+    # "Monday - Friday", "Mon to Thu" or "Weekdays".
+    text = re.sub(r'\s*(?:-|\bto\b)\s*', '-', (text or '').lower())
+    days = set()
+    for token in re.split(r'[,;/&\s]+|\band\b', text):
+        if token in DAY_GROUPS:
+            days.update(DAY_GROUPS[token])
+        elif '-' in token:
+            first, _, last = token.partition('-')
+            first, last = _weekday(first), _weekday(last)
+            if first is not None and last is not None:
+                days.update((first + i) % 7 for i in range((last - first) % 7 + 1))
+        elif token:
+            day = _weekday(token)
+            if day is not None:
+                days.add(day)
+    return days
+
+
+def slot_times():
+    times = []
+    current = datetime.datetime.combine(datetime.date.min, SLOT_START)
+    end = datetime.datetime.combine(datetime.date.min, SLOT_END)
+    while current < end:
+        times.append(current.time())
+        current += datetime.timedelta(minutes=SLOT_MINUTES)
+    return times
+
+
+def ensure_slots(doctor, start, end):
+    # Materialise the slot rows for ``doctor`` between ``start`` and ``end``
+    # (inclusive). Days that already have slots are left alone.
+    days = parse_available_days(doctor.available_days)
+    dates = [start + datetime.timedelta(days=i) for i in range((end - start).days + 1)]
+    dates = [d for d in dates if d.weekday() in days]
+    if not dates:
+        return 0
+
+    existing = set(
+        AppointmentSlot.objects.filter(doctor=doctor, date__in=dates).values_list('date', flat=True).distinct()
+    )
+    slots = [
+        AppointmentSlot(doctor=doctor, date=d, time=t)
+        for d in dates if d not in existing
+        for t in slot_times()
+    ]
+    AppointmentSlot.objects.bulk_create(slots, batch_size=1000, ignore_conflicts=True)
+    return len(slots)
+
+
+def reserve_slot(patient, doctor, date, time, reason):
+    if date < timezone.localdate():
+        raise SlotUnavailable("Appointments cannot be booked in the past.")
+    if date.weekday() not in parse_available_days(doctor.available_days):
+        raise SlotUnavailable(f"Dr. {doctor.full_name} is not available on {date:%A}s.")
+    if time not in slot_times():
+        raise SlotUnavailable(f"Please pick a {SLOT_MINUTES}-minute slot between "
+                              f"{SLOT_START:%H:%M} and {SLOT_END:%H:%M}.")
+
+    ensure_slots(doctor, date, date)
+
+    with transaction.atomic():
+        appointment = Appointment.objects.create(
+            patient=patient,
+            doctor=doctor,
+            date=date,
+            time=time,
+            reason=reason,
+            status='Pending'
+        )
+        claimed = AppointmentSlot.objects.filter(
+            doctor=doctor, date=date, time=time, appointment__isnull=True
+        ).update(appointment=appointment)
+        if not claimed:
+            # Rolls back the appointment created above.
+            raise SlotUnavailable("That slot has just been booked. Please pick another time.")
+    return appointment
+
+
+def release_slots(appointments):
+    return AppointmentSlot.objects.filter(appointment__in=appointments).update(appointment=None)
+
+
+def sync_slot(appointment_id, doctor_id, date, time, booked):
+    # Make the appointment hold exactly the slot it is booked into, or none.
+    held = AppointmentSlot.objects.filter(appointment_id=appointment_id)
+    if booked:
+        held = held.exclude(doctor_id=doctor_id, date=date, time=time)
+    held.update(appointment=None)
+    if not booked:
+        return
+
+    def claim():
+        return AppointmentSlot.objects.filter(
+            Q(appointment__isnull=True) | Q(appointment_id=appointment_id), doctor_id=doctor_id, date=date, time=time
+        ).update(appointment_id=appointment_id)
+
+    if claim():
+        return
+    doctor = DoctorProfile.objects.filter(pk=doctor_id).first()
+    if doctor is not None and ensure_slots(doctor, date, date) and claim():
+        return
+    # Outside the doctor's hours there is no slot to hold.
+    if AppointmentSlot.objects.filter(doctor_id=doctor_id, date=date, time=time).exists():
+        logger.warning('appointment %s is double-booked: doctor %s, %s %s is held by another appointment',
+                       appointment_id, doctor_id, date, time)
@@ -0,0 +1,31 @@
+from django import template
+from django.contrib.staticfiles.storage import staticfiles_storage
+
+from hospitalapp import assets
+
+register = template.Library()
+
+
+@register.simple_tag
+def vendor(name):
+    # Local copy when build_assets has vendored it, the CDN otherwise.
+    return assets.vendor_url(name)
+
+
+@register.inclusion_tag('includes/responsive_image.html')
+def responsive_image(path, alt='', sizes='100vw', css_class='', loading='lazy', width=None, height=None):
+    # Explicit width/height win over the image's own (e.g. a logo shown at 40x40).
+    entry = assets.image_variants().get(path, {})
+    variants = entry.get('variants', {})
+    jpeg = variants.get('jpeg', [])
+    return {
+        'src': staticfiles_storage.url(jpeg[-1][1] if jpeg else path),
+        'webp': assets.srcset(variants.get('webp', [])),
+        'jpeg': assets.srcset(jpeg),
+        'sizes': sizes,
+        'alt': alt,
+        'css_class': css_class,
+        'loading': loading,
+        'width': width or entry.get('width'),
+        'height': height or entry.get('height'),
+    }
@@ -1,3 +1,1547 @@
-from django.test import TestCase
+import base64
+import csv
+import datetime
+import gzip
+import hashlib
+import hmac
+import io
+import json
+import os
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from io import StringIO
+from unittest import mock, skipUnless
+from urllib.parse import parse_qs, parse_qsl
 
-# Create your tests here.
+from django.core import mail
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.core.cache import caches
+from django.db import connection, connections
+from django.conf import settings
+from django.template import Context, Template
+from django.test import AsyncClient, RequestFactory, TestCase, TransactionTestCase, override_settings, skipUnlessDBFeature, tag
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from .models import CustomUser, DoctorProfile, PatientProfile, Appointment, AppointmentSlot, MedicalHistory, \
+    Prescription, Bill, OutboxEmail, Facility, Announcement, Publication, DailyAppointmentStats, DailyBillingStats, DailyPatientStats, \
+    ImportJob
+from .outbox import LEASE, MAX_ATTEMPTS, claim, deliver_pending, queue_email
+from . import assets, availability, importer, media, slots, throttle
+from .availability import index as availability_index
+from .benchmark import run_benchmark, run_login_burst, run_throughput
+from .exporter import iter_export
+from .importer import run_import
+from .forms import AppointmentFilterForm
+from .fragments import version as fragment_version
+from .instrumentation import request_stats, reset_request_stats
+from .metrics import APPOINTMENTS_BOOKED, PENDING_APPOINTMENTS, counter_values, rebuild_counters
+from .pagination import (
+    MAX_PAGE_SIZE, approximate_count, decode_cursor, encode_cursor, keyset_paginate, requested_page_size,
+)
+from .principal import CachedModelBackend
+from .queryplans import full_scans
+from .routers import PIN_COOKIE
+from .rollups import backfill
+from .search import get_backend as search_backend, iter_documents, search_patients
+from .seeder import scale_for, seed
+from .slots import SlotUnavailable, parse_available_days, reserve_slot
+from .transitions import transition
+
+
+def make_doctor(username, **kwargs):
+    user = CustomUser.objects.create_user(username=username, password='pass12345', is_doctor=True)
+    defaults = {
+        'full_name': username.title(), 'age': 40, 'gender': 'Male', 'phone': '100',
+        'address': 'Ward 1', 'specialization': 'General', 'available_days': 'Mon,Tue,Wed,Thu,Fri',
+    }
+    defaults.update(kwargs)
+    return DoctorProfile.objects.create(user=user, **defaults)
+
+
+def make_patient(username, **kwargs):
+    user = CustomUser.objects.create_user(username=username, password='pass12345', is_patient=True)
+    defaults = {'full_name': username.title(), 'age': 30, 'gender': 'Female', 'phone': '200', 'address': 'Street 1'}
+    defaults.update(kwargs)
+    return PatientProfile.objects.create(user=user, **defaults)
+
+
+class QueryBudgetMixin:
+    # Asserts that a page costs the same number of queries no matter how
+    # much data sits behind it. Budgets are measured with a cold fragment
+    # cache, i.e. the worst case.
+
+    def count_queries(self, url, cold=True):
+        if cold:
+            caches['dashboards'].clear()
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(ctx.captured_queries)
+
+    def assertFixedQueryCount(self, url, grow):
+        before = self.count_queries(url)
+        grow()
+        self.assertEqual(self.count_queries(url), before)
+
+
+class PatientDashboardQueryTests(QueryBudgetMixin, TestCase):
+    def setUp(self):
+        caches['dashboards'].clear()
+        self.patient = make_patient('patient')
+        self.client.force_login(self.patient.user)
+        self.add_history(1)
+
+    def add_history(self, count):
+        for i in range(count):
+            doctor = make_doctor(f'doctor{DoctorProfile.objects.count()}')
+            day = datetime.date(2025, 1, 1) + datetime.timedelta(days=i)
+            Appointment.objects.create(patient=self.patient, doctor=doctor, date=day,
+                                       time=datetime.time(10), reason='Checkup')
+            MedicalHistory.objects.create(patient=self.patient, doctor=doctor, diagnosis='Flu',
+                                          treatment_history='Rest', medications='None', date=day)
+            Prescription.objects.create(patient=self.patient, doctor=doctor, medication_name='Paracetamol',
+                                        dosage='500mg', frequency='Twice', duration='3 days')
+            Bill.objects.create(patient=self.patient, doctor=doctor, amount=100, description='Consultation')
+
+    def test_query_count_does_not_grow_with_history(self):
+        self.assertFixedQueryCount(reverse('patient_dashboard'), lambda: self.add_history(25))
+
+    def appointment_rows(self, query=''):
+        response = self.client.get(reverse('patient_dashboard') + query)
+        html = response.context['sections']['appointments']
+        return html.count('<tr>') - 1, html
+
+    def test_sections_are_capped(self):
+        self.add_history(25)
+        rows, html = self.appointment_rows()
+        self.assertEqual(rows, 10)
+        self.assertIn('appointments_page=2', html)
+
+        rows, html = self.appointment_rows('?appointments_page=3')
+        self.assertEqual(rows, 6)
+        self.assertNotIn('appointments_page=4', html)
+
+
+class KeysetPaginationTests(TestCase):
+    def setUp(self):
+        self.factory = RequestFactory()
+        self.doctors = [make_doctor('doctor'), make_doctor('other')]
+        self.patients = [make_patient('patient'), make_patient('another')]
+        # Five appointments share each (date, time), so pages split inside ties.
+        self.appointments = [
+            Appointment.objects.create(patient=self.patients[i % 2], doctor=self.doctors[i // 5 % 2],
+                                       date=datetime.date(2025, 3, 1 + i // 10), time=datetime.time(9 + i // 5 % 2),
+                                       status='Confirmed' if i % 3 else 'Pending', reason='Checkup')
+            for i in range(20)
+        ]
+
+    def page(self, **params):
+        return keyset_paginate(Appointment.objects.all(), self.factory.get('/', params), page_size=3)
+
+    def ids(self, queryset):
+        return list(queryset.order_by('-date', '-time', '-id').values_list('id', flat=True))
+
+    def test_cursor_walks_every_row_once_across_ties(self):
+        seen, params = [], {'per_page': 4}
+        while True:
+            page = self.page(**params)
+            seen += [a.id for a in page]
+            if not page.has_next:
+                break
+            params = dict(parse_qsl(page.next_query))
+        self.assertEqual(seen, self.ids(Appointment.objects.all()))
+        self.assertEqual(len(seen), 20)
+
+    def test_malformed_cursor_starts_over(self):
+        first = [a.id for a in self.page()]
+        valid = encode_cursor(datetime.date(2025, 3, 1), datetime.time(9), 1)
+        for cursor in ('garbage', '!!!', valid[:-3], base64.urlsafe_b64encode(b'a|b|c').decode(), ''):
+            self.assertEqual([a.id for a in self.page(cursor=cursor)], first, cursor)
+        self.assertEqual(decode_cursor(valid), (datetime.date(2025, 3, 1), datetime.time(9), 1))
+
+    def test_per_page_is_clamped(self):
+        for value, size in (('0', 1), ('-5', 1), ('abc', 3), ('7', 7), (str(MAX_PAGE_SIZE + 50), MAX_PAGE_SIZE)):
+            self.assertEqual(requested_page_size(self.factory.get('/', {'per_page': value}), 3), size, value)
+        self.assertEqual(len(self.page(per_page='0')), 1)
+
+    def test_next_query_keeps_filters(self):
+        page = self.page(status='Pending', cursor='garbage')
+        query = dict(parse_qsl(page.next_query))
+        self.assertEqual(query['status'], 'Pending')
+        self.assertEqual(decode_cursor(query['cursor'])[2], page.items[-1].id)
+        self.assertNotIn('cursor', dict(parse_qsl(page.first_query)))
+
+    def test_each_filter(self):
+        everything = Appointment.objects.all()
+        doctor, patient = self.doctors[1], self.patients[0]
+        cases = [
+            ({'status': 'Pending'}, everything.filter(status='Pending')),
+            ({'doctor': doctor.pk}, everything.filter(doctor=doctor)),
+            ({'patient': patient.pk}, everything.filter(patient=patient)),
+            ({'date_from': '2025-03-02'}, everything.filter(date__gte=datetime.date(2025, 3, 2))),
+            ({'date_to': '2025-03-01'}, everything.filter(date__lte=datetime.date(2025, 3, 1))),
+            ({'status': 'Confirmed', 'doctor': doctor.pk, 'date_from': '2025-03-02'},
+             everything.filter(status='Confirmed', doctor=doctor, date__gte=datetime.date(2025, 3, 2))),
+        ]
+        for data, expected in cases:
+            filtered = AppointmentFilterForm(data).filter(everything)
+            self.assertTrue(0 < filtered.count() < 20, data)
+            self.assertEqual(self.ids(filtered), self.ids(expected), data)
+
+        # An invalid form filters nothing rather than failing the page.
+        for data in ({'date_from': 'yesterday'}, {'status': 'Lost'}, {'doctor': '0'}):
+            self.assertEqual(AppointmentFilterForm(data).filter(everything).count(), 20, data)
+
+
+class DashboardFragmentCacheTests(QueryBudgetMixin, TestCase):
+    def setUp(self):
+        caches['dashboards'].clear()
+        self.patient = make_patient('patient')
+        self.doctor = make_doctor('doctor')
+        self.client.force_login(self.patient.user)
+        self.url = reverse('patient_dashboard')
+
+    def test_repeat_hits_are_served_from_cache(self):
+        cold = self.count_queries(self.url)
+        warm = self.count_queries(self.url, cold=False)
+        self.assertLess(warm, cold)
+
+    def test_saving_a_row_invalidates_only_its_section(self):
+        self.client.get(self.url)
+        Appointment.objects.create(patient=self.patient, doctor=self.doctor, date=datetime.date(2025, 3, 1),
+                                   time=datetime.time(9), reason='Follow-up')
+        response = self.client.get(self.url)
+        self.assertIn('Follow-up', response.context['sections']['appointments'])
+
+        with CaptureQueriesContext(connection) as ctx:
+            self.client.get(self.url)
+        self.assertFalse(any('hospitalapp_appointment' in q['sql'] for q in ctx.captured_queries))
+
+    def test_section_rendered_before_commit_is_dropped_on_commit(self):
+        owner = f'patient:{self.patient.pk}'
+        with self.captureOnCommitCallbacks(execute=True):
+            Appointment.objects.create(patient=self.patient, doctor=self.doctor, date=datetime.date(2025, 3, 1),
+                                       time=datetime.time(9), reason='Follow-up')
+            # Another request renders the section from the uncommitted state.
+            rendered = fragment_version(owner, 'appointments')
+        self.assertNotEqual(fragment_version(owner, 'appointments'), rendered)
+
+
+def next_weekday(weekday):
+    day = datetime.date.today() + datetime.timedelta(days=1)
+    while day.weekday() != weekday:
+        day += datetime.timedelta(days=1)
+    return day
+
+
+class AvailableDaysTests(TestCase):
+    def test_parses_free_form_values(self):
+        self.assertEqual(parse_available_days('Mon, Wed, Fri'), {0, 2, 4})
+        self.assertEqual(parse_available_days('Monday - Friday'), {0, 1, 2, 3, 4})
+        self.assertEqual(parse_available_days('Fri to Mon'), {4, 5, 6, 0})
+        self.assertEqual(parse_available_days('Weekends'), {5, 6})
+        self.assertEqual(parse_available_days(''), set())
+
+
+@tag('integration')
+@skipUnlessDBFeature('test_db_allows_multiple_connections')
+class ConcurrentBookingTests(TransactionTestCase):
+    # Many patients race for the same doctor; there must never be two
+    # appointments in one slot. Each thread writes on its own connection, so
+    # this needs a database server and is skipped under test_settings. Run
+    # it against MySQL with the project settings:
+    #   python manage.py test hospitalapp --tag integration
+
+    THREADS = 24
+
+    def setUp(self):
+        self.doctor = make_doctor('doctor', available_days='Mon-Sun')
+        self.patients = [make_patient(f'patient{i}') for i in range(self.THREADS)]
+        self.day = next_weekday(2)
+
+    def race(self, slot_for):
+        barrier = threading.Barrier(self.THREADS)
+        results = []
+
+        def book(i):
+            try:
+                barrier.wait()
+                try:
+                    reserve_slot(self.patients[i], self.doctor, self.day, slot_for(i), 'Race')
+                    results.append(True)
+                except SlotUnavailable:
+                    results.append(False)
+            finally:
+                connections.close_all()
+
+        threads = [threading.Thread(target=book, args=(i,)) for i in range(self.THREADS)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        return results
+
+    def test_one_winner_per_slot(self):
+        results = self.race(lambda i: datetime.time(10, 0))
+        self.assertEqual(results.count(True), 1)
+        self.assertEqual(Appointment.objects.filter(doctor=self.doctor).count(), 1)
+
+    def test_distinct_slots_all_succeed(self):
+        times = [datetime.time(9 + i // 2, 30 * (i % 2)) for i in range(16)]
+        results = self.race(lambda i: times[i % len(times)])
+        self.assertEqual(results.count(True), len(times))
+        booked = AppointmentSlot.objects.filter(doctor=self.doctor, appointment__isnull=False)
+        self.assertEqual(booked.count(), len(times))
+
+
+class SlotReservationTests(TestCase):
+    # The same guarantee on one connection, so it runs on SQLite too.
+    def setUp(self):
+        self.doctor = make_doctor('doctor', available_days='Mon-Sun')
+        self.first, self.second = make_patient('first'), make_patient('second')
+        self.day = next_weekday(2)
+        self.time = datetime.time(10, 0)
+
+    def reserve(self, patient):
+        try:
+            return reserve_slot(patient, self.doctor, self.day, self.time, 'Checkup')
+        except SlotUnavailable:
+            return False
+
+    def assertOneBooking(self, winner):
+        appointment = Appointment.objects.get(doctor=self.doctor)
+        self.assertEqual(appointment.patient, winner)
+        self.assertEqual(AppointmentSlot.objects.get(doctor=self.doctor, date=self.day, time=self.time).appointment,
+                         appointment)
+
+    def test_second_reservation_is_refused(self):
+        self.assertTrue(self.reserve(self.first))
+        self.assertIs(self.reserve(self.second), False)
+        self.assertOneBooking(self.first)
+
+    def test_reservation_overtaken_after_its_checks(self):
+        # The second patient books the slot after the first one's checks
+        # pass but before its transaction starts.
+        results, overtaken = [], []
+        ensure_slots = slots.ensure_slots
+
+        def overtake(doctor, start, end):
+            ensure_slots(doctor, start, end)
+            if not overtaken:
+                overtaken.append(True)
+                results.append(self.reserve(self.second))
+
+        with mock.patch.object(slots, 'ensure_slots', overtake):
+            results.append(self.reserve(self.first))
+        self.assertEqual([bool(result) for result in results], [True, False])
+        self.assertOneBooking(self.second)
+
+    def held(self, appointment):
+        return list(AppointmentSlot.objects.filter(appointment=appointment).values_list('date', 'time'))
+
+    def test_edits_outside_reserve_slot_keep_the_inventory(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            appointment = self.reserve(self.first)
+        moved = datetime.time(11, 0)
+        appointment.time = moved
+        with self.captureOnCommitCallbacks(execute=True):
+            appointment.save()
+        self.assertEqual(self.held(appointment), [(self.day, moved)])
+        self.assertTrue(self.reserve(self.second))     # the old time is free again
+
+        appointment.status = 'Declined'
+        with self.captureOnCommitCallbacks(execute=True):
+            appointment.save()
+        self.assertEqual(self.held(appointment), [])
+
+        appointment.status = 'Pending'
+        with self.captureOnCommitCallbacks(execute=True):
+            appointment.save()
+        self.assertEqual(self.held(appointment), [(self.day, moved)])
+        appointment.delete()
+        self.assertFalse(AppointmentSlot.objects.filter(appointment__isnull=False, time=moved).exists())
+
+    def test_move_onto_a_held_slot_is_logged(self):
+        first = self.reserve(self.first)
+        with self.captureOnCommitCallbacks(execute=True):
+            appointment = Appointment.objects.create(patient=self.second, doctor=self.doctor, date=self.day,
+                                                     time=datetime.time(11, 0), reason='Checkup')
+        appointment.time = self.time
+        with self.assertLogs('hospitalapp.slots', 'WARNING'), self.captureOnCommitCallbacks(execute=True):
+            appointment.save()
+        self.assertEqual(self.held(appointment), [])
+        self.assertEqual(self.held(first), [(self.day, self.time)])
+
+
+class AvailabilitySearchTests(TestCase):
+    def setUp(self):
+        availability_index.clear()
+        self.patient = make_patient('patient')
+        self.client.force_login(self.patient.user)
+        self.day = next_weekday(0)
+        self.early = make_doctor('early', specialization='Cardiology', available_days='Mon')
+        self.late = make_doctor('late', specialization='cardiology ', available_days='Mon')
+        make_doctor('other', specialization='Dermatology', available_days='Mon')
+
+    def search(self, **params):
+        params.setdefault('start', self.day.isoformat())
+        response = self.client.get(reverse('availability_search'), {'specialization': 'Cardiology', **params})
+        return [(s['doctor_id'], s['time']) for s in response.json()['slots']]
+
+    def test_earliest_slots_across_matching_doctors(self):
+        self.assertEqual(self.search(limit=3), [(self.early.id, '09:00'), (self.late.id, '09:00'),
+                                                (self.early.id, '09:30')])
+
+    def test_bookings_update_the_index(self):
+        self.search()
+        with self.captureOnCommitCallbacks(execute=True):
+            appointment = reserve_slot(self.patient, self.early, self.day, datetime.time(9), 'Checkup')
+        self.assertEqual(self.search(limit=2), [(self.late.id, '09:00'), (self.early.id, '09:30')])
+
+        appointment.status = 'Declined'
+        with self.captureOnCommitCallbacks(execute=True):
+            appointment.save()
+        self.assertEqual(self.search(limit=1), [(self.early.id, '09:00')])
+
+    def test_moved_booking_frees_its_old_slot(self):
+        self.search()
+        with self.captureOnCommitCallbacks(execute=True):
+            appointment = reserve_slot(self.patient, self.early, self.day, datetime.time(9), 'Checkup')
+        appointment = Appointment.objects.get(pk=appointment.pk)
+        appointment.time = datetime.time(9, 30)
+        with self.captureOnCommitCallbacks(execute=True):
+            appointment.save()
+        self.assertEqual(self.search(limit=3), [(self.early.id, '09:00'), (self.late.id, '09:00'),
+                                                (self.late.id, '09:30')])
+
+    def test_marks_wait_for_commit(self):
+        self.search()
+        with self.captureOnCommitCallbacks() as callbacks:
+            reserve_slot(self.patient, self.early, self.day, datetime.time(9), 'Checkup')
+        self.assertEqual(self.search(limit=1), [(self.early.id, '09:00')])
+        for callback in callbacks:
+            callback()
+        self.assertEqual(self.search(limit=1), [(self.late.id, '09:00')])
+
+    def test_loads_run_outside_the_lock(self):
+        read_bookings, calls = availability._read_bookings, []
+
+        def booked_meanwhile(doctor_ids, dates):
+            calls.append(dates)
+            self.assertFalse(availability_index._lock.locked())
+            rows = read_bookings(doctor_ids, dates)
+            if len(calls) == 1:
+                # A booking lands while the first load runs: its result
+                # answers that lookup but is not kept.
+                availability_index.mark(self.early.id, self.day, datetime.time(9), True)
+            return rows
+
+        with mock.patch.object(availability, '_read_bookings', booked_meanwhile):
+            self.assertEqual(self.search(limit=1), [(self.early.id, '09:00')])
+            self.search(limit=1)
+            self.search(limit=1)
+        self.assertEqual(len(calls), 2)
+
+    def test_specialization_is_required(self):
+        response = self.client.get(reverse('availability_search'))
+        self.assertEqual(response.status_code, 400)
+
+
+IMPORT_HEADER = 'username,email,password,role,full_name,age,gender,phone,address,specialization,available_days\n'
+
+
+def import_file(*lines):
+    return io.BytesIO((IMPORT_HEADER + ''.join(line + '\n' for line in lines)).encode())
+
+
+class UserImportTests(TestCase):
+    def setUp(self):
+        import_root = tempfile.TemporaryDirectory()
+        self.addCleanup(import_root.cleanup)
+        self.enterContext(override_settings(STORAGES={**settings.STORAGES, 'imports': {
+            'BACKEND': 'django.core.files.storage.FileSystemStorage', 'OPTIONS': {'location': import_root.name}}}))
+        self.rows = [f'user{i},user{i}@example.com,pass12345,patient,Imported Person {i},{20 + i},Male,100,Street'
+                     for i in range(5)]
+
+    def test_chunks_commit_with_their_signals(self):
+        search_patients('imported')     # load the search index first
+        with self.captureOnCommitCallbacks(execute=True):
+            report = run_import(import_file(*self.rows, 'doc,,pass12345,doctor,Dr New,50,Female,1,Ward,Cardiology,'
+                                            'Mon'), 'users.csv', 'csv', chunk_size=2, workers=1)
+        self.assertEqual((report.chunks, report.imported, report.skipped), (3, 6, 0))
+        job = ImportJob.objects.get()
+        self.assertEqual((job.status, job.chunks_done, job.rows_imported), ('completed', 3, 6))
+        user = CustomUser.objects.get(username='user3')
+        self.assertTrue(user.check_password('pass12345'))
+        self.assertEqual((user.role, user.display_name, user.patientprofile.age), ('patient', 'Imported Person 3', 23))
+        self.assertEqual(DoctorProfile.objects.get().user.username, 'doc')
+
+        # What the profile signals would have done.
+        self.assertEqual(DailyPatientStats.objects.get(date=timezone.localdate()).new_patients, 5)
+        self.assertEqual(len(search_patients('imported person')), 5)
+
+    def test_resume_after_a_failed_chunk(self):
+        write_chunk = importer._write_chunk
+        calls = []
+
+        def fail_second(*args):
+            calls.append(1)
+            if len(calls) == 2:
+                raise RuntimeError('connection lost')
+            write_chunk(*args)
+
+        with mock.patch.object(importer, '_write_chunk', fail_second), self.assertRaises(RuntimeError):
+            run_import(import_file(*self.rows), 'users.csv', 'csv', chunk_size=2, workers=1)
+        job = ImportJob.objects.get()
+        self.assertEqual((job.status, job.chunks_done), ('failed', 1))
+        self.assertEqual(CustomUser.objects.count(), 2)
+
+        report = run_import(import_file(*self.rows), 'users.csv', 'csv', chunk_size=2, workers=1)
+        self.assertEqual((report.resumed_from, report.chunks, report.imported), (1, 2, 3))
+        self.assertEqual(sorted(CustomUser.objects.values_list('username', flat=True)),
+                         [f'user{i}' for i in range(5)])
+        self.assertTrue(run_import(import_file(*self.rows), 'users.csv', 'csv', workers=1).already_done)
+
+    def test_duplicates_and_invalid_rows_are_reported(self):
+        make_patient('taken')
+        data = import_file(
+            self.rows[0],
+            self.rows[0],                                                   # same username twice
+            'taken,,pass12345,patient,Someone,30,Male,1,Street',           # existing username
+            'nurse,,pass12345,nurse,Someone,30,Male,1,Street',             # unknown role
+            'bad,not-an-email,pass12345,patient,Someone,30,Male,1,Street',  # invalid email
+            'young,,pass12345,patient,Someone,abc,Male,1,Street',          # invalid profile field
+        )
+        report = run_import(data, 'users.csv', 'csv', chunk_size=4, workers=1)
+        self.assertEqual((report.imported, report.skipped), (1, 5))
+        self.assertEqual([number for number, _ in report.errors], [2, 3, 4, 5, 6])
+        self.assertIn('already taken', report.errors[0][1])
+        self.assertIn("Unknown role 'nurse'", report.errors[2][1])
+        self.assertIn('age', report.errors[4][1])
+        self.assertEqual([tuple(error) for error in ImportJob.objects.get().errors], report.errors)
+
+        jsonl = io.BytesIO(b'{"username": "json1", "role": "admin", "full_name": "A", "age": 40, "gender": "Male", '
+                           b'"phone": "1", "address": "x"}\nnot json\n')
+        report = run_import(jsonl, 'users.jsonl', 'jsonl', workers=1)
+        self.assertEqual((report.imported, report.errors), (1, [(2, 'Row could not be parsed.')]))
+        self.assertTrue(CustomUser.objects.get(username='json1').is_admin)
+
+    def test_view_only_queues(self):
+        admin = CustomUser.objects.create_user(username='admin', password='pass12345', is_admin=True)
+        self.client.force_login(admin)
+        upload = SimpleUploadedFile('users.csv', import_file(*self.rows).getvalue())
+        response = self.client.post(reverse('import_users'), {'file': upload, 'format': 'csv'}, follow=True)
+        self.assertContains(response, 'queued for import')
+        job = ImportJob.objects.get()
+        self.assertEqual(job.status, 'queued')
+        self.assertFalse(CustomUser.objects.filter(username='user0').exists())
+
+        call_command('run_queued_imports', workers=1, stdout=StringIO())
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.rows_imported, job.upload), ('completed', 5, ''))
+        self.assertEqual(importer.import_storage().listdir('')[1], [])
+        upload.seek(0)
+        response = self.client.post(reverse('import_users'), {'file': upload, 'format': 'csv'}, follow=True)
+        self.assertContains(response, 'already imported')
+
+
+class ExportTests(TestCase):
+    def setUp(self):
+        doctor, patient = make_doctor('doctor'), make_patient('patient')
+        self.bills = [Bill.objects.create(patient=patient, doctor=doctor, amount=100 + i, description=f'Visit, no. {i}')
+                      for i in range(7)]
+        self.admin = CustomUser.objects.create_user(username='admin', password='pass12345', is_admin=True)
+
+    def rows(self, data, fmt):
+        text = data.decode()
+        if fmt == 'csv':
+            return list(csv.DictReader(StringIO(text)))
+        return [json.loads(line) for line in text.splitlines()]
+
+    def test_csv_and_jsonl_pages_through_chunk_boundaries(self):
+        for fmt in ('csv', 'ndjson'):
+            # Three rows per query: 3 + 3 + 1, then an empty batch.
+            with self.assertNumQueries(4):
+                rows = self.rows(b''.join(iter_export('bills', fmt, chunk_size=3)), fmt)
+            self.assertEqual([int(row['id']) for row in rows], [bill.pk for bill in self.bills])
+            self.assertEqual(rows[0]['patient'], 'Patient')
+            self.assertEqual(rows[0]['description'], 'Visit, no. 0')
+            self.assertEqual(str(rows[6]['amount']), '106.00')
+
+    def test_gzip_framing_across_blocks(self):
+        plain = b''.join(iter_export('bills', 'csv'))
+        chunks = list(iter_export('bills', 'csv', compress=True, block_size=64, chunk_size=3))
+        self.assertGreater(len(chunks), 1)
+        self.assertEqual(gzip.decompress(b''.join(chunks)), plain)
+
+    def test_view_streams(self):
+        self.client.force_login(self.admin)
+        response = self.client.get(reverse('export_records', args=['bills']), {'format': 'ndjson', 'gzip': '1'})
+        self.assertEqual(response['Content-Type'], 'application/gzip')
+        self.assertFalse(response.is_async)
+        rows = self.rows(gzip.decompress(b''.join(response.streaming_content)), 'ndjson')
+        self.assertEqual(len(rows), 7)
+
+    async def test_asgi_gets_an_async_iterator(self):
+        client = AsyncClient()
+        await client.aforce_login(self.admin)
+        response = await client.get(reverse('export_records', args=['bills']))
+        self.assertTrue(response.is_async)
+        body = b''.join([chunk async for chunk in response.streaming_content])
+        self.assertEqual(len(self.rows(body, 'csv')), 7)
+
+
+class FailingConnection:
+    def open(self):
+        pass
+
+    def close(self):
+        pass
+
+    def send_messages(self, messages):
+        raise ConnectionError('SMTP unavailable')
+
+
+class UnreachableConnection(FailingConnection):
+    def open(self):
+        raise ConnectionRefusedError('Connection refused')
+
+
+class OutboxTests(TestCase):
+    def test_contact_form_is_queued_not_sent(self):
+        response = self.client.post(reverse('contact'), {'name': 'Asha', 'email': 'asha@example.com', 'message': 'Hi'})
+        self.assertRedirects(response, reverse('contact'))
+        self.assertEqual(len(mail.outbox), 0)
+        self.assertEqual(OutboxEmail.objects.get().status, 'pending')
+
+        self.assertEqual(deliver_pending(), (1, 0))
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(mail.outbox[0].subject, 'Contact Form from Asha')
+        self.assertEqual(OutboxEmail.objects.get().status, 'sent')
+
+    def test_status_change_notifies_patient(self):
+        doctor = make_doctor('doctor')
+        patient = make_patient('patient')
+        patient.user.email = 'patient@example.com'
+        patient.user.save()
+        appointment = Appointment.objects.create(patient=patient, doctor=doctor, date=datetime.date(2025, 5, 1),
+                                                 time=datetime.time(9), reason='Checkup')
+        self.client.force_login(doctor.user)
+        self.client.post(reverse('update_appointment_status', args=[appointment.id]), {'status': 'Confirmed'})
+
+        deliver_pending()
+        self.assertEqual(mail.outbox[0].to, ['patient@example.com'])
+        self.assertIn('Confirmed', mail.outbox[0].body)
+
+    def test_failures_back_off_then_give_up(self):
+        email = queue_email('Subject', 'Body', ['someone@example.com'])
+        for attempt in range(1, MAX_ATTEMPTS + 1):
+            OutboxEmail.objects.filter(pk=email.pk).update(next_attempt_at=timezone.now())
+            self.assertEqual(deliver_pending(connection=FailingConnection()), (0, 1))
+            email.refresh_from_db()
+            self.assertEqual(email.attempts, attempt)
+
+        self.assertEqual(email.status, 'failed')
+        self.assertIn('SMTP unavailable', email.last_error)
+        self.assertEqual(deliver_pending(), (0, 0))
+
+    def test_unreachable_server_counts_as_a_failed_attempt(self):
+        email = queue_email('Subject', 'Body', ['someone@example.com'])
+        self.assertEqual(deliver_pending(connection=UnreachableConnection()), (0, 1))
+        email.refresh_from_db()
+        self.assertEqual((email.status, email.attempts), ('pending', 1))
+        self.assertIn('Connection refused', email.last_error)
+        self.assertGreater(email.next_attempt_at, timezone.now())
+
+    def test_claimed_rows_are_leased(self):
+        email = queue_email('Subject', 'Body', ['someone@example.com'])
+        now = timezone.now()
+        self.assertEqual(claim(10, now), [email])
+        # Another worker, or this one after a crash, sees nothing until the lease ends.
+        self.assertEqual(claim(10, now), [])
+        self.assertEqual(deliver_pending(), (0, 0))
+        [again] = claim(10, now + LEASE)
+        self.assertEqual(again.attempts, 2)
+
+
+class FakeStripeHandler(BaseHTTPRequestHandler):
+    # Just enough of the Stripe API for checkout: POST /v1/checkout/sessions.
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.get('Content-Length', 0))).decode()
+        if self.path != '/v1/checkout/sessions':
+            self.send_error(404)
+            return
+        request = parse_qs(body)
+        request['idempotency_key'] = self.headers.get('Idempotency-Key')
+        self.server.requests.append(request)
+        payload = json.dumps({
+            'id': f'cs_test_{len(self.server.requests)}',
+            'object': 'checkout.session',
+            'url': 'https://checkout.stripe.test/session',
+            'expires_at': int(time.time()) + 24 * 60 * 60,
+        }).encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, *args):
+        pass
+
+
+WEBHOOK_SECRET = 'whsec_test'
+
+
+def stripe_signature(payload, secret=WEBHOOK_SECRET):
+    timestamp = int(time.time())
+    digest = hmac.new(secret.encode(), f'{timestamp}.{payload}'.encode(), hashlib.sha256).hexdigest()
+    return f't={timestamp},v1={digest}'
+
+
+class StripePaymentTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.server = ThreadingHTTPServer(('127.0.0.1', 0), FakeStripeHandler)
+        cls.server.requests = []
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+        cls.settings = override_settings(
+            STRIPE_API_BASE=f'http://127.0.0.1:{cls.server.server_port}',
+            STRIPE_SECRET_KEY='sk_test_fake',
+            STRIPE_WEBHOOK_SECRET=WEBHOOK_SECRET,
+        )
+        cls.settings.enable()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.settings.disable()
+        cls.server.shutdown()
+        cls.server.server_close()
+        super().tearDownClass()
+
+    def setUp(self):
+        self.server.requests.clear()
+        self.patient = make_patient('patient')
+        self.bill = Bill.objects.create(patient=self.patient, doctor=make_doctor('doctor'), amount=250,
+                                        description='Consultation')
+        self.client.force_login(self.patient.user)
+
+    def post_event(self, payload, signature=None):
+        return self.client.post(reverse('stripe_webhook'), payload, content_type='application/json',
+                                HTTP_STRIPE_SIGNATURE=signature or stripe_signature(payload))
+
+    def test_checkout_session_is_reused(self):
+        for _ in range(3):
+            response = self.client.get(reverse('pay_bill', args=[self.bill.id]))
+            self.assertEqual(response.context['session_id'], 'cs_test_1')
+        self.assertEqual(len(self.server.requests), 1)
+        self.assertEqual(self.server.requests[0]['metadata[bill_id]'], [str(self.bill.id)])
+
+    def test_expired_session_is_replaced(self):
+        self.client.get(reverse('pay_bill', args=[self.bill.id]))
+        Bill.objects.filter(pk=self.bill.pk).update(checkout_session_expires=timezone.now())
+        response = self.client.get(reverse('pay_bill', args=[self.bill.id]))
+        self.assertEqual(response.context['session_id'], 'cs_test_2')
+
+    def test_amount_change_gets_a_new_session(self):
+        self.client.get(reverse('pay_bill', args=[self.bill.id]))
+        Bill.objects.filter(pk=self.bill.pk).update(amount=300)
+        response = self.client.get(reverse('pay_bill', args=[self.bill.id]))
+        self.assertEqual(response.context['session_id'], 'cs_test_2')
+        first, second = self.server.requests
+        self.assertEqual(second['line_items[0][price_data][unit_amount]'], ['30000'])
+        self.assertNotEqual(first['idempotency_key'], second['idempotency_key'])
+        self.assertEqual(Bill.objects.get(pk=self.bill.pk).checkout_session_amount, 30000)
+
+    def paid_event(self, **session):
+        return json.dumps({
+            'id': 'evt_1', 'object': 'event', 'type': 'checkout.session.completed',
+            'data': {'object': {'id': 'cs_test_1', 'object': 'checkout.session', 'payment_status': 'paid',
+                                'amount_total': 25000, 'currency': 'inr',
+                                'metadata': {'bill_id': str(self.bill.id)}, **session}},
+        })
+
+    def test_webhook_marks_bill_paid_once(self):
+        payload = self.paid_event()
+        self.assertEqual(self.post_event(payload).status_code, 200)
+        self.assertEqual(self.post_event(payload).status_code, 200)
+        self.bill.refresh_from_db()
+        self.assertTrue(self.bill.paid)
+        self.assertEqual(self.bill.payment_method, 'Online')
+
+        response = self.client.get(reverse('pay_bill', args=[self.bill.id]))
+        self.assertRedirects(response, reverse('patient_dashboard'))
+
+    def test_webhook_checks_amount_and_currency(self):
+        with self.assertLogs('hospitalapp.payments', 'WARNING'):
+            for session in ({'amount_total': 100}, {'currency': 'usd'}, {'amount_total': None}):
+                self.assertEqual(self.post_event(self.paid_event(**session)).status_code, 200)
+        self.bill.refresh_from_db()
+        self.assertFalse(self.bill.paid)
+
+    def test_webhook_ignores_malformed_bill_ids(self):
+        with self.assertLogs('hospitalapp.payments', 'WARNING'):
+            for bill_id in ('abc', '1.5', ['1']):
+                response = self.post_event(self.paid_event(metadata={'bill_id': bill_id}))
+                self.assertEqual(response.status_code, 200)
+        self.bill.refresh_from_db()
+        self.assertFalse(self.bill.paid)
+
+    def test_webhook_rejects_bad_signature(self):
+        payload = json.dumps({'id': 'evt_1', 'object': 'event', 'type': 'checkout.session.completed',
+                              'data': {'object': {'payment_status': 'paid',
+                                                  'metadata': {'bill_id': str(self.bill.id)}}}})
+        response = self.post_event(payload, stripe_signature(payload, secret='whsec_wrong'))
+        self.assertEqual(response.status_code, 400)
+        self.bill.refresh_from_db()
+        self.assertFalse(self.bill.paid)
+
+
+class PatientSearchTests(TestCase):
+    def setUp(self):
+        self.doctor = make_doctor('doctor')
+
+    def history(self, patient, diagnosis, **kwargs):
+        return MedicalHistory.objects.create(patient=patient, doctor=self.doctor, diagnosis=diagnosis,
+                                             treatment_history='-', date=datetime.date(2025, 1, 6), **kwargs)
+
+    def search(self, query):
+        return [patient.full_name for patient in search_patients(query)]
+
+    def test_ranking_and_prefix_matching(self):
+        focused, verbose, other = make_patient('focused'), make_patient('verbose'), make_patient('other')
+        self.history(focused, 'Influenza', notes='influenza confirmed')
+        self.history(verbose, 'Influenza', notes='seen for a sprained ankle, back pain and a routine checkup')
+        self.history(other, 'Migraine', medications='Paracetamol')
+        search_backend().rebuild(iter_documents())
+
+        # BM25: more occurrences in a shorter document rank higher.
+        self.assertEqual(self.search('influenza'), ['Focused', 'Verbose'])
+        self.assertEqual(self.search('parac'), ['Other'])
+        # Every term has to match.
+        self.assertEqual(self.search('influ ankle'), ['Verbose'])
+        self.assertEqual(self.search('migraine ankle'), [])
+
+    def test_signals_keep_the_index_current(self):
+        patient = make_patient('patient')
+        search_backend().rebuild(iter_documents())
+        with self.captureOnCommitCallbacks(execute=True):
+            record = self.history(patient, 'Bronchitis')
+        self.assertEqual(self.search('bronch'), ['Patient'])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            record.diagnosis = 'Asthma'
+            record.save()
+        self.assertEqual(self.search('bronch'), [])
+        self.assertEqual(self.search('asthma'), ['Patient'])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            record.delete()
+        self.assertEqual(self.search('asthma'), [])
+
+    def test_search_needs_a_doctor_or_admin(self):
+        url = reverse('patient_management') + '?q=flu'
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 302)
+        self.assertNotIn('patients', response.context or {})
+
+        self.client.force_login(make_patient('patient').user)
+        self.assertEqual(self.client.get(url).status_code, 302)
+
+        self.client.force_login(self.doctor.user)
+        self.assertEqual(self.client.get(url).status_code, 200)
+
+
+class HotQueryPlanTests(TestCase):
+    def test_hot_queries_use_indexes(self):
+        call_command('explain_hot_queries', min_rows=0, stdout=StringIO())
+
+    def test_full_scan_is_detected(self):
+        _, scanned = full_scans(Facility.objects.filter(name='Radiology'))
+        self.assertEqual(scanned, [Facility._meta.db_table])
+
+    def test_full_index_scan_is_detected(self):
+        table = Announcement._meta.db_table
+        latest = Announcement.objects.order_by('-date', '-id')
+        plan, scanned = full_scans(latest.filter(title='Ward closed')[:20])
+        self.assertIn('INDEX', plan.upper())
+        self.assertEqual(scanned, [table])
+        self.assertEqual(full_scans(latest.values_list('date', 'id'))[1], [table])
+        # Reading the newest page stops after LIMIT entries.
+        self.assertEqual(full_scans(latest[:20])[1], [])
+
+
+class MigrationTests(TestCase):
+    databases = '__all__'
+
+    def test_migrations_match_the_models(self):
+        call_command('makemigrations', 'hospitalapp', check=True, dry_run=True, stdout=StringIO())
+
+
+class SeedAndBenchmarkTests(TestCase):
+    def test_seeded_data_can_be_benchmarked(self):
+        scale = scale_for('small', doctors=2, patients=10, appointments=40, admins=1, facilities=2, content=3,
+                          outbox=3, import_jobs=1)
+        counts = seed(scale, chunk_size=16)
+        self.assertEqual(counts['Appointment'], 40)
+        self.assertEqual(AppointmentSlot.objects.count(), 40)
+        self.assertEqual(CustomUser.objects.count(), 13)
+        self.assertFalse(OutboxEmail.objects.filter(status='pending').exists())
+
+        pages = {'patient_dashboard', 'view_bills', 'doctor_appointments', 'manage_appointments'}
+        report = run_benchmark(iterations=3, warmup=0, memory_samples=1, only=pages)
+        self.assertEqual(set(report['scenarios']), pages)
+        for result in report['scenarios'].values():
+            self.assertEqual(result['status'], {'200': 3})
+            self.assertLessEqual(result['latency_ms']['p50'], result['latency_ms']['p99'])
+            self.assertGreater(result['queries']['p50'], 0)
+
+
+class RequestProfileTests(TestCase):
+    def setUp(self):
+        reset_request_stats()
+        self.patient = make_patient('patient')
+        self.client.force_login(self.patient.user)
+
+    def test_server_timing_and_stats(self):
+        response = self.client.get(reverse('patient_dashboard'))
+        self.assertRegex(response['Server-Timing'], r'db;dur=[\d.]+;desc="\d+ queries", tpl;dur=[\d.]+, '
+                                                    r'view;dur=[\d.]+, total;dur=[\d.]+')
+        stats = request_stats()['patient_dashboard']
+        self.assertEqual(stats['requests'], 1)
+        self.assertGreater(stats['queries'], 0)
+        self.assertGreater(stats['template_ms'], 0)
+
+    def test_repeated_statements_are_logged(self):
+        for i in range(6):
+            make_doctor(f'doctor{i}')
+        with self.settings(N_PLUS_ONE_THRESHOLD=5, SLOW_REQUEST_MS=60000):
+            with self.assertLogs('hospitalapp.requests', 'WARNING') as logs:
+                self.client.get(reverse('doctor_list'))
+        entry = json.loads(logs.records[0].getMessage())
+        self.assertEqual(entry['event'], 'n_plus_one')
+        self.assertEqual(entry['view'], 'doctor_list')
+        self.assertGreaterEqual(entry['duplicates'][0]['count'], 5)
+        self.assertEqual(request_stats()['doctor_list']['n_plus_one'], 1)
+
+
+class AsyncViewTests(TransactionTestCase):
+    # Committed rows, so the dashboard sections are really read in parallel.
+    def setUp(self):
+        caches['dashboards'].clear()
+        self.patient = make_patient('patient')
+        self.doctor = make_doctor('doctor')
+        Appointment.objects.create(patient=self.patient, doctor=self.doctor, date=datetime.date(2025, 3, 1),
+                                   time=datetime.time(10), reason='Checkup')
+
+    async def test_pages_under_asgi(self):
+        client = AsyncClient()
+        await client.aforce_login(self.patient.user)
+        response = await client.get(reverse('patient_dashboard'))
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, 'Checkup')
+        self.assertRegex(response['Server-Timing'], r'desc="[1-9]\d* queries"')
+
+        await client.aforce_login(self.doctor.user)
+        response = await client.get(reverse('doctor_appointments'))
+        self.assertEqual(len(response.context['appointments']), 1)
+        self.assertEqual((await client.get(reverse('announcements'))).status_code, 200)
+
+    async def test_sessions_from_model_backend(self):
+        # Logins from before CachedModelBackend carry no profiles.
+        client = AsyncClient()
+        await client.aforce_login(self.patient.user, backend='django.contrib.auth.backends.ModelBackend')
+        response = await client.get(reverse('patient_dashboard'))
+        self.assertContains(response, 'Checkup')
+
+    def test_throughput_report(self):
+        report = run_throughput(requests=4, concurrency=2, wsgi_threads=2, only={'announcements', 'doctor_list'})
+        for result in report['scenarios'].values():
+            self.assertEqual(result['wsgi']['status'], {'200': 4})
+            self.assertEqual(result['asgi']['status'], {'200': 4})
+            self.assertGreater(result['asgi']['requests_per_second'], 0)
+
+
+@override_settings(METRICS_TOKEN='secret')
+class MetricsEndpointTests(TestCase):
+    def setUp(self):
+        reset_request_stats()
+        self.doctor = make_doctor('doctor')
+        self.patient = make_patient('patient')
+        day = next_weekday(0)
+        self.appointments = [
+            Appointment.objects.create(patient=self.patient, doctor=self.doctor, date=day,
+                                       time=datetime.time(9 + i), reason='Checkup')
+            for i in range(3)
+        ]
+        self.bill = Bill.objects.create(patient=self.patient, doctor=self.doctor, amount=300, description='Visit')
+        Bill.objects.create(patient=self.patient, doctor=self.doctor, amount=200, description='Lab')
+
+    def scrape(self):
+        response = self.client.get(reverse('metrics'), HTTP_AUTHORIZATION='Bearer secret')
+        self.assertEqual(response.status_code, 200)
+        return response.content.decode()
+
+    def test_domain_gauges_follow_changes_without_counting(self):
+        body = self.scrape()
+        self.assertIn(f'hospital_pending_appointments{{doctor_id="{self.doctor.pk}"}} 3\n', body)
+        self.assertIn('hospital_unpaid_bills 2\n', body)
+        self.assertIn('hospital_unpaid_bills_amount 500\n', body)
+        self.assertIn('hospital_appointments_booked_total 3\n', body)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.appointments[0].status = 'Confirmed'
+            self.appointments[0].save()
+            self.appointments[1].delete()
+            self.bill.paid = True
+            self.bill.save()
+
+        with CaptureQueriesContext(connection) as queries:
+            body = self.scrape()
+        self.assertFalse([q for q in queries.captured_queries if 'COUNT(' in q['sql'].upper()])
+        self.assertIn(f'hospital_pending_appointments{{doctor_id="{self.doctor.pk}"}} 1\n', body)
+        self.assertIn('hospital_unpaid_bills 1\n', body)
+        self.assertIn('hospital_unpaid_bills_amount 200\n', body)
+
+    def test_counters_wait_for_commit(self):
+        self.scrape()
+        with self.captureOnCommitCallbacks() as callbacks:
+            Appointment.objects.create(patient=self.patient, doctor=self.doctor, date=next_weekday(1),
+                                       time=datetime.time(9), reason='Checkup')
+            self.assertEqual(counter_values()[APPOINTMENTS_BOOKED][''], 3)
+        for callback in callbacks:
+            callback()
+        self.assertEqual(counter_values()[APPOINTMENTS_BOOKED][''], 4)
+        self.assertEqual(counter_values()[PENDING_APPOINTMENTS][str(self.doctor.pk)], 4)
+
+    def test_request_histogram(self):
+        self.client.get(reverse('home'))
+        body = self.scrape()
+        self.assertIn('# TYPE hospital_request_duration_seconds histogram', body)
+        self.assertIn('hospital_request_duration_seconds_bucket{view="home",le="+Inf"} 1\n', body)
+        self.assertIn('hospital_request_duration_seconds_count{view="home"} 1\n', body)
+
+    def test_token(self):
+        self.assertEqual(self.client.get(reverse('metrics')).status_code, 401)
+        response = self.client.get(reverse('metrics'), HTTP_AUTHORIZATION='Bearer wrong')
+        self.assertEqual(response.status_code, 401)
+        self.scrape()
+
+    def test_refused_without_a_token_setting(self):
+        with self.settings(METRICS_TOKEN=''):
+            for header in ({}, {'HTTP_AUTHORIZATION': 'Bearer '}):
+                self.assertEqual(self.client.get(reverse('metrics'), **header).status_code, 401)
+
+
+class AnalyticsRollupTests(QueryBudgetMixin, TestCase):
+    def setUp(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            self.doctor = make_doctor('doctor')
+            self.patient = make_patient('patient')
+        self.admin = CustomUser.objects.create_user(username='admin', password='pass12345', is_admin=True)
+        self.today = timezone.localdate()
+
+    def book(self, days_ago, status='Pending', hour=9):
+        with self.captureOnCommitCallbacks(execute=True):
+            return Appointment.objects.create(patient=self.patient, doctor=self.doctor, status=status,
+                                              reason='Checkup', date=self.today - datetime.timedelta(days=days_ago),
+                                              time=datetime.time(hour))
+
+    def rollup_rows(self):
+        return (
+            sorted(DailyAppointmentStats.objects.exclude(count=0).values_list('date', 'doctor_id', 'status', 'count')),
+            sorted(DailyBillingStats.objects.exclude(bills=0).values_list('date', 'doctor_id', 'bills', 'billed', 'paid')),
+            sorted(DailyPatientStats.objects.exclude(new_patients=0).values_list('date', 'new_patients')),
+        )
+
+    def test_incremental_rollups_match_backfill(self):
+        first, second, third = self.book(0), self.book(1), self.book(1, hour=10)
+        before = self.rollup_rows()
+        with self.captureOnCommitCallbacks() as callbacks:
+            first.status = 'Confirmed'
+            first.save()
+            second.date = self.today - datetime.timedelta(days=3)
+            second.save()
+            third.delete()
+            bill = Bill.objects.create(patient=self.patient, doctor=self.doctor, amount=400, description='Visit')
+            Bill.objects.create(patient=self.patient, doctor=self.doctor, amount=150, description='Lab')
+            bill.paid = True
+            bill.save()
+            make_patient('another')
+        # Nothing is counted before the commit.
+        self.assertEqual(self.rollup_rows(), before)
+        for callback in callbacks:
+            callback()
+
+        incremental = self.rollup_rows()
+        backfill()
+        self.assertEqual(self.rollup_rows(), incremental)
+        self.assertEqual(incremental[1], [(self.today, self.doctor.pk, 2, 550, 400)])
+        self.assertEqual(incremental[2], [(self.today, 2)])
+
+    def test_dashboard_cost_does_not_grow_with_history(self):
+        self.client.force_login(self.admin)
+        self.book(0)
+
+        def add_history():
+            for days_ago in range(40, 400, 7):
+                self.book(days_ago)
+
+        self.assertFixedQueryCount(reverse('admin_dashboard'), add_history)
+        analytics = self.client.get(reverse('admin_dashboard')).context['analytics']
+        self.assertEqual(analytics['totals']['appointments'], 1)
+        self.assertEqual(analytics['doctors'][0]['booked'], 1)
+
+
+class AppointmentTransitionTests(TestCase):
+    def setUp(self):
+        self.doctor = make_doctor('doctor')
+        self.patient = make_patient('patient')
+        self.patient.user.email = 'patient@example.com'
+        self.patient.user.save()
+        self.day = timezone.localdate()
+        self.client.force_login(self.doctor.user)
+
+    def book(self, count, doctor=None):
+        with self.captureOnCommitCallbacks(execute=True):
+            return [Appointment.objects.create(patient=self.patient, doctor=doctor or self.doctor, date=self.day,
+                                               time=datetime.time(9 + i % 8), reason='Checkup') for i in range(count)]
+
+    def post_bulk(self, status, appointments):
+        return self.client.post(reverse('bulk_update_appointment_status'),
+                                {'status': status, 'appointment_ids': [a.id for a in appointments]})
+
+    def test_bulk_transitions_are_idempotent_and_keep_counters_in_step(self):
+        first, second, pending = self.book(3)
+        [other] = self.book(1, make_doctor('other'))
+        with self.captureOnCommitCallbacks(execute=True):
+            self.post_bulk('Confirmed', [first, second, other])
+        self.assertEqual(Appointment.objects.get(pk=other.pk).status, 'Pending')
+
+        for _ in range(2):
+            with self.captureOnCommitCallbacks(execute=True):
+                self.post_bulk('Completed', [first, second, pending])
+        statuses = dict(Appointment.objects.values_list('id', 'status'))
+        self.assertEqual([statuses[a.id] for a in (first, second, pending)], ['Completed', 'Completed', 'Pending'])
+        histories = MedicalHistory.objects.filter(appointment__isnull=False)
+        self.assertEqual(sorted(histories.values_list('appointment_id', flat=True)), [first.id, second.id])
+        self.assertEqual(OutboxEmail.objects.count(), 4)
+
+        incremental = counter_values()[PENDING_APPOINTMENTS]
+        self.assertEqual(incremental[str(self.doctor.id)], 1)
+        rebuild_counters()
+        self.assertEqual(counter_values()[PENDING_APPOINTMENTS], incremental)
+        rows = sorted(DailyAppointmentStats.objects.exclude(count=0).values_list('doctor_id', 'status', 'count'))
+        backfill()
+        self.assertEqual(sorted(DailyAppointmentStats.objects.values_list('doctor_id', 'status', 'count')), rows)
+
+    def test_query_count_does_not_grow_with_batch(self):
+        transition([a.id for a in self.book(1)], 'Confirmed')
+
+        def queries(count):
+            ids = [a.id for a in self.book(count)]
+            with CaptureQueriesContext(connection) as ctx:
+                result = transition(ids, 'Confirmed', self.doctor)
+            self.assertEqual(len(result.changed), count)
+            return len(ctx.captured_queries)
+
+        self.assertEqual(queries(10), queries(2))
+
+    def test_bulk_transition_invalidates_sections_after_commit(self):
+        ids = [a.id for a in self.book(2)]
+        transition(ids, 'Confirmed', self.doctor)
+        owner = f'patient:{self.patient.pk}'
+        with self.captureOnCommitCallbacks(execute=True):
+            transition(ids, 'Completed', self.doctor)
+            rendered = {section: fragment_version(owner, section) for section in ('appointments', 'medical_history')}
+        for section, version in rendered.items():
+            self.assertNotEqual(fragment_version(owner, section), version)
+
+    def test_single_update_checks_ownership(self):
+        [appointment] = self.book(1, make_doctor('other'))
+        self.client.post(reverse('update_appointment_status', args=[appointment.id]), {'status': 'Declined'})
+        self.assertEqual(Appointment.objects.get(pk=appointment.pk).status, 'Pending')
+
+
+class PrincipalCacheTests(TestCase):
+    def setUp(self):
+        caches['dashboards'].clear()
+        self.doctor = make_doctor('doctor')
+        self.client.force_login(self.doctor.user)
+        self.url = reverse('doctor_dashboard')
+
+    def user_queries(self):
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        return [q['sql'] for q in ctx.captured_queries if 'FROM "hospitalapp_customuser"' in q['sql']]
+
+    def test_user_and_profiles_load_once_and_follow_saves(self):
+        [cold] = self.user_queries()
+        self.assertIn('hospitalapp_doctorprofile', cold)
+        self.assertEqual(self.user_queries(), [])
+
+        self.doctor.full_name = 'Renamed'
+        self.doctor.save()
+        self.assertEqual(CachedModelBackend().get_user(self.doctor.user_id).doctorprofile.full_name, 'Renamed')
+
+        user = self.doctor.user
+        user.is_active = False
+        user.save()
+        self.assertEqual(self.client.get(self.url).status_code, 302)
+
+    def test_login_redirects_by_role(self):
+        self.client.logout()
+        response = self.client.post(reverse('login'), {'username': 'doctor', 'password': 'pass12345'})
+        self.assertRedirects(response, self.url, fetch_redirect_response=False)
+
+        CustomUser.objects.create_user(username='nobody', password='pass12345')
+        self.client.logout()
+        response = self.client.post(reverse('login'), {'username': 'nobody', 'password': 'pass12345'})
+        self.assertRedirects(response, reverse('login'), fetch_redirect_response=False)
+        self.assertNotIn('_auth_user_id', self.client.session)
+
+
+@override_settings(LOGIN_THROTTLE_WINDOW=300, LOGIN_THROTTLE_PER_IP=3, LOGIN_THROTTLE_PER_USERNAME=5)
+class LoginThrottleTests(TestCase):
+    def setUp(self):
+        caches[settings.LOGIN_THROTTLE_CACHE_ALIAS].clear()
+        self.patient = make_patient('patient')
+
+    def login(self, username, password, address='10.0.0.1'):
+        return self.client.post(reverse('login'), {'username': username, 'password': password},
+                                REMOTE_ADDR=address)
+
+    def test_address_is_blocked_before_hashing(self):
+        for i in range(3):
+            self.assertEqual(self.login(f'guess{i}', 'wrong').status_code, 200)
+        with mock.patch('hospitalapp.views.authenticate') as authenticate:
+            response = self.login('patient', 'pass12345')
+        authenticate.assert_not_called()
+        self.assertEqual(response.status_code, 429)
+        self.assertGreater(int(response['Retry-After']), 0)
+
+        response = self.login('patient', 'pass12345', address='10.0.0.2')
+        self.assertRedirects(response, reverse('patient_dashboard'), fetch_redirect_response=False)
+
+    def test_username_limit_spans_addresses_and_resets_on_success(self):
+        for i in range(4):
+            self.login('patient', 'wrong', address=f'10.0.1.{i}')
+        self.assertEqual(self.login('patient', 'pass12345', address='10.0.2.1').status_code, 302)
+        for i in range(4):
+            self.login('patient', 'wrong', address=f'10.0.3.{i}')
+        self.assertEqual(self.login('patient', 'wrong', address='10.0.4.1').status_code, 200)
+        self.assertEqual(self.login('patient', 'pass12345', address='10.0.4.1').status_code, 429)
+        self.assertEqual(self.login('other', 'wrong', address='10.0.4.1').status_code, 200)
+
+    def test_locked_username_still_logs_in_from_a_clean_address(self):
+        for i in range(8):
+            self.login('patient', 'wrong', address=f'10.0.1.{i}')
+        response = self.login('patient', 'pass12345', address='10.0.9.9')
+        self.assertRedirects(response, reverse('patient_dashboard'), fetch_redirect_response=False)
+        # The correct password is not held against the address.
+        for i in range(3):
+            self.assertEqual(self.login(f'guess{i}', 'wrong', address='10.0.9.9').status_code, 200)
+
+    def test_concurrent_attempts_cannot_pass_the_limit(self):
+        request = RequestFactory().post('/', REMOTE_ADDR='10.0.5.1')
+        cache = caches[settings.LOGIN_THROTTLE_CACHE_ALIAS]
+        # Every attempt of the burst checks the counters before any is counted.
+        with mock.patch.object(cache, 'get_many', return_value={}):
+            waits = [throttle.reserve(request, f'guess{i}') for i in range(5)]
+        self.assertEqual([bool(wait) for wait in waits], [False, False, False, True, True])
+        self.assertTrue(throttle.reserve(request, 'guess'))
+
+    def test_password_is_rehashed_to_the_current_policy_on_login(self):
+        with override_settings(PASSWORD_HASHERS=['hospitalapp.hashers.PBKDF2PasswordHasher'], PBKDF2_ITERATIONS=1000):
+            user = self.patient.user
+            user.set_password('pass12345')
+            user.save()
+            self.assertIn('$1000$', user.password)
+            with self.settings(PBKDF2_ITERATIONS=2000):
+                self.assertEqual(self.login('patient', 'pass12345').status_code, 302)
+        self.assertIn('$2000$', CustomUser.objects.get(pk=user.pk).password)
+
+
+class LoginBurstBenchmarkTests(TransactionTestCase):
+    # Committed users, so the attack threads' connections can see them.
+    @override_settings(LOGIN_THROTTLE_PER_IP=2)
+    def test_burst_is_throttled_and_cleans_up(self):
+        caches[settings.LOGIN_THROTTLE_CACHE_ALIAS].clear()
+        report = run_login_burst(logins=3, attack_rate=100, attackers=2, attack_ips=1, workers=2, ramp=10,
+                                 unthrottled=False)
+        result = report['modes']['throttled']
+        self.assertEqual(result['baseline']['status'], {'302': 3})
+        self.assertEqual(result['under_attack']['status'], {'302': 3})
+        self.assertIn('429', result['attack']['status'])
+        self.assertFalse(CustomUser.objects.exists())
+
+
+class DisplayNameTests(TestCase):
+    def setUp(self):
+        self.doctor = make_doctor('doctor', full_name='Meera Nair')
+        for i in range(3):
+            patient = make_patient(f'patient{i}')
+            appointment = Appointment.objects.create(patient=patient, doctor=self.doctor, date=datetime.date(2025, 1, 6),
+                                                     time=datetime.time(9 + i), reason='Checkup')
+            Bill.objects.create(patient=patient, doctor=self.doctor, amount=100, description=str(appointment.pk))
+
+    def test_listing_users_appointments_and_bills_runs_no_profile_queries(self):
+        users = list(CustomUser.objects.all())
+        appointments = list(Appointment.objects.select_related('patient', 'doctor'))
+        bills = list(Bill.objects.select_related('patient'))
+        with self.assertNumQueries(0):
+            names = sorted(user.full_name for user in users)
+            rows = [str(row) for row in appointments + bills]
+        self.assertEqual(names, ['Meera Nair', 'Patient0', 'Patient1', 'Patient2'])
+        self.assertIn(f'Appointment {appointments[0].id} - Patient0 with Meera Nair', rows)
+        self.assertIn(f'Bill #{bills[0].id} - Patient0', rows)
+
+    def test_str_names_the_patient_without_select_related(self):
+        self.assertIn('- Patient0 with Meera Nair', str(Appointment.objects.order_by('id').first()))
+
+    def test_names_follow_profile_and_role_changes(self):
+        self.doctor.full_name = 'Meera Iyer'
+        self.doctor.save()
+        user = CustomUser.objects.get(pk=self.doctor.user_id)
+        self.assertEqual((user.role, user.display_name), ('doctor', 'Meera Iyer'))
+
+        user.is_doctor, user.is_admin, user.first_name = False, True, 'Meera'
+        user.save()
+        self.assertEqual(CustomUser.objects.get(pk=user.pk).full_name, 'Meera')
+
+        CustomUser.objects.filter(pk=user.pk).update(is_admin=False, is_doctor=True, display_name='', profile_age=-1)
+        call_command('sync_display_names', stdout=StringIO())
+        user = CustomUser.objects.get(pk=user.pk)
+        self.assertEqual((user.display_name, user.profile_age), ('Meera Iyer', 40))
+
+        self.doctor.age = 52
+        self.doctor.save()
+        self.assertEqual(CustomUser.objects.get(pk=user.pk).profile_age, 52)
+
+
+class ManageUsersGridTests(QueryBudgetMixin, TestCase):
+    def setUp(self):
+        self.admin = CustomUser.objects.create_user(username='admin', password='pass12345', is_admin=True)
+        self.client.force_login(self.admin)
+        for name, age in [('Anita Rao', 52), ('Arjun Das', 19), ('Bela Sen', 34)]:
+            make_patient(name.split()[0].lower(), full_name=name, age=age)
+        make_doctor('doc', full_name='Anand Iyer')
+
+    def names(self, query):
+        response = self.client.get(reverse('manage_users') + query)
+        return [row['display_name'] for row in response.context['users']], response.context['page']
+
+    def test_role_filter_sort_and_keyset_pages(self):
+        names, page = self.names('?role=patient&sort=age&per_page=2')
+        self.assertEqual(names, ['Arjun Das', 'Bela Sen'])
+        rest, page = self.names('?' + page.next_query)
+        self.assertEqual(rest, ['Anita Rao'])
+        self.assertFalse(page.has_next)
+
+        names, _ = self.names('?q=an&sort=-name')
+        self.assertEqual(names, ['Anita Rao', 'Anand Iyer'])
+        response = self.client.get(reverse('manage_users') + '?role=doctor')
+        self.assertEqual(response.context['total'], (1, 'exact'))
+        self.assertEqual(response.context['users'].items[0]['profile']['age'], 40)
+
+    def test_cost_does_not_grow_with_users(self):
+        def add_users():
+            for i in range(10):
+                make_patient(f'extra{i}')
+                make_doctor(f'extradoc{i}')
+        self.assertFixedQueryCount(reverse('manage_users') + '?role=patient&per_page=2', add_users)
+
+    def test_count_stops_at_cap(self):
+        self.assertEqual(approximate_count(CustomUser.objects.all(), True, cap=3), (3, 'at_least'))
+
+
+@skipUnless('replica' in settings.DATABASES, 'needs a second database configured as "replica" (see test_settings.py)')
+@override_settings(DATABASE_REPLICAS=['replica'])
+class ReplicaRoutingTests(TestCase):
+    databases = {'default', 'replica'} & settings.DATABASES.keys()
+
+    def setUp(self):
+        # Rows written straight to one side stand in for replication lag.
+        Announcement.objects.create(title='Only on primary', content='-')
+        Announcement.objects.using('replica').create(title='Replicated', content='-')
+        # Logged in, so the public page cache is bypassed.
+        self.client.force_login(make_patient('patient').user)
+
+    def test_read_only_views_read_the_replica(self):
+        response = self.client.get(reverse('announcements'))
+        self.assertContains(response, 'Replicated')
+        self.assertNotContains(response, 'Only on primary')
+        self.assertNotIn(PIN_COOKIE, response.cookies)
+
+    def test_reads_stick_to_primary_after_a_write(self):
+        response = self.client.post(reverse('contact'), {'name': 'A', 'email': 'a@example.com', 'message': 'Hi'})
+        self.assertIn(PIN_COOKIE, response.cookies)
+        self.assertEqual(OutboxEmail.objects.using('replica').count(), 0)
+
+        response = self.client.get(reverse('announcements'))
+        self.assertContains(response, 'Only on primary')
+
+
+
+class PublicPageCacheTests(TestCase):
+    def setUp(self):
+        caches['dashboards'].clear()
+        for i in range(25):
+            Announcement.objects.create(title=f'Notice {i}', content='-')
+
+    def test_anonymous_burst_is_served_from_cache(self):
+        url = reverse('announcements')
+        first = self.client.get(url)
+        self.assertEqual(len(first.context['announcements']), 20)
+        with self.assertNumQueries(0):
+            for _ in range(50):
+                response = self.client.get(url)
+        self.assertEqual(response.content, first.content)
+        self.assertNotIn('Last-Modified', response)
+
+        not_modified = self.client.get(url, headers={'If-None-Match': response['ETag']})
+        self.assertEqual(not_modified.status_code, 304)
+        self.assertContains(self.client.get(url + '?page=2'), 'Notice 0')
+
+    def test_saving_a_row_invalidates_its_pages(self):
+        url = reverse('announcements')
+        etag = self.client.get(url)['ETag']
+        with self.captureOnCommitCallbacks(execute=True):
+            Announcement.objects.create(title='Ward closed', content='-')
+            # A visitor caches the page before the row commits.
+            self.client.get(url)
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.get(url, headers={'If-None-Match': etag})
+        self.assertTrue(ctx.captured_queries)
+        self.assertContains(response, 'Ward closed')
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_key_is_the_normalized_page_number(self):
+        url = reverse('announcements')
+        self.client.get(url)
+        with self.assertNumQueries(0):
+            for query in ('?page=1', '?page=0', '?page=abc', '?utm_source=mail', '?page=1&_=123'):
+                self.assertEqual(self.client.get(url + query).status_code, 200)
+
+    def test_pages_past_the_last_are_not_cached(self):
+        url = reverse('announcements')
+        for number in (3, 999999):
+            self.assertEqual(self.client.get(url, {'page': number}).status_code, 404)
+        self.assertEqual(caches['dashboards'].get_many([f'page:announcements:{fragment_version("pages", "announcements")}:{n}'
+                                                        for n in (3, 999999)]), {})
+
+
+class MediaStorageTests(TestCase):
+    def setUp(self):
+        media_root = tempfile.TemporaryDirectory()
+        self.addCleanup(media_root.cleanup)
+        self.enterContext(override_settings(MEDIA_ROOT=media_root.name, MEDIA_OFFLOAD=''))
+        self.body = bytes(range(256)) * 1024
+        self.publication = Publication.objects.create(
+            title='Annual report', description='-', file=SimpleUploadedFile('Report 2025.PDF', self.body))
+        self.url = self.publication.file.url
+
+    def test_identical_uploads_share_one_blob(self):
+        again = Publication.objects.create(title='Copy', description='-', file=SimpleUploadedFile('copy.pdf', self.body))
+        self.assertEqual(again.file.name, self.publication.file.name)
+        digest = hashlib.sha256(self.body).hexdigest()
+        self.assertEqual(self.publication.file.name, f'blobs/{digest[:2]}/{digest[2:4]}/{digest}.pdf')
+        blob_dir = os.path.dirname(self.publication.file.path)
+        self.assertEqual(len(os.listdir(blob_dir)), 1)
+
+    def test_range_and_conditional_requests(self):
+        full = self.client.get(self.url)
+        self.assertEqual(b''.join(full.streaming_content), self.body)
+        self.assertEqual(full['Accept-Ranges'], 'bytes')
+        self.assertIn('immutable', full['Cache-Control'])
+
+        part = self.client.get(self.url, headers={'Range': 'bytes=100-199'})
+        self.assertEqual(part.status_code, 206)
+        self.assertEqual(part['Content-Range'], f'bytes 100-199/{len(self.body)}')
+        self.assertEqual(b''.join(part.streaming_content), self.body[100:200])
+
+        tail = self.client.get(self.url, headers={'Range': 'bytes=-10'})
+        self.assertEqual(b''.join(tail.streaming_content), self.body[-10:])
+        self.assertEqual(self.client.get(self.url, headers={'Range': f'bytes={len(self.body)}-'}).status_code, 416)
+        self.assertEqual(self.client.get(self.url, headers={'If-None-Match': full['ETag']}).status_code, 304)
+
+    async def test_asgi_streams_blocks(self):
+        client = AsyncClient()
+        full = await client.get(self.url)
+        self.assertTrue(full.is_async)
+        self.assertEqual(full['Content-Length'], str(len(self.body)))
+        chunks = [chunk async for chunk in full.streaming_content]
+        self.assertEqual(len(chunks), len(self.body) // media.BLOCK_SIZE)
+        self.assertEqual(b''.join(chunks), self.body)
+
+        part = await client.get(self.url, headers={'Range': 'bytes=100-199'})
+        self.assertEqual(part.status_code, 206)
+        self.assertEqual(b''.join([chunk async for chunk in part.streaming_content]), self.body[100:200])
+
+    def test_offload_to_front_server(self):
+        with override_settings(MEDIA_OFFLOAD='x-accel-redirect'):
+            response = self.client.get(self.url)
+        self.assertEqual(response['X-Accel-Redirect'], '/protected-media/' + self.publication.file.name)
+        self.assertEqual(response.content, b'')
+        self.assertEqual(self.client.get('/media/../settings.py').status_code, 404)
+
+
+class StaticAssetTests(TestCase):
+    def render_image(self):
+        template = Template("{% load static_assets %}{% responsive_image 'images/img 2.jpg' alt='Slide' sizes='50vw' %}")
+        return template.render(Context())
+
+    def test_responsive_image(self):
+        with mock.patch.object(assets, 'image_variants', return_value={}):
+            html = self.render_image()
+        self.assertIn('src="/static/images/img%202.jpg"', html)
+        self.assertNotIn('srcset', html)
+
+        manifest = {'images/img 2.jpg': {'width': 4000, 'height': 3000, 'variants': {
+            'webp': [[320, 'build/images/img-2-320.webp'], [960, 'build/images/img-2-960.webp']],
+            'jpeg': [[320, 'build/images/img-2-320.jpg'], [960, 'build/images/img-2-960.jpg']],
+        }}}
+        with mock.patch.object(assets, 'image_variants', return_value=manifest):
+            html = self.render_image()
+        self.assertIn('<source type="image/webp" srcset="/static/build/images/img-2-320.webp 320w, '
+                      '/static/build/images/img-2-960.webp 960w" sizes="50vw">', html)
+        self.assertIn('src="/static/build/images/img-2-960.jpg"', html)
+        self.assertIn('width="4000" height="3000" loading="lazy"', html)
+
+    def test_collected_files_are_hashed_compressed_and_served(self):
+        source, root = tempfile.TemporaryDirectory(), tempfile.TemporaryDirectory()
+        self.addCleanup(source.cleanup)
+        self.addCleanup(root.cleanup)
+        os.makedirs(os.path.join(source.name, 'css'))
+        with open(os.path.join(source.name, 'css', 'site.css'), 'w') as f:
+            f.write('body { color: #123456; }\n' * 200)
+        storages = {**settings.STORAGES, 'staticfiles': {'BACKEND': 'hospitalapp.assets.CompressedManifestStorage'}}
+        with override_settings(STATIC_ROOT=root.name, STATICFILES_DIRS=[source.name], STORAGES=storages,
+                               STATICFILES_FINDERS=['django.contrib.staticfiles.finders.FileSystemFinder']):
+            call_command('collectstatic', interactive=False, verbosity=0)
+            from django.contrib.staticfiles.storage import staticfiles_storage
+            name = staticfiles_storage.stored_name('css/site.css')
+            self.assertRegex(name, r'^css/site\.[0-9a-f]{12}\.css$')
+
+            factory = RequestFactory()
+            response = assets.serve_static(factory.get('/', headers={'Accept-Encoding': 'gzip, deflate'}), name)
+            self.assertEqual(response['Content-Encoding'], 'gzip')
+            self.assertEqual(response['Content-Type'], 'text/css')
+            self.assertIn('immutable', response['Cache-Control'])
+            self.assertIn('Accept-Encoding', response['Vary'])
+            body = gzip.decompress(b''.join(response.streaming_content))
+            self.assertTrue(body.startswith(b'body { color: #123456; }'))
+
+            plain = assets.serve_static(factory.get('/'), 'css/site.css')
+            self.assertFalse(plain.has_header('Content-Encoding'))
+            self.assertNotIn('immutable', plain['Cache-Control'])
+            revalidate = factory.get('/', headers={'Accept-Encoding': 'gzip', 'If-None-Match': response['ETag']})
+            self.assertEqual(assets.serve_static(revalidate, name).status_code, 304)
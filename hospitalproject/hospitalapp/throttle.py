@@ -0,0 +1,141 @@
+import hashlib
+import math
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+
+
+# --- Login throttling ---
+# Login attempts are counted per client IP and per username in the cache.
+# Each counter is a sliding window of LOGIN_THROTTLE_WINDOW seconds, made of
+# two fixed buckets: the current bucket plus a share of the previous one,
+# weighted by how much of the previous bucket still overlaps the window.
+#
+# login_view calls reserve() before authenticate(). It refuses the attempt
+# when a counter is at its limit, so a credential-stuffing burst costs a
+# cache read per request instead of a hash. Otherwise it counts the attempt
+# right away with incr(), before the password is hashed, so a concurrent
+# burst cannot slip past the limit while its failures are still being
+# checked; an attempt whose incr() lands past the limit is taken back and
+# refused. succeeded() takes a correct password's attempt back off the IP
+# counter and clears the username's counter. It does not clear the IP
+# counter, so an attacker holding one valid account cannot use it to reset
+# their address.
+#
+# The username limit only holds back addresses that have attempts of their
+# own in the window. Otherwise anyone who knows a username could lock its
+# owner out by spending the limit from elsewhere; the owner, logging in
+# from a clean address, still gets through. A limit of 0 turns that scope
+# off. The client IP is REMOTE_ADDR, so behind a proxy the front server
+# must pass the real client address.
+
+KEY_PREFIX = 'login-throttle'
+
+
+def _cache():
+    return caches[getattr(settings, 'LOGIN_THROTTLE_CACHE_ALIAS', 'default')]
+
+
+def _window():
+    return getattr(settings, 'LOGIN_THROTTLE_WINDOW', 300)
+
+
+def _scopes(request, username):
+    # (key, limit) for each counter that applies to this attempt.
+    scopes = []
+    ip_limit = getattr(settings, 'LOGIN_THROTTLE_PER_IP', 0)
+    if ip_limit:
+        scopes.append((f"ip:{request.META.get('REMOTE_ADDR', '')}", ip_limit))
+    username_limit = getattr(settings, 'LOGIN_THROTTLE_PER_USERNAME', 0)
+    username = (username or '').strip().lower()
+    if username_limit and username:
+        # Hashed so any username makes a valid cache key.
+        scopes.append((f'user:{hashlib.md5(username.encode()).hexdigest()}', username_limit))
+    return scopes
+
+
+def _buckets(key, now, window):
+    current = int(now // window)
+    return f'{KEY_PREFIX}:{key}:{current}', f'{KEY_PREFIX}:{key}:{current - 1}'
+
+
+def _wait(current, previous, limit, elapsed, window):
+    # Seconds until the counter is below ``limit`` again, or 0 if it is now.
+    if current + previous * (1 - elapsed) < limit:
+        return 0
+    if current >= limit:
+        # Blocked at least until the current bucket becomes the previous one.
+        wait = (1 - elapsed) * window
+    else:
+        # Until the previous bucket's share drops below what is left.
+        wait = (1 - (limit - current) / previous - elapsed) * window
+    return max(1, math.ceil(wait))
+
+
+def _incr(cache, key, window):
+    # Kept for two windows: one as the current bucket, one as the previous.
+    cache.add(key, 0, window * 2)
+    try:
+        return cache.incr(key)
+    except ValueError:
+        # Expired between add() and incr().
+        cache.set(key, 1, window * 2)
+        return 1
+
+
+def _decr(cache, key):
+    try:
+        if cache.get(key, 0) > 0:
+            cache.decr(key)
+    except ValueError:
+        pass
+
+
+def reserve(request, username):
+    # Counts this attempt and returns 0, or returns the seconds to wait
+    # without counting it.
+    scopes = _scopes(request, username)
+    if not scopes:
+        return 0
+    cache, window, now = _cache(), _window(), time.time()
+    elapsed = now % window / window
+    buckets = [_buckets(key, now, window) for key, _ in scopes]
+    counts = cache.get_many([name for pair in buckets for name in pair])
+
+    checked, user_wait, address_used = [], 0, False
+    for (key, limit), (current_key, previous_key) in zip(scopes, buckets):
+        current, previous = counts.get(current_key, 0), counts.get(previous_key, 0)
+        wait = _wait(current, previous, limit, elapsed, window)
+        if key.startswith('ip:'):
+            if wait:
+                return wait
+            address_used = current + previous > 0
+            checked.append((current_key, previous, limit))
+        elif wait:
+            user_wait = wait
+        else:
+            checked.append((current_key, previous, limit))
+    if user_wait and (address_used or len(scopes) == 1):
+        return user_wait
+
+    reserved = {current_key: _incr(cache, current_key, window) for current_key, _ in buckets}
+    for current_key, previous, limit in checked:
+        # Concurrent attempts took the last places before this one.
+        before = reserved[current_key] - 1
+        if before + previous * (1 - elapsed) >= limit:
+            for name in reserved:
+                _decr(cache, name)
+            return _wait(before, previous, limit, elapsed, window)
+    return 0
+
+
+def succeeded(request, username):
+    # The password was right: the attempt is not held against the address,
+    # and the username starts over.
+    cache, window, now = _cache(), _window(), time.time()
+    for key, _ in _scopes(request, username):
+        if key.startswith('ip:'):
+            _decr(cache, _buckets(key, now, window)[0])
+        else:
+            cache.delete_many(_buckets(key, now, window))
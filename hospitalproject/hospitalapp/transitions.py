@@ -0,0 +1,125 @@
+from django.db import transaction
+
+from .models import Appointment, MedicalHistory
+from .outbox import queue_emails
+from .signals import appointments_updated, medical_histories_created
+from .slots import release_slots
+
+
+# --- Appointment status transitions ---
+# Every status change goes through transition(), which takes any number of
+# appointments and applies one target status to all of them in a single
+# transaction:
+#   - lock the rows (SELECT ... FOR UPDATE) and load them
+#   - one bulk_update for the status
+#   - one UPDATE to free the slots of declined appointments
+#   - one bulk_create for the histories of completed ones
+#   - one INSERT for the notification emails
+# Counters, rollups and caches are then updated once per batch.
+#
+# Transitions are idempotent. An appointment already in the target status
+# counts as unchanged, and a completed appointment gets at most one
+# MedicalHistory, enforced by the unique constraint on
+# MedicalHistory.appointment.
+
+TRANSITIONS = {
+    'Pending': {'Confirmed', 'Declined'},
+    'Confirmed': {'Completed', 'Declined'},
+    'Declined': set(),
+    'Completed': set(),
+}
+TARGET_STATUSES = ['Confirmed', 'Declined', 'Completed']
+MAX_BATCH = 200
+
+
+class TransitionResult:
+    def __init__(self, status):
+        self.status = status
+        self.changed = []       # appointments moved to ``status``
+        self.unchanged = []     # already in ``status``
+        self.rejected = []      # in a status that cannot move to ``status``
+        self.missing = []       # ids not found, or not the caller's
+
+    def summary(self):
+        parts = [f'{len(self.changed)} appointment(s) marked {self.status}']
+        if self.unchanged:
+            parts.append(f'{len(self.unchanged)} already {self.status}')
+        if self.rejected:
+            parts.append(f'{len(self.rejected)} cannot be {self.status.lower()} from their current status')
+        if self.missing:
+            parts.append(f'{len(self.missing)} not found')
+        return '; '.join(parts) + '.'
+
+
+def can_transition(current, status):
+    return status in TRANSITIONS.get(current, ())
+
+
+def _history_for(appointment):
+    return MedicalHistory(
+        appointment=appointment,
+        patient_id=appointment.patient_id,
+        doctor_id=appointment.doctor_id,
+        diagnosis=f'Consultation with Dr. {appointment.doctor.full_name}',
+        treatment_history='Completed consultation',
+        medications='Prescribed during consultation',
+        allergies='None reported',
+        date=appointment.date,
+    )
+
+
+def _notification(appointment):
+    email = appointment.patient.user.email
+    if not email:
+        return None
+    return (
+        f"Your appointment on {appointment.date} is {appointment.status.lower()}",
+        (f"Dear {appointment.patient.full_name},\n\n"
+         f"Your appointment with Dr. {appointment.doctor.full_name} on {appointment.date} "
+         f"at {appointment.time} is now {appointment.status}.\n"),
+        [email],
+    )
+
+
+def transition(appointment_ids, status, doctor=None):
+    # ``doctor`` limits the change to that doctor's appointments.
+    if status not in TARGET_STATUSES:
+        raise ValueError(f'Unknown target status: {status}')
+    ids = list(dict.fromkeys(int(pk) for pk in appointment_ids))[:MAX_BATCH]
+    result = TransitionResult(status)
+
+    with transaction.atomic():
+        # Lock the appointment rows only (in id order, so concurrent batches
+        # do not deadlock), then load them with their patients and doctors.
+        locked = Appointment.objects.select_for_update().filter(id__in=ids)
+        if doctor is not None:
+            locked = locked.filter(doctor=doctor)
+        locked_ids = list(locked.order_by('id').values_list('id', flat=True))
+        found = Appointment.objects.select_related('patient__user', 'doctor').in_bulk(locked_ids)
+        for pk in ids:
+            appointment = found.get(pk)
+            if appointment is None:
+                result.missing.append(pk)
+            elif appointment.status == status:
+                result.unchanged.append(appointment)
+            elif can_transition(appointment.status, status):
+                appointment.status = status
+                result.changed.append(appointment)
+            else:
+                result.rejected.append(appointment)
+
+        if not result.changed:
+            return result
+        Appointment.objects.bulk_update(result.changed, ['status'])
+        appointments_updated(result.changed)
+
+        if status == 'Declined':
+            # A declined appointment gives its slot back to the inventory.
+            release_slots(result.changed)
+        elif status == 'Completed':
+            MedicalHistory.objects.bulk_create([_history_for(a) for a in result.changed], ignore_conflicts=True)
+            # ignore_conflicts leaves the primary keys unset on some databases; read the rows back.
+            medical_histories_created(list(MedicalHistory.objects.filter(appointment__in=result.changed)))
+
+        queue_emails(filter(None, (_notification(a) for a in result.changed)))
+    return result
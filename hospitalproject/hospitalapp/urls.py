@@ -1,3 +1,4 @@
+from django.conf import settings
 from django.urls import path
 from . import views
 
@@ -11,10 +12,15 @@ urlpatterns = [
     path('patient/', views.patient_dashboard, name='patient_dashboard'),
     path('doctor/', views.doctor_dashboard, name='doctor_dashboard'),
     path('useradmin/', views.admin_dashboard, name='admin_dashboard'),
+    path('useradmin/cache-stats/', views.cache_stats, name='cache_stats'),
+    path('useradmin/request-stats/', views.request_stats, name='request_stats'),
+    path('metrics', views.prometheus_metrics, name='metrics'),
     path('manage-users/', views.manage_users, name='manage_users'),
     path('manage-facilities/', views.manage_facilities, name='manage_facilities'),
     path('manage-appointments/', views.manage_appointments, name='manage_appointments'),
     path('create-user/', views.create_user, name='create_user'),
+    path('useradmin/import-users/', views.import_users, name='import_users'),
+    path('useradmin/export/<str:dataset>/', views.export_records, name='export_records'),
     path('useradmin/facility/add/', views.add_facility, name='add_facility'),
     path('useradmin/edit/<int:user_id>/', views.edit_user, name='edit_user'),
     path('useradmin/delete/<int:user_id>/', views.delete_user, name='delete_user'),
@@ -22,9 +28,11 @@ urlpatterns = [
     path('facilities/delete/<int:id>/', views.delete_facility, name='delete_facility'),
     path('logout/',views.logout_view, name='logout'),
     path('book-appointment/', views.book_appointment, name='book_appointments'),
+    path('api/availability/', views.availability_search, name='availability_search'),
     path('doctors/', views.doctor_list, name='doctor_list'),
     path('patient-management/', views.patient_management, name='patient_management'),
     path('appointments/<int:appointment_id>/update-status/', views.update_appointment_status, name='update_appointment_status'),
+    path('appointments/update-status/', views.bulk_update_appointment_status, name='bulk_update_appointment_status'),
     path('prescribe/', views.prescribe, name='prescribe'),
     path('view-patient/<int:patient_id>/', views.view_patient, name='view_patient'),
     path('edit-patient/<int:patient_id>/', views.edit_patient, name='edit_patient'),
@@ -37,6 +45,7 @@ urlpatterns = [
     path('doctor/create_bill/<int:patient_id>/', views.create_bill, name='create_bill'),
     path('patient/view_bill/<int:bill_id>/', views.view_bills, name='view_bill'),
     path('patient/pay_bill/<int:bill_id>/', views.pay_bill, name='pay_bill'),
+    path('stripe/webhook/', views.stripe_webhook, name='stripe_webhook'),
     path('user-admin/resources/', views.manage_resources, name='manage_resources'),
     path('user-admin/resources/add/', views.add_resource, name='add_resource'),
     path('user-admin/resources/edit/<int:resource_id>/', views.edit_resource, name='edit_resource'),
@@ -48,5 +57,9 @@ urlpatterns = [
     path('health-bulletin/', views.health_bulletin, name='health_bulletin'),
     path('medical-research/', views.medical_research, name='medical_research'),
     path('publications/', views.publications, name='publications'),
+    path('media/<path:name>', views.media_file, name='media_file'),
 
 ]
+
+if settings.SERVE_STATIC:
+    urlpatterns.append(path(settings.STATIC_URL.lstrip('/') + '<path:path>', views.static_file, name='static_file'))
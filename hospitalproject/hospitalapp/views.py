@@ -1,27 +1,52 @@
+import datetime
+import math
+
 import stripe
+from asgiref.sync import sync_to_async
 from django.contrib import messages
 from django.contrib.auth import get_user_model, authenticate, login, logout
-from django.core.mail import send_mail
-from django.http import HttpResponse
+from django.http import Http404, HttpResponse, JsonResponse, StreamingHttpResponse
 from django.shortcuts import render, redirect, get_object_or_404
+from django.urls import reverse
+from django.template.loader import render_to_string
+from django.utils import timezone
 from django.views.decorators.csrf import csrf_exempt
-from django.views.decorators.http import require_POST
+from django.views.decorators.http import require_POST, require_safe
 from django.contrib.auth.decorators import login_required
-from functools import wraps
-from django.core.exceptions import ObjectDoesNotExist
+from django.core.handlers.asgi import ASGIRequest
+from functools import partial, wraps
+from django.core.exceptions import PermissionDenied
 
 from django.conf import settings
 from hospitalproject import settings
 from .models import Facility, DoctorProfile, PatientProfile, Appointment, MedicalHistory, Bill, HealthEducationResource, \
-    AdminProfile, CustomUser, Prescription, Announcement, HealthBulletin, MedicalResearch, Publication
+    AdminProfile, CustomUser, Prescription, Announcement, HealthBulletin, MedicalResearch, Publication, ImportJob
 from .forms import (
     UserRegisterForm, UserCreationForm,
     PatientProfileForm, DoctorProfileForm,
 
     AdminUserCreationForm, CustomUserChangeForm,
     FacilityForm, PrescriptionForm, BillingForm, HealthEducationResourceForm,
-    AdminCreationForm
+    AdminCreationForm, AppointmentFilterForm, UserGridForm, UserImportForm
+)
+from .exporter import CONTENT_TYPES, DATASETS, aiter_export, export_filename, iter_export
+from .importer import queue_import
+from .loaders import doctor_loader
+from .asyncdb import gather_reads
+from .availability import index as availability_index
+from .fragments import get_fragment, set_fragment, fragment_stats
+from . import assets, instrumentation, media, metrics, profiles, rollups, throttle, transitions
+from .outbox import queue_email
+from .routers import replica_reads
+from .payments import construct_event, get_checkout_session_id, handle_event
+from .pagecache import cached_page
+from .principal import Principal, load_user
+from .pagination import (
+    FEED_PAGE_SIZE, akeyset_paginate, approximate_count, asection_page, page_number, section_page,
+    sorted_keyset_paginate,
 )
+from .search import search_patients
+from .slots import SlotUnavailable, reserve_slot
 
 User = get_user_model()
 
@@ -30,13 +55,57 @@ def admin_required(view_func):
     @wraps(view_func)
     @login_required
     def _wrapped_view(request, *args, **kwargs):
-        if not request.user.is_admin:
+        if not request.principal.is_admin:
             messages.error(request, "Admins only.")
             return redirect('login')
         return view_func(request, *args, **kwargs)
     return _wrapped_view
 
 
+def clinician_required(view_func):
+    # Doctors and admins; patient records are not for patients or visitors.
+    @wraps(view_func)
+    @login_required
+    def _wrapped_view(request, *args, **kwargs):
+        if not (request.principal.is_doctor or request.principal.is_admin):
+            messages.error(request, "Doctors and admins only.")
+            return redirect('login')
+        return view_func(request, *args, **kwargs)
+    return _wrapped_view
+
+
+async def current_user(request):
+    # Context processors read request.user, not request.auser(); hand them
+    # the user the async view already loaded instead of loading it again.
+    user = await request.auser()
+    request.user = user
+    return user
+
+
+async def current_principal(request):
+    # request.principal is built from request.user, so load that first.
+    # Sessions from plain ModelBackend carry a user without its profiles,
+    # which would lazy-load on the event loop; reload it the way
+    # CachedModelBackend does (a cache hit for its own sessions).
+    user = await current_user(request)
+    if user.is_authenticated:
+        request.user = await sync_to_async(load_user)(user.pk) or user
+    return request.principal
+
+
+async def arender(request, template_name, context=None):
+    # Context processors and lazy template lookups may touch the database.
+    return await sync_to_async(render)(request, template_name, context)
+
+
+async def afeed_page(request, queryset):
+    # A page past the last one is a 404, which the page cache never stores.
+    page = await asection_page(queryset, page_number(request, 'page'), 'page', FEED_PAGE_SIZE)
+    if page.number > 1 and not page.items:
+        raise Http404("No such page.")
+    return page
+
+
 # --- Views ---
 
 def home(request):
@@ -167,50 +236,76 @@ def create_admin(request):
 
 def login_view(request):
     if request.method == "POST":
-        username = request.POST.get('username')
+        username = request.POST.get('username', '')
         password = request.POST.get('password')
+        # Reserved before authenticate() so throttled attempts never hash a password.
+        wait = throttle.reserve(request, username)
+        if wait:
+            messages.error(request, f"Too many login attempts. Try again in {math.ceil(wait / 60)} minute(s).")
+            response = render(request, 'login/login.html', status=429)
+            response['Retry-After'] = str(wait)
+            return response
         user = authenticate(request, username=username, password=password)
         if user is not None:
-            login(request, user)
-            if user.is_admin:
-                return redirect('admin_dashboard')
-            elif user.is_doctor:
-                return redirect('doctor_dashboard')
-            elif user.is_patient:
-                return redirect('patient_dashboard')
-            else:
+            throttle.succeeded(request, username)
+            dashboard = Principal(user).dashboard
+            if dashboard is None:
                 messages.error(request, "User role undefined.")
-                logout(request)
                 return redirect('login')
+            login(request, user)
+            return redirect(dashboard)
         else:
             messages.error(request, "Invalid credentials")
     return render(request, 'login/login.html')
 
 
 @login_required
-def patient_dashboard(request):
-    try:
-        patient = PatientProfile.objects.get(user=request.user)
-    except PatientProfile.DoesNotExist:
-        return render(request, 'patient_dashboard.html', {'error': 'Patient profile not found.'})
-
-    # Fetch related data
-    appointments = Appointment.objects.filter(patient=patient).order_by('-date')
-    medical_history = MedicalHistory.objects.filter(patient=patient).order_by('-date')
-    prescriptions = Prescription.objects.filter(patient=patient).order_by('-date_issued')
-    bills = Bill.objects.filter(patient=patient).order_by('-date')
-    resources = HealthEducationResource.objects.all()
-
-    context = {
-        'patient': patient,
-        'appointments': appointments,
-        'medical_history': medical_history,
-        'prescriptions': prescriptions,
-        'bills': bills,
-        'resources': resources,
+@replica_reads
+async def patient_dashboard(request):
+    patient = (await current_principal(request)).patient
+    if patient is None:
+        return await arender(request, 'patient_dashboard.html', {'error': 'Patient profile not found.'})
+
+    # Sections are rendered from the fragment cache; the sections that miss
+    # are queried in parallel, and doctors for all of them are loaded in one
+    # query.
+    section_querysets = {
+        'appointments': Appointment.objects.filter(patient=patient).order_by('-date', '-time', '-id'),
+        'medical_history': MedicalHistory.objects.filter(patient=patient).order_by('-date', '-id'),
+        'prescriptions': Prescription.objects.filter(patient=patient).order_by('-date_issued', '-id'),
+        'bills': Bill.objects.filter(patient=patient).order_by('-date', '-id'),
+        'resources': HealthEducationResource.objects.order_by('-created_at', '-id'),
     }
+    numbers = {name: page_number(request, f'{name}_page') for name in section_querysets}
+
+    def lookup():
+        return {
+            name: get_fragment('global' if name == 'resources' else f'patient:{patient.id}', name, number)
+            for name, number in numbers.items()
+        }
+
+    fragments = await sync_to_async(lookup)()
+    sections = {name: html for name, (_, html) in fragments.items()}
+    misses = [name for name, html in sections.items() if html is None]
+    pages = await gather_reads(*(
+        partial(section_page, section_querysets[name], numbers[name], f'{name}_page') for name in misses
+    ))
+
+    def finish():
+        doctors = doctor_loader()
+        for name, page in zip(misses, pages):
+            if name not in ('bills', 'resources'):
+                doctors.add(page.items)
+        doctors.load()
+        for name, page in zip(misses, pages):
+            html = render_to_string(f'patient/sections/{name}.html', {name: page})
+            sections[name] = set_fragment(fragments[name][0], html)
+        return render(request, 'patient/patient_dashboard.html', {
+            'patient': patient,
+            'sections': sections,
+        })
 
-    return render(request, 'patient/patient_dashboard.html', context)
+    return await sync_to_async(finish)()
 
 @login_required
 def doctor_dashboard(request):
@@ -218,29 +313,80 @@ def doctor_dashboard(request):
 
 
 @admin_required
+@replica_reads
 def admin_dashboard(request):
-    return render(request, 'admin/dashboard.html')
+    return render(request, 'admin/dashboard.html', {'analytics': rollups.dashboard()})
 
 
 @admin_required
-def manage_users(request):
-    users = CustomUser.objects.select_related(
-        'patientprofile', 'doctorprofile', 'adminprofile'
-    ).all()
+def cache_stats(request):
+    return JsonResponse({'dashboard_fragments': fragment_stats()})
+
+
+@admin_required
+def request_stats(request):
+    return JsonResponse({'views': instrumentation.request_stats()})
+
+
+def prometheus_metrics(request):
+    if not metrics.authorized(request):
+        return HttpResponse(status=401)
+    return HttpResponse(metrics.render_metrics(), content_type=metrics.CONTENT_TYPE)
 
-    return render(request, 'admin/manage_users.html', {'users': users})
+
+USER_GRID_COLUMNS = ('id', 'username', 'display_name', 'email', 'role', 'date_joined', 'profile_age')
+USER_GRID_PROFILE_COLUMNS = ('age', 'gender', 'phone', 'address')
+
+
+@admin_required
+@replica_reads
+def manage_users(request):
+    # One page of users read from the user table alone (see profiles.py),
+    # plus the profile columns for just that page.
+    grid = UserGridForm(request.GET)
+    users = grid.filter(CustomUser.objects.values(*USER_GRID_COLUMNS))
+    total = approximate_count(users, grid.is_filtered)
+    users, key, descending = grid.order(users)
+    page = sorted_keyset_paginate(users, request, key, descending)
+    profiles.attach_profiles(page.items, USER_GRID_PROFILE_COLUMNS)
+
+    current = grid.value('sort') or '-joined'
+    sort_links = {}
+    for field in ('name', 'age', 'joined'):
+        params = request.GET.copy()
+        params.pop('cursor', None)
+        params['sort'] = field if current == f'-{field}' else f'-{field}' if current == field else field
+        sort_links[field] = params.urlencode()
+
+    return render(request, 'admin/manage_users.html', {
+        'users': page,
+        'page': page,
+        'grid': grid,
+        'total': total,
+        'sort': current,
+        'sort_links': sort_links,
+    })
 
 
 @admin_required
+@replica_reads
 def manage_facilities(request):
     facilities = Facility.objects.all()
     return render(request, 'admin/manage_facilities.html', {'facilities': facilities})
 
 
 @login_required
-def manage_appointments(request):
-    appointments = Appointment.objects.select_related('patient', 'doctor').all().order_by('-date', '-time')
-    return render(request, 'admin/admin_appointments.html', {'appointments': appointments})
+@replica_reads
+async def manage_appointments(request):
+    await current_user(request)
+    filter_form = AppointmentFilterForm(request.GET)
+    appointments = filter_form.filter(Appointment.objects.select_related('patient', 'doctor'))
+    page = await akeyset_paginate(appointments, request)
+    return await arender(request, 'admin/admin_appointments.html', {
+        'appointments': page,
+        'page': page,
+        'filter_form': filter_form,
+    })
 
 
 @admin_required
@@ -302,6 +448,41 @@ def create_user(request):
 
     return render(request, 'admin/user_create.html', {'form': form})
 
+@admin_required
+def import_users(request):
+    # Only queues the file; the import worker (manage.py run_queued_imports) runs it.
+    if request.method == 'POST':
+        form = UserImportForm(request.POST, request.FILES)
+        if form.is_valid():
+            upload = form.cleaned_data['file']
+            job, queued = queue_import(upload.file, upload.name, form.cleaned_data['format'])
+            if queued:
+                messages.success(request, f'{upload.name} is queued for import.')
+            elif job.status == 'completed':
+                messages.info(request, f'{upload.name} was already imported.')
+            else:
+                messages.info(request, f'{upload.name} is already being imported.')
+            return redirect('import_users')
+    else:
+        form = UserImportForm()
+
+    jobs = ImportJob.objects.order_by('-started_at')[:10]
+    return render(request, 'admin/import_users.html', {'form': form, 'jobs': jobs})
+
+@admin_required
+def export_records(request, dataset):
+    fmt = request.GET.get('format', 'csv')
+    if dataset not in DATASETS or fmt not in CONTENT_TYPES:
+        raise Http404("Unknown export.")
+    compress = request.GET.get('gzip') == '1'
+
+    content_type = 'application/gzip' if compress else CONTENT_TYPES[fmt]
+    # ASGI buffers synchronous iterators whole; give it an async one.
+    chunks = (aiter_export if isinstance(request, ASGIRequest) else iter_export)(dataset, fmt, compress)
+    response = StreamingHttpResponse(chunks, content_type=content_type)
+    response['Content-Disposition'] = f'attachment; filename="{export_filename(dataset, fmt, compress)}"'
+    return response
+
 @admin_required
 def edit_user(request, user_id):
     user = get_object_or_404(User, id=user_id)
@@ -373,27 +554,28 @@ def logout_view(request):
 @login_required
 def book_appointment(request):
     if request.method == 'POST':
-        try:
-            patient_profile = request.user.patientprofile
-        except ObjectDoesNotExist:
+        patient_profile = request.principal.patient
+        if patient_profile is None:
             messages.error(request, "Patient profile not found. Please contact support.")
             return redirect('patient_dashboard')
 
         doctor_id = request.POST.get('doctor')
-        appointment_date = request.POST.get('appointment_date')
-        appointment_time = request.POST.get('appointment_time')
         reason = request.POST.get('reason')
 
         doctor = get_object_or_404(DoctorProfile, id=doctor_id)
 
-        Appointment.objects.create(
-            patient=patient_profile,
-            doctor=doctor,
-            date=appointment_date,
-            time=appointment_time,
-            reason=reason,
-            status='Pending'
-        )
+        try:
+            appointment_date = datetime.date.fromisoformat(request.POST.get('appointment_date', ''))
+            appointment_time = datetime.time.fromisoformat(request.POST.get('appointment_time', ''))
+        except ValueError:
+            messages.error(request, "Please enter a valid date and time.")
+            return redirect('book_appointments')
+
+        try:
+            reserve_slot(patient_profile, doctor, appointment_date, appointment_time, reason)
+        except SlotUnavailable as e:
+            messages.error(request, str(e))
+            return redirect('book_appointments')
 
         messages.success(request, "Appointment booked successfully.")
         return redirect('patient_dashboard')
@@ -403,15 +585,47 @@ def book_appointment(request):
 
 
 @login_required
+def availability_search(request):
+    specialization = request.GET.get('specialization', '').strip()
+    if not specialization:
+        return JsonResponse({'error': 'specialization is required.'}, status=400)
+
+    today = timezone.localdate()
+    try:
+        start = datetime.date.fromisoformat(request.GET['start']) if request.GET.get('start') else today
+        days = min(max(int(request.GET.get('days', 14)), 1), 90)
+        limit = min(max(int(request.GET.get('limit', 10)), 1), 100)
+    except ValueError:
+        return JsonResponse({'error': 'Invalid start, days or limit.'}, status=400)
+    start = max(start, today)
+
+    slots = availability_index.earliest_free(specialization, start, days, limit)
+    return JsonResponse({
+        'specialization': specialization,
+        'slots': [
+            {'doctor_id': doctor_id, 'doctor': name, 'date': date.isoformat(), 'time': slot_time.strftime('%H:%M')}
+            for date, slot_time, doctor_id, name in slots
+        ],
+    })
+
+
+@login_required
+@replica_reads
 def doctor_list(request):
     doctors = DoctorProfile.objects.all()
     return render(request, 'doctor/doctor_list.html', {'doctors': doctors})
 
 
 # View for patient management
+@clinician_required
+@replica_reads
 def patient_management(request):
-    patients = PatientProfile.objects.all()
-    return render(request, 'doctor/patient_management.html', {'patients': patients})
+    query = request.GET.get('q', '').strip()
+    if query:
+        patients = search_patients(query)
+    else:
+        patients = PatientProfile.objects.select_related('user')
+    return render(request, 'doctor/patient_management.html', {'patients': patients, 'query': query})
 
 
 # View for viewing a specific appointment
@@ -428,9 +642,8 @@ def prescribe(request):
             prescription = form.save(commit=False)
 
             # Get doctor profile from the logged-in user
-            try:
-                doctor_profile = request.user.doctorprofile
-            except DoctorProfile.DoesNotExist:
+            doctor_profile = request.principal.doctor
+            if doctor_profile is None:
                 messages.error(request, "You are not authorized to prescribe.")
                 return redirect('dashboard')  # or another safe page
 
@@ -493,17 +706,21 @@ def edit_patient(request, patient_id):
 
 
 @login_required
-def doctor_appointments(request):
-    try:
-        doctor = request.user.doctorprofile
-    except ObjectDoesNotExist:
-        return render(request, 'error.html', {
+@replica_reads
+async def doctor_appointments(request):
+    doctor = (await current_principal(request)).doctor
+    if doctor is None:
+        return await arender(request, 'error.html', {
             'message': 'Doctor profile not found. Please contact admin.'
         })
 
-    appointments = Appointment.objects.filter(doctor=doctor).order_by('-date')
-    return render(request, 'doctor/appointments.html', {
-        'appointments': appointments
+    filter_form = AppointmentFilterForm(request.GET)
+    appointments = filter_form.filter(Appointment.objects.select_related('patient'))
+    page = await akeyset_paginate(appointments.filter(doctor=doctor), request)
+    return await arender(request, 'doctor/appointments.html', {
+        'appointments': page,
+        'page': page,
+        'filter_form': filter_form,
     })
 
 @login_required
@@ -513,13 +730,13 @@ def view_medical_history(request, pk):
 
 
 @login_required
+@replica_reads
 def view_bills(request,bill_id):
-    try:
-        patient = request.user.patientprofile
-    except:
+    patient = request.principal.patient
+    if patient is None:
         return render(request, 'error.html', {'message': 'Only patients can view bills.'})
 
-    bills = Bill.objects.filter(patient=patient).order_by('-date')
+    bills = Bill.objects.filter(patient=patient).order_by('-date', '-id')
 
     return render(request, 'patient/view_bills.html', {'bills': bills})
 
@@ -528,27 +745,45 @@ def education_view(request):
 
 
 
+def _transition_scope(principal):
+    # Admins may change any appointment, doctors only their own.
+    if principal.is_admin:
+        return None
+    if principal.doctor is None:
+        raise PermissionDenied
+    return principal.doctor
+
+
+def _apply_transition(request, appointment_ids):
+    status = request.POST.get('status')
+    if status not in transitions.TARGET_STATUSES:
+        messages.error(request, "Unknown status.")
+        return redirect('doctor_appointments')
+    result = transitions.transition(appointment_ids, status, _transition_scope(request.principal))
+    if result.rejected or result.missing:
+        messages.warning(request, result.summary())
+    else:
+        messages.success(request, result.summary())
+    return redirect('doctor_appointments')
+
+
+@login_required
 @require_POST
 def update_appointment_status(request, appointment_id):
-    appointment = get_object_or_404(Appointment, id=appointment_id)
-    new_status = request.POST.get('status')
-
-    if new_status in ['Confirmed', 'Declined', 'Completed']:
-        appointment.status = new_status
-        appointment.save()
-
-        # If marked as Completed, create MedicalHistory record if not already added
-        if new_status == 'Completed':
-            MedicalHistory.objects.get_or_create(
-                patient=appointment.patient,
-                diagnosis=f' Dr. {appointment.doctor.user.get_full_name()}',
-                treatment_history='Completed consultation',
-                medications='Prescribed during consultation',
-                allergies='None reported',
-                defaults={'date': appointment.date}
-            )
+    return _apply_transition(request, [appointment_id])
 
-    return redirect('doctor_appointments')
+
+@login_required
+@require_POST
+def bulk_update_appointment_status(request):
+    try:
+        appointment_ids = [int(pk) for pk in request.POST.getlist('appointment_ids')]
+    except ValueError:
+        appointment_ids = []
+    if not appointment_ids:
+        messages.error(request, "Select at least one appointment.")
+        return redirect('doctor_appointments')
+    return _apply_transition(request, appointment_ids)
 
 
 @login_required
@@ -556,7 +791,7 @@ def delete_medical_history(request, record_id):
     record = get_object_or_404(MedicalHistory, id=record_id)
 
     # Optional: ensure only patient who owns the record can delete it
-    if record.patient.user != request.user:
+    if record.patient_id != request.principal.patient_id:
         messages.error(request, "You are not authorized to delete this record.")
         return redirect('patient_dashboard')
 
@@ -599,40 +834,44 @@ def create_bill(request, patient_id):
     })
 
 
-stripe.api_key = settings.STRIPE_SECRET_KEY
 @login_required
-def pay_bill(request, bill_id):
-    patient = request.user.patientprofile
-    bill = get_object_or_404(Bill, id=bill_id, patient=patient)
-
-    # Set your Stripe secret key
-    stripe.api_key = settings.STRIPE_SECRET_KEY
-
-    # Create a Stripe Checkout Session
-    session = stripe.checkout.Session.create(
-        payment_method_types=['card'],
-        line_items=[{
-            'price_data': {
-                'currency': 'inr',
-                'product_data': {
-                    'name': f'Bill Payment for {patient.user.get_full_name()}',
-                },
-                'unit_amount': int(bill.amount * 100),  # amount in paisa
-            },
-            'quantity': 1,
-        }],
-        mode='payment',
-        success_url=request.build_absolute_uri('/payment-success/'),
-        cancel_url=request.build_absolute_uri('/payment-cancelled/'),
+async def pay_bill(request, bill_id):
+    # Async so the outbound Stripe call does not hold a worker thread under ASGI.
+    principal = await current_principal(request)
+    try:
+        bill = await Bill.objects.select_related('patient__user').aget(id=bill_id, patient_id=principal.patient_id)
+    except Bill.DoesNotExist:
+        raise Http404("Bill not found.")
+
+    if bill.paid:
+        messages.info(request, "This bill has already been paid.")
+        return redirect('patient_dashboard')
+
+    session_id = await get_checkout_session_id(
+        bill,
+        success_url=request.build_absolute_uri(reverse('patient_dashboard')),
+        cancel_url=request.build_absolute_uri(reverse('patient_dashboard')),
     )
 
-    return render(request, 'stripe_checkout.html', {
-        'session_id': session.id,
+    return await arender(request, 'stripe_checkout.html', {
+        'session_id': session_id,
         'stripe_public_key': settings.STRIPE_PUBLISHABLE_KEY,
         'bill': bill,
     })
 
 
+@csrf_exempt
+@require_POST
+def stripe_webhook(request):
+    try:
+        event = construct_event(request.body, request.headers.get('Stripe-Signature', ''))
+    except (ValueError, stripe.SignatureVerificationError):
+        return HttpResponse(status=400)
+
+    handle_event(event)
+    return HttpResponse(status=200)
+
+
 def add_resource(request):
     if request.method == 'POST':
         form = HealthEducationResourceForm(request.POST)
@@ -644,6 +883,7 @@ def add_resource(request):
     return render(request, 'admin/add_resources.html', {'form': form})
 
 
+@replica_reads
 def manage_resources(request):
     resources = HealthEducationResource.objects.all()
     return render(request, 'admin/manage_resources.html', {'resources': resources})
@@ -671,6 +911,7 @@ def view_prescription(request, pk):
     return render(request, 'patient/view_prescription.html', {'prescription': prescription})
 
 
+@cached_page('about')
 def about_us(request):
     return render(request, 'home_data/about_us.html')
 
@@ -684,45 +925,53 @@ def contact_us(request):
         if not (name and email and message):
             messages.error(request, "All fields are required.")
         else:
-            # Optional: send an email or save to database
-            # Example email send:
-            try:
-                send_mail(
-                    subject=f"Contact Form from {name}",
-                    message=message,
-                    from_email=email,
-                    recipient_list=[settings.DEFAULT_FROM_EMAIL],  # Set in settings.py
-                    fail_silently=False,
-                )
-                messages.success(request, "Thank you for reaching out. We'll get back to you soon!")
-                return redirect('contact')
-            except Exception as e:
-                messages.error(request, f"Failed to send message: {e}")
+            # Queued, not sent inline; the send_queued_mail worker delivers it.
+            queue_email(
+                subject=f"Contact Form from {name}",
+                body=message,
+                from_email=email,
+                to=[settings.DEFAULT_FROM_EMAIL],  # Set in settings.py
+            )
+            messages.success(request, "Thank you for reaching out. We'll get back to you soon!")
+            return redirect('contact')
 
     return render(request, 'home_data/contact_us.html')
 
 
 
-def announcements(request):
-    announcements_list = Announcement.objects.order_by('-date')
-    return render(request, 'home_data/announcements.html', {'announcements': announcements_list})
-
+@cached_page('announcements')
+@replica_reads
+async def announcements(request):
+    page = await afeed_page(request, Announcement.objects.order_by('-date', '-id'))
+    return await arender(request, 'home_data/announcements.html', {'announcements': page})
 
 
+@cached_page('health_bulletin')
+@replica_reads
+async def health_bulletin(request):
+    page = await afeed_page(request, HealthBulletin.objects.order_by('-date', '-id'))
+    return await arender(request, 'home_data/health_bulletin.html', {'bulletins': page})
 
 
-def health_bulletin(request):
-    bulletins = HealthBulletin.objects.order_by('-date')
-    return render(request, 'home_data/health_bulletin.html', {'bulletins': bulletins})
+@cached_page('medical_research')
+@replica_reads
+async def medical_research(request):
+    page = await afeed_page(request, MedicalResearch.objects.order_by('-date', '-id'))
+    return await arender(request, 'home_data/medical_research.html', {'research_list': page})
 
 
+@cached_page('publications')
+@replica_reads
+async def publications(request):
+    page = await afeed_page(request, Publication.objects.order_by('-date', '-id'))
+    return await arender(request, 'home_data/publications.html', {'publications': page})
 
-def medical_research(request):
-    research_list = MedicalResearch.objects.order_by('-date')
-    return render(request, 'home_data/medical_research.html', {'research_list': research_list})
 
+@require_safe
+def media_file(request, name):
+    return media.serve(request, name)
 
 
-def publications(request):
-    publications = Publication.objects.order_by('-date')
-    return render(request, 'home_data/publications.html', {'publications': publications})
\ No newline at end of file
+@require_safe
+def static_file(request, path):
+    return assets.serve_static(request, path)
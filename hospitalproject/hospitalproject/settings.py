@@ -41,11 +41,14 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'hospitalapp.instrumentation.RequestProfileMiddleware',
+    'hospitalapp.routers.ReplicaPinMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'hospitalapp.principal.PrincipalMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -54,7 +57,8 @@ ROOT_URLCONF = 'hospitalproject.urls'
 
 TEMPLATES = [
     {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        # DjangoTemplates with render timing for the request profiler.
+        'BACKEND': 'hospitalapp.instrumentation.InstrumentedDjangoTemplates',
         'DIRS': [os.path.join(BASE_DIR, 'templates')],
         'APP_DIRS': True,
         'OPTIONS': {
@@ -81,9 +85,77 @@ DATABASES = {
         'PASSWORD': '',
         'HOST': 'localhost',
         'PORT': '3306',
+        # Persistent connections, checked before reuse in each request.
+        'CONN_MAX_AGE': int(os.environ.get('DB_CONN_MAX_AGE', 60)),
+        'CONN_HEALTH_CHECKS': True,
     }
 }
 
+# Read replicas: DATABASE_REPLICA_HOSTS=db-replica-1,db-replica-2 adds one
+# alias per host (replica1, replica2, ...) with the primary's credentials.
+# Views marked @replica_reads read from them (see hospitalapp/routers.py).
+# REPLICA_PIN_SECONDS is how long a browser keeps reading from the primary
+# after it writes; keep it above the usual replication lag.
+DATABASE_REPLICAS = []
+for _number, _host in enumerate(filter(None, os.environ.get('DATABASE_REPLICA_HOSTS', '').split(',')), 1):
+    DATABASES[f'replica{_number}'] = {**DATABASES['default'], 'HOST': _host.strip(), 'TEST': {'MIRROR': 'default'}}
+    DATABASE_REPLICAS.append(f'replica{_number}')
+
+DATABASE_ROUTERS = ['hospitalapp.routers.ReplicaRouter']
+REPLICA_PIN_SECONDS = int(os.environ.get('REPLICA_PIN_SECONDS', 5))
+
+
+
+# Caches
+# The dashboards cache holds rendered dashboard fragments. It defaults to an
+# in-process cache; point it at a shared backend in production, e.g.
+#   DASHBOARD_CACHE_BACKEND=django.core.cache.backends.redis.RedisCache
+#   DASHBOARD_CACHE_LOCATION=redis://127.0.0.1:6379/1
+# or django.core.cache.backends.filebased.FileBasedCache with a directory.
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'dashboards': {
+        'BACKEND': os.environ.get('DASHBOARD_CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.environ.get('DASHBOARD_CACHE_LOCATION', 'dashboards'),
+    },
+    'sessions': {
+        'BACKEND': os.environ.get('SESSION_CACHE_BACKEND', 'django.core.cache.backends.locmem.LocMemCache'),
+        'LOCATION': os.environ.get('SESSION_CACHE_LOCATION', 'sessions'),
+    },
+}
+
+DASHBOARD_CACHE_ALIAS = 'dashboards'
+
+
+# Sessions and authentication
+# SESSION_ENGINE=django.contrib.sessions.backends.cached_db reads sessions
+# from the sessions cache and writes them through to the database, which
+# saves a query on every logged-in request. Only use it with a sessions
+# cache shared by all workers (e.g. Redis); otherwise a logout in one worker
+# is not seen by the others.
+# CachedModelBackend keeps each user with their profiles in the dashboards
+# cache (see hospitalapp/principal.py). ModelBackend stays listed so
+# sessions created before it was added remain valid.
+
+SESSION_ENGINE = os.environ.get('SESSION_ENGINE', 'django.contrib.sessions.backends.db')
+SESSION_CACHE_ALIAS = 'sessions'
+
+AUTHENTICATION_BACKENDS = [
+    'hospitalapp.principal.CachedModelBackend',
+    'django.contrib.auth.backends.ModelBackend',
+]
+
+
+# Patient search backend: a MySQL FULLTEXT index over SearchDocument,
+# created by migrate (run `manage.py rebuild_search_index` once to index
+# rows that existed before search was added). The
+# in-process index (hospitalapp.search.InMemorySearchBackend) is per worker
+# and only sees its own worker's updates; test_settings uses it.
+
+SEARCH_BACKEND = os.environ.get('SEARCH_BACKEND', 'hospitalapp.search.MySQLFullTextBackend')
 
 
 # Password validation
@@ -104,6 +176,42 @@ AUTH_PASSWORD_VALIDATORS = [
     },
 ]
 
+# Password hashing (see hospitalapp/hashers.py)
+# PASSWORD_HASHER picks the hasher for new and rehashed passwords: pbkdf2,
+# scrypt or argon2 (needs argon2-cffi). The others stay listed so the
+# passwords they stored still verify; each one moves to the chosen hasher
+# and cost on its next login.
+
+PASSWORD_HASHER = os.environ.get('PASSWORD_HASHER', 'pbkdf2')
+PBKDF2_ITERATIONS = int(os.environ.get('PBKDF2_ITERATIONS', 1_000_000))
+SCRYPT_WORK_FACTOR = int(os.environ.get('SCRYPT_WORK_FACTOR', 2 ** 14))
+ARGON2_TIME_COST = int(os.environ.get('ARGON2_TIME_COST', 2))
+ARGON2_MEMORY_COST = int(os.environ.get('ARGON2_MEMORY_COST', 102400))
+
+_PASSWORD_HASHERS = {
+    'pbkdf2': 'hospitalapp.hashers.PBKDF2PasswordHasher',
+    'scrypt': 'hospitalapp.hashers.ScryptPasswordHasher',
+    'argon2': 'hospitalapp.hashers.Argon2PasswordHasher',
+}
+PASSWORD_HASHERS = [
+    _PASSWORD_HASHERS[PASSWORD_HASHER],
+    *(path for name, path in _PASSWORD_HASHERS.items() if name != PASSWORD_HASHER),
+    'django.contrib.auth.hashers.PBKDF2SHA1PasswordHasher',
+    'django.contrib.auth.hashers.BCryptSHA256PasswordHasher',
+]
+
+# Login throttling (see hospitalapp/throttle.py): failed logins allowed per
+# client IP and per username within a sliding window of
+# LOGIN_THROTTLE_WINDOW seconds; past the username limit, only addresses
+# without attempts of their own get through. 0 turns a limit off. The counts live in
+# the sessions cache; give it a shared backend in production
+# (SESSION_CACHE_BACKEND) so all workers see the same counts.
+
+LOGIN_THROTTLE_WINDOW = int(os.environ.get('LOGIN_THROTTLE_WINDOW', 300))
+LOGIN_THROTTLE_PER_IP = int(os.environ.get('LOGIN_THROTTLE_PER_IP', 30))
+LOGIN_THROTTLE_PER_USERNAME = int(os.environ.get('LOGIN_THROTTLE_PER_USERNAME', 10))
+LOGIN_THROTTLE_CACHE_ALIAS = 'sessions'
+
 
 # Internationalization
 # https://docs.djangoproject.com/en/5.2/topics/i18n/
@@ -121,6 +229,37 @@ USE_TZ = True
 # https://docs.djangoproject.com/en/5.2/howto/static-files/
 
 STATIC_URL = 'static/'
+STATIC_ROOT = os.environ.get('STATIC_ROOT', BASE_DIR / 'staticfiles')
+
+# Deploy: manage.py build_assets && manage.py collectstatic (see hospitalapp/assets.py).
+# Files get content-hashed names plus .gz/.br copies; point nginx at
+# STATIC_ROOT with gzip_static/brotli_static and a long expires, or set
+# SERVE_STATIC=1 to have Django send them.
+SERVE_STATIC = os.environ.get('SERVE_STATIC') == '1'
+
+# Uploaded documents, stored content-addressed (see hospitalapp/media.py).
+# MEDIA_OFFLOAD hands the sending of files to the front server:
+#   'x-accel-redirect'  nginx, with an internal location at MEDIA_ACCEL_PREFIX
+#                       aliased to MEDIA_ROOT
+#   'x-sendfile'        Apache mod_xsendfile / lighttpd
+MEDIA_ROOT = os.environ.get('MEDIA_ROOT', BASE_DIR / 'media')
+MEDIA_URL = '/media/'
+MEDIA_OFFLOAD = os.environ.get('MEDIA_OFFLOAD', '')
+MEDIA_ACCEL_PREFIX = '/protected-media/'
+
+# Uploaded user import files wait here for the import worker
+# (manage.py run_queued_imports). They hold passwords, so keep this
+# directory outside MEDIA_ROOT and anything the web server exposes.
+IMPORT_ROOT = os.environ.get('IMPORT_ROOT', BASE_DIR / 'imports')
+
+STORAGES = {
+    'default': {'BACKEND': 'hospitalapp.media.ContentAddressedStorage'},
+    'staticfiles': {'BACKEND': 'hospitalapp.assets.CompressedManifestStorage'},
+    'imports': {'BACKEND': 'django.core.files.storage.FileSystemStorage', 'OPTIONS': {'location': IMPORT_ROOT}},
+}
+
+# Uploads go to a temporary file chunk by chunk, hashed on the way in.
+FILE_UPLOAD_HANDLERS = ['hospitalapp.media.HashingUploadHandler']
 
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field
@@ -136,4 +275,19 @@ EMAIL_HOST_USER = 'your-email@gmail.com'
 EMAIL_HOST_PASSWORD = 'your-app-password'
 DEFAULT_FROM_EMAIL = EMAIL_HOST_USER
 
+# Stripe
+# STRIPE_API_BASE can point the client at a local fake Stripe server in tests.
+
+STRIPE_SECRET_KEY = os.environ.get('STRIPE_SECRET_KEY', '')
+STRIPE_PUBLISHABLE_KEY = os.environ.get('STRIPE_PUBLISHABLE_KEY', '')
+STRIPE_WEBHOOK_SECRET = os.environ.get('STRIPE_WEBHOOK_SECRET', '')
+STRIPE_API_BASE = os.environ.get('STRIPE_API_BASE', '')
+
+# Request profiling (see hospitalapp/instrumentation.py)
+
+SLOW_REQUEST_MS = int(os.environ.get('SLOW_REQUEST_MS', 500))
+N_PLUS_ONE_THRESHOLD = 5
+SERVER_TIMING_HEADER = True
 
+# Bearer token required by /metrics; while it is empty every scrape is refused.
+METRICS_TOKEN = os.environ.get('METRICS_TOKEN', '')
@@ -0,0 +1,21 @@
+# Runs the test suite without a MySQL server: two SQLite databases stand in
+# for the primary and a read replica. Routing to the replica is off except
+# in the tests that turn it on with override_settings(DATABASE_REPLICAS=...).
+# The test runner keeps both in memory; the file names are only opened by
+# management commands run with these settings (and are git-ignored).
+#   python manage.py test hospitalapp --settings=hospitalproject.test_settings
+from .settings import *  # noqa: F401,F403
+
+DATABASES = {
+    'default': {'ENGINE': 'django.db.backends.sqlite3', 'NAME': BASE_DIR / 'test_primary.sqlite3'},
+    'replica': {'ENGINE': 'django.db.backends.sqlite3', 'NAME': BASE_DIR / 'test_replica.sqlite3'},
+}
+DATABASE_REPLICAS = []
+
+PASSWORD_HASHERS = ['django.contrib.auth.hashers.MD5PasswordHasher']
+
+# SQLite has no FULLTEXT index; search from an in-process index instead.
+SEARCH_BACKEND = 'hospitalapp.search.InMemorySearchBackend'
+
+# No collectstatic run, so no manifest of hashed names.
+STORAGES = {**STORAGES, 'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'}}